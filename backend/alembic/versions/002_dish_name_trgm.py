@@ -0,0 +1,29 @@
+"""Add pg_trgm GIN index on dish.dish_name
+
+Revision ID: 002_dish_name_trgm
+Revises: 001_initial, 001_add_usage_to_dish_ingredients
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '002_dish_name_trgm'
+down_revision = ('001_initial', '001_add_usage_to_dish_ingredients')
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Trigram index lets ILIKE '%x%' and the similarity operator (%) use an index scan
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.create_index(
+        'ix_dish_dish_name_trgm', 'dish', ['dish_name'],
+        postgresql_using='gin',
+        postgresql_ops={'dish_name': 'gin_trgm_ops'},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_dish_dish_name_trgm', table_name='dish')
@@ -0,0 +1,28 @@
+"""Add (sort key, id) indexes for keyset pagination of the dish list
+
+Revision ID: 003_dish_keyset_indexes
+Revises: 002_dish_name_trgm
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '003_dish_keyset_indexes'
+down_revision = '002_dish_name_trgm'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Each sort option of /dish/select walks one of these indexes from the cursor row
+    op.create_index('ix_dish_dish_name_id', 'dish', ['dish_name', 'id'])
+    op.create_index('ix_dish_create_time_id', 'dish', ['create_time', 'id'])
+    op.create_index('ix_dish_difficult_id', 'dish', ['difficult', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_dish_difficult_id', table_name='dish')
+    op.drop_index('ix_dish_create_time_id', table_name='dish')
+    op.drop_index('ix_dish_dish_name_id', table_name='dish')
@@ -0,0 +1,74 @@
+"""Add normalized, unique ingredient name key
+
+Revision ID: 004_ingredient_name_key
+Revises: 003_dish_keyset_indexes
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '004_ingredient_name_key'
+down_revision = '003_dish_keyset_indexes'
+branch_labels = None
+depends_on = None
+
+# Frozen copy of crud.normalize_ingredient_name at this revision: full-width ASCII
+# and the ideographic space folded to ASCII, then str.strip(). The keys are computed
+# in Python because strip() trims every Unicode whitespace character (NBSP, U+2000
+# to U+200A, ...), which no fixed btrim() set in SQL matches exactly.
+FULLWIDTH_FOLD = {code: code - 0xFEE0 for code in range(0xFF01, 0xFF5F)}
+FULLWIDTH_FOLD[0x3000] = 0x20
+
+
+def normalize_ingredient_name(name):
+    return (name or "").translate(FULLWIDTH_FOLD).strip()
+
+
+def upgrade() -> None:
+    if op.get_context().as_sql:
+        raise RuntimeError("004_ingredient_name_key reads the ingredient names and cannot run in --sql mode")
+    op.add_column('ingredient', sa.Column('name_key', sa.String(), server_default="", nullable=True))
+    connection = op.get_bind()
+    rows = connection.execute(sa.text("SELECT id, ingredient_name FROM ingredient")).all()
+    if rows:
+        connection.execute(
+            sa.text("UPDATE ingredient SET name_key = :name_key WHERE id = :id"),
+            [{"id": id_, "name_key": normalize_ingredient_name(name)} for id_, name in rows]
+        )
+
+    # Merge ingredients that share a key into the one with the lowest id
+    op.execute("""
+        CREATE TEMP TABLE ingredient_keep ON COMMIT DROP AS
+        SELECT id, min(id) OVER (PARTITION BY name_key) AS keep_id FROM ingredient
+    """)
+    # A dish linked to several duplicates keeps only the link with the lowest ingredient id
+    op.execute("""
+        DELETE FROM dish_ingredients l
+        USING ingredient_keep k
+        WHERE l.ingredient_id = k.id
+          AND EXISTS (
+              SELECT 1 FROM dish_ingredients l2
+              JOIN ingredient_keep k2 ON k2.id = l2.ingredient_id
+              WHERE l2.dish_id = l.dish_id AND k2.keep_id = k.keep_id AND l2.ingredient_id < l.ingredient_id
+          )
+    """)
+    op.execute("""
+        UPDATE dish_ingredients l SET ingredient_id = k.keep_id
+        FROM ingredient_keep k
+        WHERE l.ingredient_id = k.id AND k.id <> k.keep_id
+    """)
+    op.execute("""
+        DELETE FROM ingredient i
+        USING ingredient_keep k
+        WHERE i.id = k.id AND k.id <> k.keep_id
+    """)
+
+    op.create_index('ux_ingredient_name_key', 'ingredient', ['name_key'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index('ux_ingredient_name_key', table_name='ingredient')
+    op.drop_column('ingredient', 'name_key')
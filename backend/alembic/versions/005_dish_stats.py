@@ -0,0 +1,53 @@
+"""Add dish_stats summary table
+
+Revision ID: 005_dish_stats
+Revises: 004_ingredient_name_key
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+from sqlalchemy import Column, Integer, DateTime, ForeignKey
+from sqlalchemy.sql import func
+
+
+# revision identifiers, used by Alembic.
+revision = '005_dish_stats'
+down_revision = '004_ingredient_name_key'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'dish_stats',
+        Column('dish_id', Integer, ForeignKey('dish.id', ondelete='CASCADE'), primary_key=True),
+        Column('cook_count', Integer, server_default="0"),
+        Column('rating_1_count', Integer, server_default="0"),  # 1很棒
+        Column('rating_2_count', Integer, server_default="0"),  # 2还行
+        Column('rating_3_count', Integer, server_default="0"),  # 3一般
+        Column('rating_4_count', Integer, server_default="0"),  # 4拉胯
+        Column('rating_sum', Integer, server_default="0"),
+        Column('last_cooked_time', DateTime),
+        Column('create_time', DateTime, server_default=func.current_timestamp()),
+        Column('modify_time', DateTime, server_default=func.current_timestamp(), onupdate=func.current_timestamp())
+    )
+
+    # Backfill from the existing history
+    op.execute("""
+        INSERT INTO dish_stats (dish_id, cook_count, rating_1_count, rating_2_count, rating_3_count,
+                                rating_4_count, rating_sum, last_cooked_time)
+        SELECT dish_id,
+               count(*),
+               count(*) FILTER (WHERE cooking_rating = 1),
+               count(*) FILTER (WHERE cooking_rating = 2),
+               count(*) FILTER (WHERE cooking_rating = 3),
+               count(*) FILTER (WHERE cooking_rating = 4),
+               coalesce(sum(cooking_rating), 0),
+               max(cooking_time)
+        FROM dish_history
+        GROUP BY dish_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('dish_stats')
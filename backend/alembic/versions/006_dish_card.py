@@ -0,0 +1,60 @@
+"""Add dish_card projection for the home page list
+
+Revision ID: 006_dish_card
+Revises: 005_dish_stats
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+from sqlalchemy import Column, Integer, String, SmallInteger, DateTime, Text, ForeignKey
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.sql import func
+
+
+# revision identifiers, used by Alembic.
+revision = '006_dish_card'
+down_revision = '005_dish_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'dish_card',
+        Column('dish_id', Integer, ForeignKey('dish.id', ondelete='CASCADE'), primary_key=True),
+        Column('dish_name', String, server_default=""),
+        Column('difficult', SmallInteger, server_default="1"),  # 1简单 2中等 3复杂
+        Column('main_ingredients', ARRAY(Text), server_default="{}"),  # 主料名称
+        Column('create_time', DateTime, server_default=func.current_timestamp()),
+        Column('modify_time', DateTime, server_default=func.current_timestamp(), onupdate=func.current_timestamp())
+    )
+
+    op.execute("""
+        INSERT INTO dish_card (dish_id, dish_name, difficult, main_ingredients, create_time)
+        SELECT d.id, d.dish_name, d.difficult,
+               coalesce((SELECT array_agg(i.ingredient_name ORDER BY i.id)
+                         FROM dish_ingredients l JOIN ingredient i ON i.id = l.ingredient_id
+                         WHERE l.dish_id = d.id AND i.type = 1), '{}'),
+               d.create_time
+        FROM dish d
+    """)
+
+    # /dish/select now filters and pages on dish_card; its keyset indexes move there
+    op.create_index(
+        'ix_dish_card_dish_name_trgm', 'dish_card', ['dish_name'],
+        postgresql_using='gin',
+        postgresql_ops={'dish_name': 'gin_trgm_ops'},
+    )
+    op.create_index('ix_dish_card_dish_name_id', 'dish_card', ['dish_name', 'dish_id'])
+    op.create_index('ix_dish_card_create_time_id', 'dish_card', ['create_time', 'dish_id'])
+    op.create_index('ix_dish_card_difficult_id', 'dish_card', ['difficult', 'dish_id'])
+    op.drop_index('ix_dish_difficult_id', table_name='dish')
+    op.drop_index('ix_dish_create_time_id', table_name='dish')
+    op.drop_index('ix_dish_dish_name_id', table_name='dish')
+
+
+def downgrade() -> None:
+    op.create_index('ix_dish_dish_name_id', 'dish', ['dish_name', 'id'])
+    op.create_index('ix_dish_create_time_id', 'dish', ['create_time', 'id'])
+    op.create_index('ix_dish_difficult_id', 'dish', ['difficult', 'id'])
+    op.drop_table('dish_card')
@@ -0,0 +1,41 @@
+"""Add cooking_time indexes on dish_history for history analytics
+
+Revision ID: 007_dish_history_time_indexes
+Revises: 006_dish_card
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '007_dish_history_time_indexes'
+down_revision = '006_dish_card'
+branch_labels = None
+depends_on = None
+
+
+# (name, columns) on dish_history, each with the rating included
+INDEXES = [
+    # Per-dish history and analytics: range scan on cooking_time within one dish,
+    # index-only thanks to the included rating
+    ('ix_dish_history_dish_id_cooking_time', ['dish_id', 'cooking_time']),
+    # Analytics across all dishes over a time range
+    ('ix_dish_history_cooking_time', ['cooking_time']),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY cannot run inside a transaction; build without blocking history writes
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            # An interrupted CONCURRENTLY build leaves an INVALID index behind; start over
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+            op.create_index(name, 'dish_history', columns, postgresql_include=['cooking_rating'],
+                            postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
@@ -0,0 +1,39 @@
+"""Index the foreign keys crud.py filters and joins on
+
+Revision ID: 008_foreign_key_indexes
+Revises: 007_dish_history_time_indexes
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '008_foreign_key_indexes'
+down_revision = '007_dish_history_time_indexes'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns). dish_history.dish_id is covered by 007, dish_ingredients.dish_id
+# by its primary key, and ingredient lookups by name go through ux_ingredient_name_key.
+INDEXES = [
+    # Steps of a dish in order: detail, export, get_dish_steps
+    ('ix_dish_step_dish_id_step_order', 'dish_step', ['dish_id', 'step_order']),
+    # Dishes using an ingredient, and the FK check when an ingredient is deleted
+    ('ix_dish_ingredients_ingredient_id', 'dish_ingredients', ['ingredient_id']),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY cannot run inside a transaction; build without blocking writes
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            # An interrupted CONCURRENTLY build leaves an INVALID index behind; start over
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+            op.create_index(name, table, columns, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
@@ -0,0 +1,76 @@
+"""
+Throughput of the sync (psycopg2) and async (asyncpg) database modes.
+
+Starts the API once per mode (DB_ASYNC=0 / DB_ASYNC=1) against the configured
+database and drives /dish/select and /dish/detail/{id} with 200 concurrent
+keep-alive clients, then prints requests/sec and latency percentiles per endpoint.
+
+Usage:
+    python -m backend.benchmarks.bench_async --env dev --concurrency 200 --duration 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import urllib.request
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.benchmarks.http_client import run_load, running_server, print_results
+
+API_PREFIX = "/cooking/ver3"
+
+
+def sample_dish_ids(base_url, count=200):
+    """Collect existing dish ids through the list endpoint so detail hits are real rows."""
+    body = json.dumps({"page": 0, "size": count}).encode()
+    request = urllib.request.Request(base_url + API_PREFIX + "/dish/select", data=body,
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request) as response:
+        items = json.loads(response.read())["data"]["items"]
+    if not items:
+        raise SystemExit("No dishes in the database; seed it first (backend/mock_data_generator.py)")
+    return [item["id"] for item in items]
+
+
+def make_workload(dish_ids):
+    select_body = json.dumps({"page": 0, "size": 10}).encode()
+
+    def make_request(rng):
+        if rng.random() < 0.5:
+            return "select", "POST", API_PREFIX + "/dish/select", select_body
+        return "detail", "GET", f"{API_PREFIX}/dish/detail/{rng.choice(dish_ids)}", None
+
+    return make_request
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare sync and async database modes')
+    parser.add_argument('--env', '-e', type=str, default='dev',
+                        choices=['dev', 'development', 'prod', 'production'],
+                        help='Environment whose database is used (default: dev)')
+    parser.add_argument('--port', type=int, default=8765, help='Port for the spawned API (default: 8765)')
+    parser.add_argument('--concurrency', type=int, default=200, help='Concurrent clients (default: 200)')
+    parser.add_argument('--duration', type=float, default=20.0, help='Measured seconds per mode (default: 20)')
+    parser.add_argument('--modes', type=str, default='sync,async', help='Modes to run (default: sync,async)')
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    summary = {}
+    for mode in args.modes.split(','):
+        env = {"ENV": args.env, "DB_ASYNC": "1" if mode == "async" else "0"}
+        with running_server(args.port, env=env):
+            workload = make_workload(sample_dish_ids(base_url))
+            results = asyncio.run(run_load(base_url, workload, concurrency=args.concurrency,
+                                           duration=args.duration))
+        print_results(f"{mode} mode, {args.concurrency} clients", results)
+        summary[mode] = {label: results[label]["rps"] for label in results}
+
+    print("\nRequests/sec")
+    for mode, rps in summary.items():
+        print(f"  {mode:<6} " + "  ".join(f"{label}={value}" for label, value in rps.items()))
+
+
+if __name__ == "__main__":
+    main()
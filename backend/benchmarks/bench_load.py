@@ -0,0 +1,280 @@
+"""
+HTTP load benchmark with mixed read/write workloads and comparable JSON results.
+
+Seeds the configured database to a scale factor (see dataset.SCALES: 1k, 100k, 1m
+dishes), starts the API, drives /dish/select, /dish/detail/{id}, /dish/add/raw,
+/dish/history/create and /ingredient/list with a weighted mix of requests, and
+reports p50/p95/p99 latency and requests/sec per endpoint together with the RSS of
+the server processes (sampled from /proc during the run).
+
+Results are written as JSON with the run parameters, so two runs can be compared:
+
+    python -m backend.benchmarks.bench_load --env dev --scale 100k --seed --mix mixed -o before.json
+    python -m backend.benchmarks.bench_load --env dev --scale 100k --mix mixed -o after.json
+    python -m backend.benchmarks.bench_load --compare before.json after.json
+
+--compare exits with status 1 when an endpoint lost more than --threshold percent
+of its throughput or gained as much p95/p99 latency.
+
+Writes go to the benchmarked database; do not point it at production.
+"""
+import argparse
+import asyncio
+from datetime import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.benchmarks.http_client import PROJECT_ROOT, run_load, running_server, print_results
+
+API_PREFIX = "/cooking/ver3"
+# Request weights per workload; labels are the endpoints in the results
+MIXES = {
+    "read": {"select": 50, "detail": 40, "ingredients": 10},
+    "mixed": {"select": 40, "detail": 35, "ingredients": 5, "add": 10, "history": 10},
+    "write": {"select": 15, "detail": 15, "add": 35, "history": 35},
+}
+# Settings of the server that change the numbers, recorded with every run
+SERVER_SETTINGS = ("DB_ASYNC", "FAST_JSON", "DB_POOL_SIZE", "DB_MAX_OVERFLOW", "DB_PGBOUNCER")
+RSS_SAMPLE_INTERVAL = 0.25
+
+
+def parse_mix(value):
+    """A MIXES name or explicit weights such as "select=60,detail=30,add=10"."""
+    if value in MIXES:
+        return MIXES[value]
+    mix = {}
+    for part in value.split(","):
+        label, _, weight = part.partition("=")
+        if label not in MIXES["mixed"]:
+            raise ValueError(f"unknown endpoint {label!r}; use {', '.join(MIXES['mixed'])}")
+        mix[label] = float(weight or 1)
+    return mix
+
+
+def seed_database(env, scale, seed_value):
+    os.environ['ENV'] = env
+    from backend.database import SessionLocal
+    from backend.benchmarks.dataset import seed
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        added = seed(db, scale, seed_value)
+    finally:
+        db.close()
+    print(f"Seeded {added} dishes in {time.perf_counter() - started:.1f}s")
+
+
+def sample_dataset(env, count=2000):
+    """Random existing dish ids for detail and history requests, plus the dish count."""
+    os.environ['ENV'] = env
+    from sqlalchemy import func
+    from sqlmodel import select
+    from backend.database import SessionLocal
+    from backend.models import Dish
+
+    db = SessionLocal()
+    try:
+        dish_count = db.execute(select(func.count()).select_from(Dish)).scalar_one()
+        dish_ids = db.execute(select(Dish.id).order_by(func.random()).limit(count)).scalars().all()
+    finally:
+        db.close()
+    if not dish_ids:
+        raise SystemExit("No dishes in the database; seed it first (--seed)")
+    return dish_count, dish_ids
+
+
+def make_workload(mix, dish_ids, dish_count, seed_value):
+    from backend.benchmarks.dataset import make_dish, vocabulary
+
+    labels = list(mix)
+    weights = [mix[label] for label in labels]
+    names = vocabulary(dish_count)
+    sorts = [None, "name", "newest", "difficult"]
+    pages = max(1, min(dish_count // 10, 50))
+    added = [0]
+
+    def make_request(rng):
+        label = rng.choices(labels, weights)[0]
+        if label == "select":
+            query = {"page": rng.randrange(pages), "size": 10, "sort": rng.choice(sorts)}
+            if rng.random() < 0.2:
+                query["dishName"] = rng.choice(["鸡", "豆腐", "红烧", "家常", "鱼"])
+            return label, "POST", API_PREFIX + "/dish/select", json.dumps(query).encode()
+        if label == "detail":
+            return label, "GET", f"{API_PREFIX}/dish/detail/{rng.choice(dish_ids)}", None
+        if label == "ingredients":
+            return label, "GET", API_PREFIX + "/ingredient/list", None
+        if label == "add":
+            added[0] += 1
+            dish = make_dish(rng, f"-bench{seed_value}-{added[0]}", names)
+            return label, "POST", API_PREFIX + "/dish/add/raw", dish.json().encode()
+        body = {"dish_id": rng.choice(dish_ids), "cooking_rating": rng.randint(1, 4)}
+        return label, "POST", API_PREFIX + "/dish/history/create", json.dumps(body).encode()
+
+    return make_request
+
+
+def process_tree_rss(pid):
+    """Resident set size in MB of pid and all of its descendants (Linux /proc)."""
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/status") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as children:
+                    pending.extend(int(child) for child in children.read().split())
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+    return round(total_kb / 1024, 1)
+
+
+async def load_with_rss(pid, base_url, workload, concurrency, duration, warmup, seed_value):
+    """run_load() while sampling the server RSS; returns (results, rss summary)."""
+    samples = []
+    load = asyncio.ensure_future(run_load(base_url, workload, concurrency=concurrency, duration=duration,
+                                          warmup=warmup, seed=seed_value))
+    if pid is not None and os.path.exists("/proc"):
+        samples.append(process_tree_rss(pid))
+        while not load.done():
+            await asyncio.sleep(RSS_SAMPLE_INTERVAL)
+            samples.append(process_tree_rss(pid))
+    results = await load
+    if not samples:
+        return results, None
+    return results, {"start_mb": samples[0], "peak_mb": max(samples), "end_mb": samples[-1]}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args, mix):
+    if args.seed:
+        seed_database(args.env, args.scale, args.seed_value)
+    dish_count, dish_ids = sample_dataset(args.env)
+    workload = make_workload(mix, dish_ids, dish_count, args.seed_value)
+
+    if args.base_url:
+        base_url = args.base_url
+        results, rss = asyncio.run(load_with_rss(args.pid, base_url, workload, args.concurrency, args.duration,
+                                                 args.warmup, args.seed_value))
+    else:
+        base_url = f"http://127.0.0.1:{args.port}"
+        with running_server(args.port, env={"ENV": args.env}) as process:
+            results, rss = asyncio.run(load_with_rss(process.pid, base_url, workload, args.concurrency,
+                                                     args.duration, args.warmup, args.seed_value))
+
+    report = {
+        "meta": {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(),
+            "label": args.label,
+            "scale": args.scale,
+            "dishes": dish_count,
+            "mix": mix,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "seed": args.seed_value,
+            "python": platform.python_version(),
+            "settings": {name: os.getenv(name) for name in SERVER_SETTINGS if os.getenv(name) is not None},
+        },
+        "results": results,
+        "rss": rss,
+    }
+    print_results(f"{args.mix} workload, {dish_count} dishes, {args.concurrency} clients", results)
+    if rss:
+        print(f"server RSS: {rss['start_mb']} MB at start, {rss['peak_mb']} MB peak")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Saved {args.output}")
+
+
+def compare(baseline_path, candidate_path, threshold):
+    """Print per-endpoint deltas of two saved runs; returns False on a regression."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(candidate_path, encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    for key in ("scale", "mix", "concurrency"):
+        if baseline["meta"].get(key) != candidate["meta"].get(key):
+            print(f"warning: runs differ in {key}: {baseline['meta'].get(key)} vs {candidate['meta'].get(key)}")
+
+    def change(old, new):
+        return (new - old) / old * 100 if old else 0.0
+
+    regressions = 0
+    print(f"{'endpoint':<14}{'rps':>18}{'p50 ms':>20}{'p95 ms':>20}{'p99 ms':>20}")
+    for label in sorted(set(baseline["results"]) & set(candidate["results"])):
+        old, new = baseline["results"][label], candidate["results"][label]
+        cells, regressed = [], False
+        for metric, worse_when_higher in (("rps", False), ("p50_ms", True), ("p95_ms", True), ("p99_ms", True)):
+            delta = change(old[metric], new[metric])
+            cells.append(f"{old[metric]:>7} {new[metric]:>7} {delta:+5.0f}%")
+            worse = delta if worse_when_higher else -delta
+            if metric != "p50_ms" and worse > threshold:
+                regressed = True
+        regressions += regressed
+        print(f"{label:<14}" + "".join(f"{cell:>20}" for cell in cells) + ("  REGRESSION" if regressed else ""))
+
+    if baseline.get("rss") and candidate.get("rss"):
+        print(f"peak RSS MB: {baseline['rss']['peak_mb']} -> {candidate['rss']['peak_mb']}")
+    return regressions == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP load benchmark of the GoCooking 3 API')
+    parser.add_argument('--env', '-e', type=str, default='dev',
+                        choices=['dev', 'development', 'prod', 'production'],
+                        help='Environment whose database is used (default: dev)')
+    parser.add_argument('--scale', type=str, default='1k', choices=['1k', '100k', '1m'],
+                        help='Dataset scale factor in dishes (default: 1k)')
+    parser.add_argument('--seed', action='store_true', help='Seed the database up to --scale before running')
+    parser.add_argument('--seed-value', type=int, default=0, help='Random seed of data and requests (default: 0)')
+    parser.add_argument('--mix', type=str, default='mixed',
+                        help=f'Workload: {", ".join(MIXES)} or weights like select=60,detail=40 (default: mixed)')
+    parser.add_argument('--concurrency', type=int, default=50, help='Concurrent clients (default: 50)')
+    parser.add_argument('--duration', type=float, default=30.0, help='Measured seconds (default: 30)')
+    parser.add_argument('--warmup', type=float, default=5.0, help='Unrecorded seconds before measuring (default: 5)')
+    parser.add_argument('--port', type=int, default=8765, help='Port for the spawned API (default: 8765)')
+    parser.add_argument('--base-url', type=str, help='Benchmark an already running API instead of spawning one')
+    parser.add_argument('--pid', type=int, help='Server pid for RSS sampling with --base-url')
+    parser.add_argument('--label', type=str, help='Free-form label stored with the results')
+    parser.add_argument('--output', '-o', type=str, help='Write the results as JSON to this file')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'),
+                        help='Compare two saved results instead of running')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='Percent change counted as a regression by --compare (default: 10)')
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(0 if compare(*args.compare, args.threshold) else 1)
+    if args.env in ('prod', 'production'):
+        parser.error("the benchmark writes to the database; refusing to run against production")
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+    run(args, mix)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Response serialization cost of the default and the FAST_JSON paths.
+
+Builds representative payloads in memory (no database or server needed) and times,
+per shape, what happens after the route returns:
+
+- default: response_model validation of schemas.APIResponse, jsonable_encoder and
+  JSONResponse rendering, exactly as FastAPI does it
+- fast: the prebuilt serializer plus orjson rendering (responses.fast_api_response)
+
+Both paths must produce the same JSON document; the benchmark checks that first.
+
+Usage:
+    python -m backend.benchmarks.bench_serialization --iterations 2000
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from backend import models, schemas
+from backend.responses import fast_api_response, orjson, serialize_dish_histories, serialize_ingredients
+
+BASE_TIME = datetime(2026, 10, 18, 12, 0, 0, 123456)
+
+
+def make_select_page(size=20):
+    return {
+        "items": [
+            {"id": i, "dish_name": f"菜品{i}", "difficult": i % 3 + 1,
+             "main_ingredients": [f"主料{i}", f"主料{i + 1}", f"主料{i + 2}"]}
+            for i in range(size)
+        ],
+        "total": 100000,
+        "total_estimated": False,
+        "page": 0,
+        "size": size,
+        "next_after": "WyJuYW1lIiwgIlx1ODNkYzE5IiwgMTld"
+    }
+
+
+def make_detail(ingredients=12, steps=8):
+    return {
+        "id": 1,
+        "dish_name": "番茄炒蛋",
+        "difficult": 1,
+        "ingredients": [
+            {"id": i, "ingredient_name": f"食材{i}", "type": i % 3 + 1, "usage": "适量",
+             "create_time": BASE_TIME, "modify_time": BASE_TIME}
+            for i in range(ingredients)
+        ],
+        "steps": [
+            {"id": i, "dish_id": 1, "step_order": i + 1, "step_text": f"第{i + 1}步：" + "翻炒均匀" * 5,
+             "create_time": BASE_TIME, "modify_time": BASE_TIME}
+            for i in range(steps)
+        ],
+        "create_time": BASE_TIME,
+        "modify_time": BASE_TIME
+    }
+
+
+def make_history(count=100):
+    return [
+        models.DishHistory(id=i, dish_id=1, cooking_time=BASE_TIME - timedelta(days=i), cooking_rating=i % 4 + 1,
+                           create_time=BASE_TIME, modify_time=BASE_TIME)
+        for i in range(count)
+    ]
+
+
+def make_ingredients(count=1000):
+    return [
+        models.Ingredient(id=i, ingredient_name=f"食材{i}", type=i % 3 + 1, name_key=f"食材{i}",
+                          create_time=BASE_TIME, modify_time=BASE_TIME)
+        for i in range(count)
+    ]
+
+
+SHAPES = [
+    ("select (20 cards)", make_select_page, None),
+    ("detail", make_detail, None),
+    ("history (100 rows)", make_history, serialize_dish_histories),
+    ("ingredient list (1000 rows)", make_ingredients, serialize_ingredients),
+]
+
+
+async def default_path(field, data):
+    content = await serialize_response(field=field, response_content=schemas.APIResponse(code=0, data=data))
+    return JSONResponse(content).body
+
+
+async def fast_path(data, serializer):
+    return fast_api_response(data, serializer=serializer).body
+
+
+async def time_per_call(call, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await call()
+    return (time.perf_counter() - started) / iterations
+
+
+async def run(iterations):
+    field = create_response_field(name="Response_bench", type_=schemas.APIResponse)
+
+    print(f"{'shape':<30}{'default us':>12}{'fast us':>12}{'speedup':>10}{'bytes':>10}")
+    for name, make, serializer in SHAPES:
+        data = make()
+        default_body = await default_path(field, data)
+        fast_body = await fast_path(data, serializer)
+        if json.loads(default_body) != json.loads(fast_body):
+            raise SystemExit(f"{name}: the two paths produce different JSON")
+
+        default_s = await time_per_call(lambda: default_path(field, data), iterations)
+        fast_s = await time_per_call(lambda: fast_path(data, serializer), iterations)
+        print(f"{name:<30}{default_s * 1e6:>12.1f}{fast_s * 1e6:>12.1f}"
+              f"{default_s / fast_s:>9.1f}x{len(fast_body):>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare default and FAST_JSON response serialization')
+    parser.add_argument('--iterations', type=int, default=2000, help='Serializations per shape and path (default: 2000)')
+    args = parser.parse_args()
+
+    if orjson is None:
+        raise SystemExit("orjson is not installed; pip install orjson")
+    asyncio.run(run(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
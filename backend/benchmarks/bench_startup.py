@@ -0,0 +1,114 @@
+"""
+Cold start of the API: time from spawning a worker until it serves its first requests.
+
+Every run starts `uvicorn backend.main:app` in a fresh process and records:
+
+- ready_ms: spawn until GET / answers (interpreter, imports, create_app, startup warmup)
+- first_*_ms: the first /dish/select and /dish/detail/{id} requests of the process
+- warm_*_ms: the same requests repeated, so whatever the first requests still pay
+  (connections, statement compilation, lazy loaders) shows up as the difference
+
+The import time of backend.main and the create_app() time are measured separately in
+a fresh interpreter. Medians over --runs are printed; --compare-warmup repeats the
+runs with the warmup disabled (DB_WARMUP_CONNECTIONS=0, DB_WARMUP_STATEMENTS=0).
+
+Usage:
+    python -m backend.benchmarks.bench_startup --env dev --runs 5 --compare-warmup -o startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.benchmarks.http_client import PROJECT_ROOT, running_server
+
+API_PREFIX = "/cooking/ver3"
+WARMUP_OFF = {"DB_WARMUP_CONNECTIONS": "0", "DB_WARMUP_STATEMENTS": "0"}
+IMPORT_SNIPPET = """
+import json, time
+started = time.perf_counter()
+import backend.main
+imported = time.perf_counter()
+backend.main.create_app()
+print(json.dumps({"import_ms": (imported - started) * 1000, "create_app_ms": (time.perf_counter() - imported) * 1000}))
+"""
+
+
+def timed_request(base_url, path, body=None):
+    """(milliseconds, response body) of one request on a new connection."""
+    headers = {"Content-Type": "application/json"} if body is not None else {}
+    request = urllib.request.Request(base_url + API_PREFIX + path, data=body, headers=headers)
+    started = time.perf_counter()
+    with urllib.request.urlopen(request) as response:
+        payload = response.read()
+    return (time.perf_counter() - started) * 1000, payload
+
+
+def import_timings(env):
+    output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=PROJECT_ROOT, capture_output=True,
+                            text=True, check=True, env={**os.environ, **env}).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def cold_start(port, env):
+    base_url = f"http://127.0.0.1:{port}"
+    select_body = json.dumps({"page": 0, "size": 10}).encode()
+    with running_server(port, env=env) as process:
+        run = {"ready_ms": process.ready_seconds * 1000}
+        run["first_select_ms"], payload = timed_request(base_url, "/dish/select", select_body)
+        items = json.loads(payload)["data"]["items"]
+        if not items:
+            raise SystemExit("No dishes in the database; seed it first (backend/mock_data_generator.py)")
+        detail_path = f"/dish/detail/{items[0]['id']}"
+        run["first_detail_ms"], _ = timed_request(base_url, detail_path)
+        run["warm_select_ms"], _ = timed_request(base_url, "/dish/select", select_body)
+        run["warm_detail_ms"], _ = timed_request(base_url, detail_path)
+    return run
+
+
+def measure(port, env, runs):
+    """Median of every timing over runs cold starts, plus the import timings."""
+    samples = [{**import_timings(env), **cold_start(port, env)} for _ in range(runs)]
+    return {key: round(statistics.median(sample[key] for sample in samples), 1) for key in samples[0]}
+
+
+def print_summary(results):
+    keys = list(next(iter(results.values())))
+    print(f"{'':<10}" + "".join(f"{key:>18}" for key in keys))
+    for name, result in results.items():
+        print(f"{name:<10}" + "".join(f"{result[key]:>18}" for key in keys))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold start time of the GoCooking 3 API')
+    parser.add_argument('--env', '-e', type=str, default='dev',
+                        choices=['dev', 'development', 'prod', 'production'],
+                        help='Environment whose database is used (default: dev)')
+    parser.add_argument('--runs', type=int, default=5, help='Cold starts per configuration (default: 5)')
+    parser.add_argument('--port', type=int, default=8766, help='Port for the spawned API (default: 8766)')
+    parser.add_argument('--compare-warmup', action='store_true',
+                        help='Also measure with the startup warmup disabled')
+    parser.add_argument('--output', '-o', type=str, help='Write the results as JSON to this file')
+    args = parser.parse_args()
+
+    env = {"ENV": args.env}
+    results = {"warmup": measure(args.port, env, args.runs)}
+    if args.compare_warmup:
+        results["no warmup"] = measure(args.port, {**env, **WARMUP_OFF}, args.runs)
+
+    print(f"\nMedian milliseconds over {args.runs} cold starts")
+    print_summary(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"runs": args.runs, "env": args.env, "results": results}, f, indent=2)
+        print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Throughput of the read endpoints as the number of worker processes grows.
+
+Starts `python -m backend.main --workers N` for every N in --workers (gunicorn with
+uvicorn workers when gunicorn is installed) and drives the read mix of bench_load
+(/dish/select, /dish/detail/{id}, /ingredient/list) against it. For every worker
+count it reports requests/sec, the speedup over the smallest worker count and the
+scaling efficiency (speedup / worker ratio; 1.0 is linear).
+
+One asyncio client process saturates about one core, so the load is generated by
+--client-processes processes that each run a share of the clients. They compete
+with the workers for cores: keep workers + client processes within the core count,
+or the measured curve flattens early. With a small database most
+reads are served from the per-worker caches, so the numbers show how the Python side
+scales rather than Postgres.
+
+Usage:
+    python -m backend.benchmarks.bench_workers --env dev --workers 1,2,4 --client-processes 4 -o workers.json
+"""
+import argparse
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.benchmarks.http_client import run_load, running_server
+from backend.benchmarks.bench_load import MIXES, git_revision, make_workload, sample_dataset
+
+
+def client_process(base_url, dish_ids, dish_count, concurrency, duration, warmup, seed_value):
+    """One load generator process; the workload closure is built here as it cannot be pickled."""
+    workload = make_workload(MIXES["read"], dish_ids, dish_count, seed_value)
+    return asyncio.run(run_load(base_url, workload, concurrency=concurrency, duration=duration, warmup=warmup,
+                                seed=seed_value))
+
+
+def merge(results):
+    """
+    Sum requests, errors and requests/sec of the client processes per endpoint.
+    Percentiles cannot be merged from summaries; the worst process is reported.
+    """
+    merged = {}
+    for result in results:
+        for label, summary in result.items():
+            total = merged.setdefault(label, {"requests": 0, "errors": 0, "rps": 0.0,
+                                              "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0})
+            for key in ("requests", "errors", "rps"):
+                total[key] += summary[key]
+            for key in ("p50_ms", "p95_ms", "p99_ms"):
+                total[key] = max(total[key], summary[key])
+    for total in merged.values():
+        total["rps"] = round(total["rps"], 1)
+    return merged
+
+
+def drive(base_url, dish_ids, dish_count, args):
+    processes = args.client_processes
+    shares = [args.concurrency // processes + (i < args.concurrency % processes) for i in range(processes)]
+    with ProcessPoolExecutor(processes) as executor:
+        futures = [executor.submit(client_process, base_url, dish_ids, dish_count, share, args.duration,
+                                   args.warmup, args.seed_value * 1000 + i) for i, share in enumerate(shares)]
+        return merge([future.result() for future in futures])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read throughput of the GoCooking 3 API by worker count')
+    parser.add_argument('--env', '-e', type=str, default='dev',
+                        choices=['dev', 'development', 'prod', 'production'],
+                        help='Environment whose database is used (default: dev)')
+    parser.add_argument('--workers', type=str, default=None,
+                        help='Comma separated worker counts (default: 1, 2, 4, ... up to the CPU count)')
+    parser.add_argument('--client-processes', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help='Load generator processes (default: half the CPU count)')
+    parser.add_argument('--concurrency', type=int, default=200, help='Concurrent clients in total (default: 200)')
+    parser.add_argument('--duration', type=float, default=20.0, help='Measured seconds per run (default: 20)')
+    parser.add_argument('--warmup', type=float, default=5.0, help='Unrecorded seconds before measuring (default: 5)')
+    parser.add_argument('--port', type=int, default=8767, help='Port for the spawned API (default: 8767)')
+    parser.add_argument('--preload', action='store_true', help='Start the workers with --preload')
+    parser.add_argument('--seed-value', type=int, default=0, help='Random seed of the requests (default: 0)')
+    parser.add_argument('--output', '-o', type=str, help='Write the results as JSON to this file')
+    args = parser.parse_args()
+
+    if args.workers:
+        worker_counts = [int(count) for count in args.workers.split(",")]
+    else:
+        worker_counts, count = [], 1
+        while count <= (os.cpu_count() or 1):
+            worker_counts.append(count)
+            count *= 2
+
+    dish_count, dish_ids = sample_dataset(args.env)
+    base_url = f"http://127.0.0.1:{args.port}"
+    runs = {}
+    for workers in worker_counts:
+        command = [sys.executable, "-m", "backend.main", "--env", args.env, "--host", "127.0.0.1",
+                   "--port", str(args.port), "--workers", str(workers)]
+        if args.preload:
+            command.append("--preload")
+        with running_server(args.port, command=command):
+            runs[workers] = drive(base_url, dish_ids, dish_count, args)
+        print(f"{workers} worker(s): {runs[workers]['all']['rps']} requests/s")
+
+    smallest = worker_counts[0]
+    baseline = runs[smallest]["all"]["rps"]
+    summary = {}
+    print(f"\n{'workers':>8}{'rps':>12}{'speedup':>10}{'efficiency':>12}{'p99 ms':>10}")
+    for workers, result in runs.items():
+        speedup = result["all"]["rps"] / baseline if baseline else 0.0
+        efficiency = speedup / (workers / smallest)
+        summary[workers] = {"rps": result["all"]["rps"], "speedup": round(speedup, 2),
+                            "efficiency": round(efficiency, 2), "p99_ms": result["all"]["p99_ms"]}
+        print(f"{workers:>8}{result['all']['rps']:>12}{speedup:>10.2f}{efficiency:>12.2f}"
+              f"{result['all']['p99_ms']:>10}")
+
+    if args.output:
+        report = {
+            "meta": {
+                "time": datetime.now().isoformat(timespec="seconds"),
+                "revision": git_revision(),
+                "dishes": dish_count,
+                "cpu_count": os.cpu_count(),
+                "client_processes": args.client_processes,
+                "concurrency": args.concurrency,
+                "duration_s": args.duration,
+                "preload": args.preload,
+            },
+            "summary": summary,
+            "results": runs,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Deterministic benchmark datasets at fixed scale factors.
+
+A scale factor fixes the number of dishes; ingredient vocabulary, ingredients per
+dish, steps and cooking history follow from it with realistic fan-out:
+
+- 3-8 distinct ingredients per dish (main, secondary, seasoning), drawn from a
+  vocabulary that grows with the square root of the dish count
+- 4-10 steps per dish
+- cooking history skewed towards a minority of dishes: about 3 records per dish on
+  average, most dishes never cooked, ratings 1-4, times within the last year
+
+The same seed always produces the same rows. Seeding is additive and only inserts
+the dishes missing to reach the scale, so an interrupted run can be resumed.
+"""
+from datetime import datetime, timedelta
+import random
+
+from sqlalchemy import func, insert
+from sqlmodel import select
+
+from backend import crud, schemas
+from backend.mock_data_generator import dish_names, main_ingredients, secondary_ingredients, seasonings, \
+    step_descriptions
+from backend.models import Dish, DishHistory
+
+SCALES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+USAGES = ["适量", "少许", "一大勺", "一小勺", "按口味添加", "200克", "300克", "1根", "2个", "半斤"]
+STYLES = ["家常", "川味", "粤式", "秘制", "经典", "湘味", "东北", "老北京", "江南", "农家"]
+VARIANTS = ["", "（散装）", "（精选）", "（有机）", "（冷冻）", "（本地）", "（进口）", "（特级）"]
+# Dishes per transaction while seeding
+SEED_BATCH_SIZE = 1000
+# Average cooking records per dish, and the share of dishes that were ever cooked
+HISTORY_PER_DISH = 3.0
+COOKED_SHARE = 0.3
+
+
+def vocabulary(dish_count):
+    """Ingredient names per type (1主料 2辅料 3调料), sized by the dish count."""
+    per_type = max(20, int(dish_count ** 0.5))
+    names = {}
+    for ingredient_type, base in ((1, main_ingredients), (2, secondary_ingredients), (3, seasonings)):
+        base = list(dict.fromkeys(base))
+        names[ingredient_type] = []
+        for i in range(per_type):
+            round_number, index = divmod(i, len(base))
+            variant = VARIANTS[round_number % len(VARIANTS)]
+            suffix = str(round_number // len(VARIANTS)) if round_number >= len(VARIANTS) else ""
+            names[ingredient_type].append(base[index] + variant + suffix)
+    return names
+
+
+def make_dish(rng, number, names):
+    """The DishAddRequest of dish number `number` (names unique per number)."""
+    ingredients = []
+    for ingredient_type, count in ((1, rng.randint(1, 3)), (2, rng.randint(1, 3)), (3, rng.randint(1, 2))):
+        for name in rng.sample(names[ingredient_type], min(count, len(names[ingredient_type]))):
+            ingredients.append(schemas.DishIngredientCreate(
+                ingredient_name=name, type=ingredient_type, usage=rng.choice(USAGES)
+            ))
+    return schemas.DishAddRequest(
+        dish_name=f"{rng.choice(STYLES)}{rng.choice(dish_names)}{number}",
+        difficult=rng.choice([1, 2, 3]),
+        ingredients=ingredients,
+        steps=[
+            schemas.DishStepCreateForDish(step_order=i + 1, step_text=rng.choice(step_descriptions))
+            for i in range(rng.randint(4, 10))
+        ]
+    )
+
+
+def make_history(rng, dish_ids, now):
+    """dish_history rows for a batch of new dishes."""
+    rows = []
+    for dish_id in dish_ids:
+        if rng.random() >= COOKED_SHARE:
+            continue
+        for _ in range(1 + int(rng.expovariate(COOKED_SHARE / HISTORY_PER_DISH))):
+            cooking_time = now - timedelta(seconds=rng.randint(0, 365 * 86400))
+            rows.append({"dish_id": dish_id, "cooking_time": cooking_time,
+                         "cooking_rating": rng.choice([1, 1, 2, 2, 2, 3, 4])})
+    return rows
+
+
+def seed(db, scale, seed_value=0, progress=print):
+    """
+    Insert dishes (with ingredients, steps and history) until the database holds
+    SCALES[scale] dishes, then rebuild dish_stats. Returns the number of dishes added.
+    """
+    target = SCALES[scale]
+    existing = db.execute(select(func.count()).select_from(Dish)).scalar_one()
+    if existing >= target:
+        return 0
+
+    names = vocabulary(target)
+    now = datetime.now().replace(microsecond=0)
+    added = 0
+    for start in range(existing, target, SEED_BATCH_SIZE):
+        numbers = range(start, min(start + SEED_BATCH_SIZE, target))
+        # One generator per batch, so a resumed run produces the same rows
+        rng = random.Random(f"{seed_value}:{start}")
+        dishes = [make_dish(rng, number, names) for number in numbers]
+        dish_ids = crud._insert_dishes(db, dishes)
+        history = make_history(rng, dish_ids, now)
+        if history:
+            db.execute(insert(DishHistory.__table__), history)
+        db.commit()
+        added += len(dish_ids)
+        progress(f"  {start + len(dish_ids)}/{target} dishes")
+
+    crud.rebuild_dish_stats(db)
+    return added
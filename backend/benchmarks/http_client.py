@@ -0,0 +1,198 @@
+"""
+Minimal asyncio HTTP/1.1 load generator shared by the benchmark scripts.
+
+Each simulated client keeps one keep-alive connection and records the latency of
+every request, so the numbers are not skewed by connection setup or by the overhead
+of a general-purpose client library.
+"""
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.request
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Connection:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+            self.writer = None
+
+    async def request(self, method, path, body=None, headers=None):
+        if self.writer is None:
+            await self.open()
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}"]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        if body is not None:
+            lines.append("Content-Type: application/json")
+            lines.append(f"Content-Length: {len(body)}")
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b""))
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed by server")
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get("transfer-encoding") == "chunked":
+            chunks = []
+            while True:
+                size = int((await self.reader.readline()).strip(), 16)
+                if size == 0:
+                    await self.reader.readline()
+                    break
+                chunks.append(await self.reader.readexactly(size))
+                await self.reader.readline()
+            payload = b"".join(chunks)
+        else:
+            payload = await self.reader.readexactly(int(response_headers.get("content-length", 0)))
+
+        if response_headers.get("connection") == "close":
+            await self.close()
+        return status, response_headers, payload
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    """Latency/throughput summary for one label; latencies are in seconds."""
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "rps": round(len(values) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 2),
+        "p95_ms": round(percentile(values, 95) * 1000, 2),
+        "p99_ms": round(percentile(values, 99) * 1000, 2),
+    }
+
+
+async def run_load(base_url, make_request, concurrency=200, duration=10.0, warmup=2.0, seed=0):
+    """
+    Drive `concurrency` keep-alive clients against base_url for `duration` seconds.
+
+    make_request(rng) returns (label, method, path, body) where body is bytes or None.
+    Requests issued during the warmup period are not recorded. Returns a dict with a
+    summary per label and an "all" entry.
+    """
+    parts = urlsplit(base_url)
+    host, port, prefix = parts.hostname, parts.port or 80, parts.path.rstrip("/")
+    latencies = {}
+    errors = {}
+    started = time.perf_counter()
+    record_from = started + warmup
+    stop_at = record_from + duration
+
+    async def client(client_id):
+        rng = random.Random(seed * 100003 + client_id)
+        conn = Connection(host, port)
+        try:
+            while True:
+                now = time.perf_counter()
+                if now >= stop_at:
+                    break
+                label, method, path, body = make_request(rng)
+                try:
+                    status, _, _ = await conn.request(method, prefix + path, body)
+                    failed = status >= 400
+                except (ConnectionError, asyncio.IncompleteReadError, OSError):
+                    await conn.close()
+                    failed = True
+                end = time.perf_counter()
+                if now < record_from:
+                    continue
+                if failed:
+                    errors[label] = errors.get(label, 0) + 1
+                else:
+                    latencies.setdefault(label, []).append(end - now)
+        finally:
+            await conn.close()
+
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - record_from
+
+    labels = sorted(set(latencies) | set(errors))
+    result = {label: summarize(latencies.get(label, []), errors.get(label, 0), elapsed) for label in labels}
+    result["all"] = summarize(
+        [value for values in latencies.values() for value in values], sum(errors.values()), elapsed
+    )
+    return result
+
+
+def wait_until_ready(base_url, timeout=60.0):
+    """Poll the API root until it answers, returning the seconds it took."""
+    started = time.perf_counter()
+    while True:
+        try:
+            with urllib.request.urlopen(base_url.rstrip("/") + "/", timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter() - started
+        except OSError:
+            pass
+        if time.perf_counter() - started > timeout:
+            raise TimeoutError(f"API at {base_url} did not become ready within {timeout}s")
+        time.sleep(0.01)
+
+
+@contextmanager
+def running_server(port, env=None, extra_args=None, command=None):
+    """
+    Start `uvicorn backend.main:app` (or command, which must listen on port) in a
+    subprocess and stop it on exit. The process gets a ready_seconds attribute:
+    seconds from spawning it until it answered.
+    """
+    if command is None:
+        command = [sys.executable, "-m", "uvicorn", "backend.main:app",
+                   "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"]
+    command = list(command) + list(extra_args or [])
+    spawned = time.perf_counter()
+    process = subprocess.Popen(command, cwd=PROJECT_ROOT, env={**os.environ, **(env or {})})
+    try:
+        wait_until_ready(f"http://127.0.0.1:{port}")
+        process.ready_seconds = time.perf_counter() - spawned
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def print_results(title, results):
+    print(f"\n{title}")
+    print(json.dumps(results, indent=2, ensure_ascii=False))
@@ -0,0 +1,187 @@
+"""
+In-process caches for hot read paths.
+
+Caches live in the memory of one API process. Write paths in crud.py invalidate
+them after commit; the TTLs bound how long a write made by another process can
+stay invisible.
+"""
+from collections import OrderedDict
+import sys
+import threading
+import time
+
+
+class CountCache:
+    """
+    Row counts per filter combination, e.g. the total of /dish/select.
+
+    Any dish write can change the count of any filter, so invalidation drops every
+    entry. A generation number guards against a count computed before a write being
+    stored after that write has invalidated the cache.
+    """
+
+    def __init__(self, ttl_seconds=60.0, max_entries=1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._generation = 0
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value, generation=None):
+        """Store a count; ignored when the cache was invalidated since `generation` was read."""
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                # Filters are user input; drop the oldest entry rather than grow unbounded
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+
+def estimate_size(value, _seen=None):
+    """Approximate deep memory footprint of a cached value in bytes."""
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, _seen) + estimate_size(v, _seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _seen) for item in value)
+    return size
+
+
+class CacheBackend:
+    """
+    Interface of a key/value cache backend. get() returns None on a miss, so None
+    itself cannot be cached. Values are shared between callers and must be treated
+    as read-only.
+
+    A backend may expose a `generation` that changes on every delete/clear; set()
+    then drops a value read from the database before an invalidation happened.
+    """
+
+    generation = None
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, generation=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self):
+        return {}
+
+
+class LRUTTLCache(CacheBackend):
+    """
+    Least-recently-used cache bounded by the estimated memory of its values rather
+    than by entry count, with a time-to-live per entry.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, ttl_seconds=300.0, sizeof=estimate_size):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.sizeof = sizeof
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, size = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, generation=None):
+        if self.ttl_seconds <= 0 or self.max_bytes <= 0:
+            return
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            while self._bytes + size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds, size)
+            self._bytes += size
+
+    def delete(self, key):
+        with self._lock:
+            self.generation += 1
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl_s": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _remove(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
@@ -0,0 +1,158 @@
+"""
+Cache invalidation across API processes with Postgres LISTEN/NOTIFY.
+
+Every process keeps its own caches (dish counts, dish details, the ingredient index
+and the recommender). A write applies its change to the caches of its own process
+after commit, and the other processes learn about it from an event. Write paths
+publish the event with pg_notify inside their transaction, so Postgres delivers it
+exactly when the write commits and drops it on rollback. No broker is needed.
+
+Each process runs one listener thread on a dedicated connection. The thread LISTENs
+on the channel and passes every event from another process to handle(event).
+Postgres does not keep notifications for a listener that is not connected. So after
+the connection has been lost, resync() runs once the listener is back, and the
+process drops what it may have missed.
+
+Events are small JSON objects:
+  {"o": origin, "k": kind, "ids": [...], "t": unix time}
+plus fields of the kind. A NOTIFY payload is limited to 8000 bytes. Beyond
+MAX_EVENT_IDS ids, "ids" is null and means "any".
+"""
+import json
+import os
+import select
+import threading
+import time
+
+from sqlalchemy import text
+
+from backend.session_hooks import on_commit
+
+NOTIFY_SQL = text("SELECT pg_notify(:channel, :payload)")
+MAX_EVENT_IDS = 500
+
+
+class CacheEventBus:
+    """
+    Publishes events on channel and listens for those of the other processes.
+
+    connect() returns a new psycopg2 connection to the primary. The connection must
+    not go through PgBouncer in transaction mode: that mode cannot hold a LISTEN.
+    """
+
+    def __init__(self, channel, connect, handle, resync, poll_interval_s=1.0, max_reconnect_delay_s=30.0):
+        self.channel = channel
+        self.connected = False
+        self.published = {}  # kind -> events committed by this process
+        self.received = {}  # kind -> events of other processes applied
+        self.delay_seconds_total = 0.0  # send-to-apply delay of the received events, by the senders' clocks
+        self.errors = 0
+        self.resyncs = 0
+        self._connect = connect
+        self._handle = handle
+        self._resync = resync
+        self._poll_interval_s = poll_interval_s
+        self._max_reconnect_delay_s = max_reconnect_delay_s
+        self._lock = threading.Lock()
+        self._run = None  # (pid, token) of the current listener thread
+        self._origin = None
+
+    @property
+    def origin(self):
+        """Token of this process in the events it sends; a new one after a fork."""
+        if self._origin is None or self._origin[0] != os.getpid():
+            self._origin = (os.getpid(), f"{os.getpid()}.{os.urandom(3).hex()}")
+        return self._origin[1]
+
+    def publish(self, session, kind, ids=None, **fields):
+        """Send an event when the current transaction of session commits."""
+        if ids is not None:
+            ids = list(ids)
+            if len(ids) > MAX_EVENT_IDS:
+                ids = None
+        payload = {"o": self.origin, "k": kind, "ids": ids, "t": round(time.time(), 3), **fields}
+        session.execute(NOTIFY_SQL, {"channel": self.channel,
+                                     "payload": json.dumps(payload, separators=(",", ":"), default=str)})
+        on_commit(session, self._count, self.published, kind)
+
+    def _count(self, counts, kind):
+        counts[kind] = counts.get(kind, 0) + 1
+
+    def start(self):
+        """Start the listener thread, once per process."""
+        # Threads do not survive a fork: start it again in every worker
+        with self._lock:
+            if self._run is not None and self._run[0] == os.getpid():
+                return
+            self._run = run = (os.getpid(), object())
+        threading.Thread(target=self._listen_loop, args=(run,), name="cache-events", daemon=True).start()
+
+    def stop(self):
+        """Stop the listener of this process within poll_interval seconds."""
+        with self._lock:
+            self._run = None
+
+    def _listen_loop(self, run):
+        delay, lost = 0.5, False
+        while self._run is run:
+            connection = None
+            try:
+                connection = self._connect()
+                connection.autocommit = True
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                self.connected = True
+                delay = 0.5
+                if lost:
+                    # Events sent while disconnected are gone
+                    self.resyncs += 1
+                    self._resync()
+                    lost = False
+                while self._run is run:
+                    if select.select([connection], [], [], self._poll_interval_s) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        self._dispatch(connection.notifies.pop(0).payload)
+            except Exception as e:
+                self.errors += 1
+                lost = True
+                print(f"Cache events: listener connection failed, retrying in {delay:.1f}s: {e!r}")
+            finally:
+                self.connected = False
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+            if self._run is run and lost:
+                time.sleep(delay)
+                delay = min(delay * 2, self._max_reconnect_delay_s)
+
+    def _dispatch(self, payload):
+        try:
+            event = json.loads(payload)
+            if event.get("o") == self.origin:
+                # Already applied by the write itself
+                return
+            self._handle(event)
+        except Exception as e:
+            self.errors += 1
+            print(f"Cache events: failed to apply {payload}: {e!r}")
+            return
+        self._count(self.received, event.get("k"))
+        if event.get("t"):
+            self.delay_seconds_total += max(0.0, time.time() - event["t"])
+
+    def status(self):
+        """Listener state and event counts, for /metrics."""
+        return {
+            "channel": self.channel,
+            "origin": self.origin,
+            "connected": self.connected,
+            "published": dict(self.published),
+            "received": dict(self.received),
+            "delay_seconds_total": round(self.delay_seconds_total, 6),
+            "errors": self.errors,
+            "resyncs": self.resyncs,
+        }
@@ -0,0 +1,285 @@
+# Query plan regression check
+# Runs the crud functions behind the hot API paths against a seeded database, EXPLAINs
+# every statement they issue and fails when a plan falls back to a sequential scan of
+# a large table or exceeds its cost budget. Everything runs in one transaction that
+# is rolled back, so writes leave no trace.
+#
+# The planner only prefers indexes once tables are big enough, so run it against a
+# database seeded with mock_data_generator.py (at least --min-dishes dishes).
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime, timedelta
+
+# Add the project root to the Python path so imports work correctly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Seq scans of tables the planner estimates at fewer rows than this are fine
+MIN_SEQ_SCAN_ROWS = 1000
+# Total plan cost allowed per statement on a hot path (planner units)
+DEFAULT_MAX_COST = 20000.0
+# Statements worth EXPLAINing; SET LOCAL, SAVEPOINT and friends are skipped
+EXPLAINABLE = ("select", "insert", "update", "delete", "with")
+
+
+class Scenario:
+    """
+    A named call into crud. full_scan marks paths that read whole tables by design
+    (exports, in-memory structure loads, statistics); allow_seq_scan lists tables a
+    path may scan sequentially anyway; max_cost is the per-statement cost budget.
+    """
+
+    def __init__(self, name, run, allow_seq_scan=(), max_cost=DEFAULT_MAX_COST, full_scan=False):
+        self.name = name
+        self.run = run
+        self.allow_seq_scan = frozenset(allow_seq_scan)
+        self.max_cost = None if full_scan else max_cost
+        self.full_scan = full_scan
+
+
+def build_scenarios(crud, schemas, sample):
+    dish_id = sample["dish_id"]
+    name_part = sample["dish_name"][:2]
+
+    def select_pages(db):
+        crud.dish_count_cache.clear()
+        queries = [
+            schemas.DishQuery(),
+            schemas.DishQuery(sort="name"),
+            schemas.DishQuery(sort="newest"),
+            schemas.DishQuery(difficult=2, sort="difficult"),
+            schemas.DishQuery(dish_name=name_part),
+            schemas.DishQuery(dish_name=name_part, fuzzy=True, sort="relevance"),
+            schemas.DishQuery(estimate_total=True),
+        ]
+        for query in queries:
+            _, _, next_after, _, _ = crud.select_dish_cards(db, query)
+            if next_after:
+                # Second page through the keyset cursor, as the frontend scrolls
+                crud.select_dish_cards(db, query.copy(update={"after": next_after}))
+
+    def detail(db):
+        crud.dish_detail_cache.clear()
+        crud.get_dish_detail_validator(db, dish_id)
+        crud.get_dish_with_details(db, dish_id, lookup=False)
+        crud.get_dish_steps(db, dish_id)
+
+    def history(db):
+        crud.get_dish_history_validator(db, dish_id)
+        crud.get_dish_history_by_dish_id(db, dish_id)
+        crud.get_cooking_count_by_dish_id(db, dish_id)
+        crud.get_dish_stats(db, dish_id)
+
+    def analytics(db):
+        now = datetime.now()
+        crud.get_history_analytics(db, "day", dish_id=dish_id)
+        crud.get_history_analytics(db, "week", start=now - timedelta(days=7), end=now)
+
+    def match(db):
+        crud.ensure_ingredient_index()
+        crud.match_dishes_by_ingredients(db, schemas.DishMatchRequest(
+            ingredient_ids=sample["ingredient_ids"], ingredient_names=sample["ingredient_names"]
+        ))
+
+    def writes(db):
+        added = crud.add_dish_with_ingredients_and_steps(db, schemas.DishAddRequest(
+            dish_name="查询计划检查菜品", difficult=1,
+            ingredients=[schemas.DishIngredientCreate(ingredient_name=name, type=1, usage="适量")
+                         for name in sample["ingredient_names"]],
+            steps=[schemas.DishStepCreateForDish(step_order=1, step_text="检查")]
+        ))
+        new_id = added.id
+        crud.update_dish(db, new_id, schemas.DishUpdate(dish_name="查询计划检查菜品2", difficult=2))
+        crud.create_dish_history(db, schemas.DishHistoryCreate(dish_id=new_id, cooking_rating=1))
+        crud.create_dish_step(db, schemas.DishStepCreate(dish_id=new_id, step_order=2, step_text="检查"))
+        crud.delete_dish(db, new_id)
+
+    def export_first_chunk(db):
+        exports = crud.iter_dish_exports(db)
+        try:
+            next(exports, None)
+        finally:
+            exports.close()
+
+    return [
+        Scenario("dish list (/dish/select)", select_pages),
+        Scenario("dish detail", detail),
+        Scenario("cooking history", history),
+        Scenario("history analytics", analytics),
+        # Builds the in-memory index first: one full read of the links by design
+        Scenario("ingredient index load + match", match, full_scan=True),
+        Scenario("dish match (index built)", match),
+        Scenario("recommender load", lambda db: (crud.ensure_recommender(), crud.recommend_dishes(db)),
+                 full_scan=True),
+        Scenario("recommend (recommender built)", lambda db: crud.recommend_dishes(db)),
+        # Unordered first page; the validator counts the whole (small) table
+        Scenario("ingredient list", lambda db: (crud.get_ingredients(db, 0, 20), crud.get_ingredients_validator(db)),
+                 allow_seq_scan={"ingredient"}),
+        Scenario("dish writes", writes),
+        Scenario("export (first chunk)", export_first_chunk, full_scan=True),
+        Scenario("history analytics (all time)", lambda db: crud.get_history_analytics(db, "month"), full_scan=True),
+    ]
+
+
+def load_sample(db):
+    """A cooked dish with steps and a few of its ingredients to aim the scenarios at."""
+    from sqlmodel import select
+    from backend.models import Dish, DishHistory, DishIngredientLink, Ingredient
+
+    dish_id = db.execute(select(DishHistory.dish_id).limit(1)).scalar()
+    if dish_id is None:
+        dish_id = db.execute(select(Dish.id).order_by(Dish.id).limit(1)).scalar()
+    dish_name = db.execute(select(Dish.dish_name).where(Dish.id == dish_id)).scalar()
+    ingredients = db.execute(
+        select(Ingredient.id, Ingredient.ingredient_name)
+        .join(DishIngredientLink, DishIngredientLink.ingredient_id == Ingredient.id)
+        .where(DishIngredientLink.dish_id == dish_id).limit(3)
+    ).all()
+    return {
+        "dish_id": dish_id,
+        "dish_name": dish_name or "",
+        "ingredient_ids": [row[0] for row in ingredients],
+        "ingredient_names": [row[1] for row in ingredients],
+    }
+
+
+def walk(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk(child)
+
+
+def table_rows(connection):
+    """Planner row estimates of the application tables, by name."""
+    from sqlalchemy import text
+    result = connection.execute(text(
+        "SELECT relname, reltuples FROM pg_class WHERE relkind = 'r' "
+        "AND relnamespace = 'public'::regnamespace"
+    )).all()
+    return {name: estimate for name, estimate in result}
+
+
+def check_statement(cursor, statement, parameters, scenario, row_estimates):
+    """EXPLAIN one statement; returns (plan cost, list of problems)."""
+    sql = cursor.mogrify(statement, parameters).decode()
+    cursor.execute("EXPLAIN (FORMAT JSON) " + sql)
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    root = plan[0]["Plan"]
+
+    problems = []
+    if not scenario.full_scan:
+        for node in walk(root):
+            relation = node.get("Relation Name")
+            if node["Node Type"] != "Seq Scan" or relation in scenario.allow_seq_scan:
+                continue
+            estimated = row_estimates.get(relation, 0)
+            if estimated >= MIN_SEQ_SCAN_ROWS:
+                problems.append(f"Seq Scan on {relation} (~{int(estimated)} rows)")
+    cost = root["Total Cost"]
+    if scenario.max_cost is not None and cost > scenario.max_cost:
+        problems.append(f"cost {cost:.0f} over budget {scenario.max_cost:.0f}")
+    return cost, problems
+
+
+def check(env=None, min_dishes=10000, max_cost=DEFAULT_MAX_COST, analyze=False, verbose=False):
+    """
+    Check the query plans of every scenario
+    :param env: Environment to use ('dev', 'prod', etc.). If None, uses default or ENV variable
+    :param min_dishes: Refuse to run on a database with fewer dishes than this
+    :param max_cost: Per-statement cost budget of the hot paths
+    :param analyze: Run ANALYZE first, e.g. right after seeding
+    :param verbose: Print every statement with its cost
+    :return: True if no plan regressed
+    """
+    if env is not None:
+        os.environ['ENV'] = env
+    elif 'ENV' not in os.environ:
+        os.environ['ENV'] = 'dev'
+
+    # Import after ENV is set so the right database is selected
+    from sqlalchemy import event, func, text
+    from sqlmodel import select
+    from backend.database import get_engine, SessionLocal
+    from backend.models import Dish
+    from backend import crud, schemas
+
+    engine = get_engine()
+    connection = engine.connect()
+    outer = connection.begin()
+    # crud commits end the SAVEPOINT, not the outer transaction; start a new one each time
+    db = SessionLocal(bind=connection)
+    db.begin_nested()
+
+    @event.listens_for(db, "after_transaction_end")
+    def restart_savepoint(session, transaction):
+        if transaction.nested and not transaction._parent.nested:
+            session.begin_nested()
+
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().lower().startswith(EXPLAINABLE):
+            captured.append((statement, parameters[0] if executemany else parameters))
+
+    failures = 0
+    try:
+        if analyze:
+            connection.execute(text("ANALYZE"))
+        dish_count = db.execute(select(func.count()).select_from(Dish)).scalar_one()
+        if dish_count < min_dishes:
+            print(f"Only {dish_count} dishes in {os.environ['ENV']}; seed at least {min_dishes} "
+                  f"(mock_data_generator.py) so the planner behaves as in production")
+            return False
+
+        sample = load_sample(db)
+        row_estimates = table_rows(connection)
+        cursor = connection.connection.cursor()
+        for scenario in build_scenarios(crud, schemas, sample):
+            if scenario.max_cost == DEFAULT_MAX_COST:
+                scenario.max_cost = max_cost
+            captured.clear()
+            event.listen(engine, "before_cursor_execute", capture)
+            try:
+                scenario.run(db)
+            finally:
+                event.remove(engine, "before_cursor_execute", capture)
+
+            worst, problems = 0.0, []
+            for statement, parameters in captured:
+                cost, statement_problems = check_statement(cursor, statement, parameters, scenario, row_estimates)
+                worst = max(worst, cost)
+                if verbose:
+                    print(f"    {cost:>10.1f}  {' '.join(statement.split())[:100]}")
+                problems += [(problem, statement) for problem in statement_problems]
+
+            status = "FAIL" if problems else "ok"
+            print(f"{status:<6}{scenario.name:<40}{len(captured):>4} statements, max cost {worst:.0f}")
+            for problem, statement in problems:
+                print(f"      {problem}\n        {' '.join(statement.split())[:300]}")
+            failures += bool(problems)
+    finally:
+        db.close()
+        outer.rollback()
+        connection.close()
+
+    print(f"{failures} scenario(s) with plan regressions" if failures else "All query plans ok")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Check the query plans of GoCooking 3 hot paths')
+    parser.add_argument('--env', '-e', type=str, default='dev',
+                        choices=['dev', 'development', 'prod', 'production'],
+                        help='Environment to check (default: dev)')
+    parser.add_argument('--min-dishes', type=int, default=10000,
+                        help='Minimum number of seeded dishes (default: 10000)')
+    parser.add_argument('--max-cost', type=float, default=DEFAULT_MAX_COST,
+                        help=f'Per-statement cost budget of hot paths (default: {DEFAULT_MAX_COST:.0f})')
+    parser.add_argument('--analyze', action='store_true', help='Run ANALYZE before checking')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Print every statement with its cost')
+    args = parser.parse_args()
+    sys.exit(0 if check(args.env, args.min_dishes, args.max_cost, args.analyze, args.verbose) else 1)
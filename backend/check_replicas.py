@@ -0,0 +1,120 @@
+# Read replica routing check
+# Verifies DATABASE_REPLICA_URLS against the running servers: every replica answers
+# and passes the lag check, read-only sessions are spread round-robin over the
+# replicas, a client that has just written reads from the primary, and reads fall
+# back to the primary when no replica passes the lag guard.
+#
+# Two independent local instances are enough to exercise the routing, e.g.
+#   DATABASE_URL=postgresql://postgres:pw@localhost:5432/go_cooking_3_dev
+#   DATABASE_REPLICA_URLS=postgresql://postgres:pw@localhost:5433/go_cooking_3_dev
+
+import os
+import sys
+import argparse
+
+# Add the project root to the Python path so imports work correctly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# current_setting('port') also tells apart local instances reached over a Unix socket
+SERVER_IDENTITY_SQL = "SELECT inet_server_addr(), current_setting('port'), current_database()"
+
+
+def check(env=None, reads=20):
+    """
+    Check the replica routing
+    :param env: Environment to use ('dev', 'prod', etc.). If None, uses default or ENV variable
+    :param reads: Read-only sessions to route
+    :return: True if every check passed
+    """
+    if env is not None:
+        os.environ['ENV'] = env
+    elif 'ENV' not in os.environ:
+        os.environ['ENV'] = 'dev'
+    # The routing decision is the same in both driver modes; check it with psycopg2
+    os.environ['DB_ASYNC'] = '0'
+
+    # Import after ENV is set so the right database is selected
+    from sqlalchemy import text
+    from starlette.requests import Request
+    from starlette.responses import Response
+    from backend.database import get_engine, read_session, write_session, replica_router
+
+    if replica_router is None:
+        print("DATABASE_REPLICA_URLS is not set; nothing to check")
+        return False
+
+    def identity(engine):
+        with engine.connect() as connection:
+            return tuple(connection.execute(text(SERVER_IDENTITY_SQL)).one())
+
+    def served_by(request):
+        """Identity of the server behind one read-only session for request."""
+        dependency = read_session(request, Response())
+        db = next(dependency)
+        try:
+            return tuple(db.execute(text(SERVER_IDENTITY_SQL)).one())
+        finally:
+            dependency.close()
+
+    def request_with(headers=()):
+        return Request({"type": "http", "headers": [(name.encode(), value.encode()) for name, value in headers]})
+
+    failures = 0
+
+    def report(ok, message):
+        nonlocal failures
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':<6}{message}")
+
+    primary = identity(get_engine())
+    replica_router.start()
+    replica_router.check_all()
+    names = {primary: "primary"}
+    for replica in replica_router.replicas:
+        status = replica_router.status()[replica.name]
+        report(replica.healthy, f"{replica.name} {status['url']}: in recovery {status['in_recovery']}, "
+                                f"lag {status['lag_seconds']}s" + (f", {status['error']}" if status['error'] else ""))
+        if replica.check_engine is not None and replica.healthy:
+            names[identity(replica.check_engine)] = replica.name
+    report(len(names) == len(replica_router.replicas) + 1, "primary and replicas are distinct servers")
+
+    counts = {}
+    for _ in range(reads):
+        name = names.get(served_by(request_with()), "unknown")
+        counts[name] = counts.get(name, 0) + 1
+    healthy = [replica.name for replica in replica_router.replicas if replica.healthy]
+    expected = {name: reads // len(healthy) for name in healthy} if healthy else {"primary": reads}
+    report(all(abs(counts.get(name, 0) - count) <= 1 for name, count in expected.items()),
+           f"{reads} reads routed round-robin: {counts}")
+
+    # A write response hands the client its read-your-writes window
+    write_response = Response()
+    dependency = write_session(request_with(), write_response)
+    next(dependency)
+    dependency.close()
+    cookie = write_response.headers.get("set-cookie", "").split(";")[0]
+    report(bool(cookie), f"write response sets {cookie or 'no read-your-writes cookie'}")
+    report(served_by(request_with([("cookie", cookie)])) == primary, "read after a write goes to the primary")
+
+    # Lag guard: no replica within the limit means every read goes to the primary
+    max_lag_s = replica_router.max_lag_s
+    replica_router.max_lag_s = -1.0
+    try:
+        replica_router.check_all()
+        report(served_by(request_with()) == primary, "reads fall back to the primary when every replica lags")
+    finally:
+        replica_router.max_lag_s = max_lag_s
+        replica_router.check_all()
+
+    print(f"{failures} check(s) failed" if failures else "Replica routing ok")
+    return failures == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Check the read replica routing of GoCooking 3')
+    parser.add_argument('--env', '-e', type=str, default='dev',
+                        choices=['dev', 'development', 'prod', 'production'],
+                        help='Environment to check (default: dev)')
+    parser.add_argument('--reads', type=int, default=20, help='Read-only sessions to route (default: 20)')
+    args = parser.parse_args()
+    sys.exit(0 if check(args.env, args.reads) else 1)
@@ -1,15 +1,120 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, func
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import Float, cast, or_, func, tuple_, text, insert, literal_column
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlmodel import select
-from typing import Optional
-import sys
-import os
+from typing import Optional, List, Tuple
+from datetime import datetime
+import base64
+import binascii
+import json
+import threading
 
-# Add the parent directory to sys.path to allow imports
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from backend.models import Dish, Ingredient, DishStep, DishIngredientLink, DishHistory
+from backend.models import Dish, Ingredient, DishStep, DishIngredientLink, DishHistory, DishStats, DishCard
 from backend import schemas
+from backend.cache import CountCache, CacheBackend, LRUTTLCache
+from backend.cache_events import CacheEventBus
+from backend.ingredient_index import IngredientIndex
+from backend.recommender import Recommender
+from backend.session_hooks import on_commit
+from backend.database import (
+    DISH_COUNT_CACHE_TTL, DISH_DETAIL_CACHE_MAX_BYTES, DISH_DETAIL_CACHE_TTL, INGREDIENT_INDEX_TTL, RECOMMENDER_TTL,
+    DB_CACHE_EVENTS, DB_CACHE_EVENTS_CHANNEL, DB_STATEMENT_TIMEOUT_LOAD_MS, SessionLocal, after_replica_lag,
+    cache_event_connection
+)
+
+# Totals of /dish/select per filter; cleared by every dish write
+dish_count_cache = CountCache(ttl_seconds=DISH_COUNT_CACHE_TTL)
+# /dish/detail/{id} (payload, validator) pairs keyed by dish id; see set_dish_detail_cache to swap the backend
+dish_detail_cache = LRUTTLCache(max_bytes=DISH_DETAIL_CACHE_MAX_BYTES, ttl_seconds=DISH_DETAIL_CACHE_TTL)
+# ingredient -> dishes postings for /dish/match; dish writes update it on commit
+ingredient_index = IngredientIndex(ttl_seconds=INGREDIENT_INDEX_TTL)
+_ingredient_index_build_lock = threading.Lock()
+# Dish x feature matrix for /dish/recommend; history and dish writes update it on commit
+recommender = Recommender(ttl_seconds=RECOMMENDER_TTL)
+_recommender_build_lock = threading.Lock()
+
+
+def _drop_dish_caches(dish_id: Optional[int]):
+    dish_count_cache.clear()
+    if dish_id is not None:
+        dish_detail_cache.delete(dish_id)
+
+
+def _invalidate_dish(dish_id: Optional[int] = None):
+    """Drop cached reads affected by a committed dish write; no dish_id for a new dish."""
+    _drop_dish_caches(dish_id)
+    # A lagging read replica can still return the old rows and put them back in the
+    # caches; drop them again once the replicas have the write
+    after_replica_lag(_drop_dish_caches, dish_id)
+
+
+def _drop_all_caches():
+    """Forget everything cached from the database, e.g. after missing cache events."""
+    dish_count_cache.clear()
+    dish_detail_cache.clear()
+    ingredient_index.expire()
+    recommender.expire()
+
+
+def _add_created_dishes(dish_ids: List[int]):
+    """Apply dishes created by another process to the in-memory structures already built."""
+    if not (ingredient_index.built or recommender.built):
+        return
+    statement = select(
+        DishIngredientLink.dish_id, DishIngredientLink.ingredient_id, Ingredient.type
+    ).join(Ingredient, Ingredient.id == DishIngredientLink.ingredient_id).where(
+        DishIngredientLink.dish_id.in_(dish_ids)
+    )
+    with SessionLocal() as db:
+        links = [tuple(row) for row in db.execute(statement)]
+    ingredient_index.add_dishes(links)
+    recommender.add_dishes(links, dish_ids)
+
+
+def _apply_cache_event(event: dict):
+    """
+    Apply a write of another process to the caches of this one (see cache_events).
+    The same changes the write made here after commit, from the event alone where it
+    carries enough; "ids" is None when there were too many to send.
+    """
+    kind, dish_ids = event["k"], event.get("ids")
+    if kind == "ingredient_created":
+        # Nothing cached here refers to an ingredient before a dish links it
+        return
+    if dish_ids is None:
+        _drop_all_caches()
+        return
+    if kind == "dish_created":
+        _invalidate_dish()
+        _add_created_dishes(dish_ids)
+    elif kind == "dish_updated":
+        for dish_id in dish_ids:
+            _invalidate_dish(dish_id)
+    elif kind == "dish_deleted":
+        for dish_id in dish_ids:
+            ingredient_index.remove_dish(dish_id)
+            recommender.remove_dish(dish_id)
+            _invalidate_dish(dish_id)
+    elif kind == "dish_cooked":
+        recommender.record_cooking(event["history_id"], dish_ids[0], event["rating"],
+                                   datetime.fromisoformat(event["cooking_time"]))
+    else:
+        # Sent by a newer version of this module
+        _drop_all_caches()
+
+
+# Tells the other API processes about the writes below; each process listens from its
+# startup warmup on (see backend/warmup.py)
+cache_event_bus = CacheEventBus(
+    DB_CACHE_EVENTS_CHANNEL, cache_event_connection, _apply_cache_event, _drop_all_caches
+) if DB_CACHE_EVENTS else None
+
+
+def _publish(db: Session, kind: str, ids: Optional[List[int]] = None, **fields):
+    """Send a cache event to the other processes when the transaction of db commits."""
+    if cache_event_bus is not None:
+        cache_event_bus.publish(db, kind, ids, **fields)
 
 
 def get_dish(db: Session, dish_id: int):
@@ -18,11 +123,34 @@ def get_dish(db: Session, dish_id: int):
     return result.scalar_one_or_none()
 
 
-def get_dishes(db: Session, skip: int = 0, limit: int = 10, dish_name: str = "", difficult: Optional[int] = None):
+def _escape_like(value: str):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def dish_name_filter(dish_name: str, fuzzy: bool = False, column=Dish.dish_name):
+    """
+    Shared dish name search predicate: case-insensitive substring match that the
+    pg_trgm GIN index (ix_dish_dish_name_trgm) can serve despite the leading wildcard.
+    With fuzzy=True, names within the pg_trgm similarity threshold match as well, so
+    a typo still finds the dish.
+    """
+    # Backslash is PostgreSQL's default LIKE escape character
+    predicate = column.ilike(f"%{_escape_like(dish_name)}%")
+    if fuzzy:
+        predicate = or_(predicate, column.op("%")(dish_name))
+    return predicate
+
+
+def dish_name_rank(dish_name: str, column=Dish.dish_name):
+    """Trigram similarity of the dish name to the search text, higher is closer."""
+    return func.similarity(column, dish_name)
+
+
+def get_dishes(db: Session, skip: int = 0, limit: int = 10, dish_name: str = "", difficult: Optional[int] = None,
+               fuzzy: bool = False):
     statement = select(Dish)
     if dish_name:
-        # statement = statement.where(Dish.dish_name.contains(dish_name))
-        statement = statement.where(Dish.dish_name.ilike(f"%{dish_name}%"))
+        statement = statement.where(dish_name_filter(dish_name, fuzzy))
     if difficult is not None:
         statement = statement.where(Dish.difficult == difficult)
     statement = statement.offset(skip).limit(limit)
@@ -31,20 +159,224 @@ def get_dishes(db: Session, skip: int = 0, limit: int = 10, dish_name: str = "",
     return dishes
 
 
-def get_dish_count(db: Session, dish_name: str = "", difficult: Optional[int] = None):
+def get_dish_count(db: Session, dish_name: str = "", difficult: Optional[int] = None, fuzzy: bool = False):
     statement = select(func.count(Dish.id))
     if dish_name:
-        statement = statement.where(Dish.dish_name.contains(dish_name))
+        statement = statement.where(dish_name_filter(dish_name, fuzzy))
     if difficult is not None:
         statement = statement.where(Dish.difficult == difficult)
     result = db.execute(statement)
     return result.scalar_one()
 
 
+ESTIMATED_DISH_COUNT_SQL = text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'dish_card'::regclass")
+
+
+def get_estimated_dish_count(db: Session):
+    """
+    Planner row estimate of dish_card (the unfiltered /dish/select total), or None while
+    the table has never been analyzed (reltuples is -1 then).
+    """
+    estimate = db.execute(ESTIMATED_DISH_COUNT_SQL).scalar_one_or_none()
+    if estimate is None or estimate < 0:
+        return None
+    return estimate
+
+
+# Sort options of the dish list: sort name -> (sort key column, descending).
+# DishCard.dish_id always breaks ties, so every order is total and stable across pages.
+DISH_SORTS = {
+    None: (None, False),
+    "name": (DishCard.dish_name, False),
+    "newest": (DishCard.create_time, True),
+    "difficult": (DishCard.difficult, False),
+}
+
+
+def _dish_sort_key(query: schemas.DishQuery):
+    if query.sort == "relevance":
+        if query.dish_name:
+            # similarity() is float4. As float8 the score a cursor carries (a Python
+            # float) compares equal to the row's own score, so ties on it keep their order.
+            return cast(dish_name_rank(query.dish_name, DishCard.dish_name), Float(53)), True
+        return None, False
+    return DISH_SORTS[query.sort]
+
+
+def _dish_cursor_search(query: schemas.DishQuery):
+    """Search text a cursor of this query is bound to: relevance scores only hold for it."""
+    return query.dish_name if query.sort == "relevance" and query.dish_name else None
+
+
+def encode_dish_cursor(sort: Optional[str], key, dish_id: int, search: Optional[str] = None):
+    """Opaque keyset cursor for the row after which the next page starts."""
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    fields = [sort, key, dish_id] if search is None else [sort, key, dish_id, search]
+    payload = json.dumps(fields, separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_dish_cursor(token: str, sort: Optional[str], search: Optional[str] = None):
+    """Inverse of encode_dish_cursor; raises ValueError for malformed or mismatched tokens."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        cursor_sort, key, dish_id, *cursor_search = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort or not isinstance(dish_id, int):
+        raise ValueError("Cursor does not belong to this sort order")
+    if cursor_search != ([] if search is None else [search]):
+        raise ValueError("Cursor does not belong to this search")
+    if sort == "newest" and key is not None:
+        key = datetime.fromisoformat(key)
+    return key, dish_id
+
+
+def select_dish_cards(db: Session, query: schemas.DishQuery):
+    """
+    One page of dish cards for the home page list, plus the total matching count, the
+    keyset cursor of the next page (None on the last page), whether the total is a
+    planner estimate and the (last_modified, version) validator of the page.
+    Each card carries up to three main ingredients (type == 1) as display tags.
+
+    With query.after set, the page starts right after the cursor row instead of at
+    page * size, so deep pages cost the same as the first one and rows inserted
+    meanwhile cannot shift the page boundaries.
+
+    The total comes from, in order: the planner estimate (estimate_total on an
+    unfiltered listing), dish_count_cache, a window count on the page statement, and
+    finally a separate COUNT.
+    """
+    key_column, descending = _dish_sort_key(query)
+    count_key = (query.dish_name or "", bool(query.fuzzy and query.dish_name), query.difficult)
+    count_generation = dish_count_cache.generation
+    unfiltered = not query.dish_name and query.difficult is None
+
+    total, estimated = None, False
+    if query.estimate_total and unfiltered:
+        total = get_estimated_dish_count(db)
+        estimated = total is not None
+    if total is None:
+        total = dish_count_cache.get(count_key)
+    # On a cache miss in offset mode the total rides along with the page as a window
+    # count (one round trip); the keyset boundary would distort it in cursor mode.
+    window_total = total is None and not query.after
+
+    card_id = DishCard.dish_id
+    columns = [card_id, DishCard.dish_name, DishCard.difficult, DishCard.main_ingredients, DishCard.modify_time]
+    if key_column is not None:
+        columns.append(key_column)
+    if window_total:
+        columns.append(func.count().over())
+    # Plain column rows from the card projection: one indexed query, no ORM objects
+    statement = select(*columns)
+    if query.dish_name:
+        statement = statement.where(dish_name_filter(query.dish_name, query.fuzzy, DishCard.dish_name))
+    if query.difficult is not None:
+        statement = statement.where(DishCard.difficult == query.difficult)
+
+    if query.after:
+        key_value, last_id = decode_dish_cursor(query.after, query.sort, _dish_cursor_search(query))
+        if key_column is None:
+            boundary = card_id < last_id if descending else card_id > last_id
+        elif descending:
+            boundary = tuple_(key_column, card_id) < tuple_(key_value, last_id)
+        else:
+            boundary = tuple_(key_column, card_id) > tuple_(key_value, last_id)
+        statement = statement.where(boundary)
+    else:
+        statement = statement.offset(query.page * query.size)
+
+    if key_column is None:
+        order = [card_id.desc() if descending else card_id]
+    else:
+        order = [key_column.desc(), card_id.desc()] if descending else [key_column, card_id]
+    # One extra row tells whether another page exists
+    statement = statement.order_by(*order).limit(query.size + 1)
+    rows = db.execute(statement).all()
+
+    if window_total and rows:
+        total = rows[0][-1]
+    next_after = None
+    if len(rows) > query.size:
+        rows = rows[:query.size]
+        last = rows[-1]
+        next_after = encode_dish_cursor(query.sort, None if key_column is None else last[5], last[0],
+                                        _dish_cursor_search(query))
+
+    if total is None:
+        # Cursor mode, or an offset past the last row
+        statement = select(func.count()).select_from(DishCard)
+        if query.dish_name:
+            statement = statement.where(dish_name_filter(query.dish_name, query.fuzzy, DishCard.dish_name))
+        if query.difficult is not None:
+            statement = statement.where(DishCard.difficult == query.difficult)
+        total = db.execute(statement).scalar_one()
+        dish_count_cache.set(count_key, total, count_generation)
+    elif window_total:
+        dish_count_cache.set(count_key, total, count_generation)
+
+    # Limit to first 3 main ingredients for display
+    dish_cards = [
+        {
+            "id": row[0],
+            "dish_name": row[1],
+            "difficult": row[2],
+            "main_ingredients": (row[3] or [])[:3]
+        }
+        for row in rows
+    ]
+
+    # Validator of the page: any card write bumps its modify_time, any insert or
+    # delete that matters shows up in the row ids or the total
+    last_modified = max((row[4] for row in rows if row[4] is not None), default=None)
+    version = (total, next_after, tuple((row[0], row[4]) for row in rows))
+
+    return dish_cards, total, next_after, estimated, (last_modified, version)
+
+
+# Rebuilds the dish_card rows selected by {where}
+REFRESH_DISH_CARDS_SQL = """
+    INSERT INTO dish_card (dish_id, dish_name, difficult, main_ingredients, create_time, modify_time)
+    SELECT d.id, d.dish_name, d.difficult,
+           coalesce((SELECT array_agg(i.ingredient_name ORDER BY i.id)
+                     FROM dish_ingredients l JOIN ingredient i ON i.id = l.ingredient_id
+                     WHERE l.dish_id = d.id AND i.type = 1), '{{}}'),
+           d.create_time, CURRENT_TIMESTAMP
+    FROM dish d
+    WHERE {where}
+    ON CONFLICT (dish_id) DO UPDATE SET
+        dish_name = EXCLUDED.dish_name,
+        difficult = EXCLUDED.difficult,
+        main_ingredients = EXCLUDED.main_ingredients,
+        create_time = EXCLUDED.create_time,
+        modify_time = CURRENT_TIMESTAMP
+"""
+
+
+def refresh_dish_cards(db: Session, dish_ids: Optional[List[int]] = None):
+    """
+    Rewrite the card projection of the given dishes from dish, dish_ingredients and
+    ingredient, inside the caller's transaction (no commit). dish_ids=None refreshes
+    every card. Deleting a dish removes its card through ON DELETE CASCADE.
+    """
+    db.flush()
+    if dish_ids is None:
+        db.execute(text(REFRESH_DISH_CARDS_SQL.format(where="TRUE")))
+    else:
+        db.execute(text(REFRESH_DISH_CARDS_SQL.format(where="d.id = ANY(:dish_ids)")), {"dish_ids": list(dish_ids)})
+
+
 def create_dish(db: Session, dish: schemas.DishCreate):
     db_dish = Dish(dish_name=dish.dish_name, difficult=dish.difficult)
     db.add(db_dish)
+    db.flush()
+    refresh_dish_cards(db, [db_dish.id])
+    on_commit(db, recommender.add_dishes, [], [db_dish.id])
+    _publish(db, "dish_created", [db_dish.id])
     db.commit()
+    _invalidate_dish()
     db.refresh(db_dish)
     return db_dish
 
@@ -57,7 +389,10 @@ def update_dish(db: Session, dish_id: int, dish: schemas.DishUpdate):
     db_dish.dish_name = dish.dish_name
     db_dish.difficult = dish.difficult
     db.add(db_dish)
+    refresh_dish_cards(db, [dish_id])
+    _publish(db, "dish_updated", [dish_id])
     db.commit()
+    _invalidate_dish(dish_id)
     db.refresh(db_dish)
     return db_dish
 
@@ -68,7 +403,11 @@ def delete_dish(db: Session, dish_id: int):
         return False
 
     db.delete(db_dish)
+    on_commit(db, ingredient_index.remove_dish, dish_id)
+    on_commit(db, recommender.remove_dish, dish_id)
+    _publish(db, "dish_deleted", [dish_id])
     db.commit()
+    _invalidate_dish(dish_id)
     return True
 
 
@@ -84,12 +423,29 @@ def get_ingredients(db: Session, skip: int = 0, limit: int = 10):
     return result.scalars().all()
 
 
+def get_ingredients_validator(db: Session):
+    """(last_modified, version) of the ingredient table, for the ingredient list."""
+    statement = select(func.max(Ingredient.modify_time), func.count()).select_from(Ingredient)
+    last_modified, count = db.execute(statement).one()
+    return last_modified, (last_modified, count)
+
+
 def create_ingredient(db: Session, ingredient: schemas.IngredientCreate):
-    db_ingredient = Ingredient(ingredient_name=ingredient.ingredient_name, type=ingredient.type)
-    db.add(db_ingredient)
+    """
+    Create an ingredient, or return the existing one with the same normalized name.
+    """
+    name_key = normalize_ingredient_name(ingredient.ingredient_name)
+    table = Ingredient.__table__
+    statement = pg_insert(table).values(
+        ingredient_name=ingredient.ingredient_name.strip(), type=ingredient.type, name_key=name_key
+    ).on_conflict_do_nothing(index_elements=[table.c.name_key]).returning(table.c.id)
+    # A row only comes back when the ingredient is new
+    ingredient_id = db.execute(statement).scalar_one_or_none()
+    if ingredient_id is not None:
+        _publish(db, "ingredient_created", [ingredient_id])
     db.commit()
-    db.refresh(db_ingredient)
-    return db_ingredient
+    statement = select(Ingredient).where(Ingredient.name_key == name_key)
+    return db.execute(statement).scalar_one()
 
 
 def get_dish_step(db: Session, step_id: int):
@@ -111,25 +467,83 @@ def create_dish_step(db: Session, step: schemas.DishStepCreate):
         step_text=step.step_text
     )
     db.add(db_step)
+    _publish(db, "dish_updated", [step.dish_id])
     db.commit()
+    _invalidate_dish(step.dish_id)
     db.refresh(db_step)
     return db_step
 
 
-def get_dish_with_details(db: Session, dish_id: int):
-    # Get dish with relationships preloaded
-    dish = get_dish(db, dish_id)
-    if not dish:
+def get_dish_with_details(db: Session, dish_id: int, lookup: bool = True):
+    """
+    Dish detail payload, read through dish_detail_cache. The returned dict is shared
+    with other requests and must not be modified. lookup=False skips the cache read
+    (the caller already missed it) but still fills the cache.
+    """
+    generation = dish_detail_cache.generation
+    entry = dish_detail_cache.get(dish_id) if lookup else None
+    if entry is None:
+        entry = _build_dish_detail(db, dish_id)
+        if entry is None:
+            return None
+        dish_detail_cache.set(dish_id, entry, generation)
+    return entry[0]
+
+
+DISH_DETAIL_VERSION_SQL = text("""
+    SELECT d.modify_time,
+           (SELECT max(greatest(i.modify_time, l.modify_time))
+            FROM dish_ingredients l JOIN ingredient i ON i.id = l.ingredient_id
+            WHERE l.dish_id = d.id),
+           (SELECT count(*) FROM dish_ingredients l WHERE l.dish_id = d.id),
+           (SELECT max(s.modify_time) FROM dish_step s WHERE s.dish_id = d.id),
+           (SELECT count(*) FROM dish_step s WHERE s.dish_id = d.id)
+    FROM dish d
+    WHERE d.id = :dish_id
+""")
+
+
+def _latest(*times):
+    return max((t for t in times if t is not None), default=None)
+
+
+def _detail_validator(dish_id, dish_time, ingredient_time, ingredient_count, step_time, step_count):
+    last_modified = _latest(dish_time, ingredient_time, step_time)
+    return last_modified, (dish_id, last_modified, ingredient_count, step_count)
+
+
+def get_dish_detail_validator(db: Session, dish_id: int):
+    """
+    (last_modified, version, detail) of the dish detail payload, or None if the dish
+    does not exist. Taken from the cache entry when there is one, otherwise from one
+    aggregate query; both cover the dish row, its ingredient links (usage changes bump
+    the link's modify_time), the ingredients and the steps. detail is the cached
+    payload, or None on a cache miss: the caller then loads it with
+    get_dish_with_details(..., lookup=False), so a request reads the cache once.
+    """
+    entry = dish_detail_cache.get(dish_id)
+    if entry is not None:
+        detail, (last_modified, version) = entry
+        return last_modified, version, detail
+
+    row = db.execute(DISH_DETAIL_VERSION_SQL, {"dish_id": dish_id}).first()
+    if row is None:
         return None
+    return *_detail_validator(dish_id, *row), None
+
+
+def set_dish_detail_cache(backend: CacheBackend):
+    """Replace the dish detail cache backend (any cache.CacheBackend implementation)."""
+    global dish_detail_cache
+    dish_detail_cache = backend
 
-    # Load both ingredients and dish_ingredients relationships
-    from sqlalchemy.orm import selectinload
 
-    # Get dish with ingredients and dish_ingredients
-    from sqlmodel import select
+def _build_dish_detail(db: Session, dish_id: int):
+    # The dish, then one selectinload query per relationship level: everything the
+    # payload reads is loaded up front, with no lazy load per row
     statement = select(Dish).options(
-        selectinload(Dish.ingredients),
-        selectinload(Dish.dish_ingredients).selectinload(DishIngredientLink.ingredient)
+        selectinload(Dish.dish_ingredients).selectinload(DishIngredientLink.ingredient),
+        selectinload(Dish.steps)
     ).where(Dish.id == dish_id)
 
     result = db.execute(statement)
@@ -154,15 +568,106 @@ def get_dish_with_details(db: Session, dish_id: int):
     # Sort ingredients by type
     sorted_ingredients = sorted(ingredients_with_usage, key=lambda x: x['type'])
 
-    return {
+    # The same validator DISH_DETAIL_VERSION_SQL computes, from the rows already loaded
+    validator = _detail_validator(
+        dish.id,
+        dish.modify_time,
+        _latest(*(t for link in dish.dish_ingredients for t in (link.modify_time, link.ingredient.modify_time))),
+        len(dish.dish_ingredients),
+        _latest(*(step.modify_time for step in dish.steps)),
+        len(dish.steps)
+    )
+
+    detail = {
         "id": dish.id,
         "dish_name": dish.dish_name,
         "difficult": dish.difficult,
         "ingredients": sorted_ingredients,
-        "steps": dish.steps,
+        # Plain dicts rather than ORM objects, so the payload can outlive the session in the cache
+        "steps": [
+            {
+                "id": step.id,
+                "dish_id": step.dish_id,
+                "step_order": step.step_order,
+                "step_text": step.step_text,
+                "create_time": step.create_time,
+                "modify_time": step.modify_time
+            }
+            for step in sorted(dish.steps, key=lambda step: (step.step_order, step.id))
+        ],
         "create_time": dish.create_time,
         "modify_time": dish.modify_time
     }
+    return detail, validator
+
+
+def iter_dish_exports(db: Session, since: Optional[datetime] = None, chunk_size: int = 500):
+    """
+    Yield every dish in id order in the dish detail shape, for full-catalog exports.
+
+    Dishes are read through a server-side cursor chunk_size rows at a time; the links
+    and steps of each chunk are loaded with one query each, so memory stays flat and
+    the number of queries grows with the number of chunks, not of dishes.
+    since limits the export to dishes whose row, ingredient links, ingredients or
+    steps were modified at or after that time.
+    """
+    statement = select(Dish.id, Dish.dish_name, Dish.difficult, Dish.create_time, Dish.modify_time)
+    if since is not None:
+        changed_link = select(DishIngredientLink.dish_id).join(
+            Ingredient, Ingredient.id == DishIngredientLink.ingredient_id
+        ).where(
+            DishIngredientLink.dish_id == Dish.id,
+            or_(DishIngredientLink.modify_time >= since, Ingredient.modify_time >= since)
+        )
+        changed_step = select(DishStep.id).where(DishStep.dish_id == Dish.id, DishStep.modify_time >= since)
+        statement = statement.where(or_(Dish.modify_time >= since, changed_link.exists(), changed_step.exists()))
+    statement = statement.order_by(Dish.id).execution_options(stream_results=True, yield_per=chunk_size)
+
+    for dishes in db.execute(statement).partitions():
+        dish_ids = [dish.id for dish in dishes]
+
+        ingredients = {dish_id: [] for dish_id in dish_ids}
+        link_statement = select(
+            DishIngredientLink.dish_id, Ingredient.id, Ingredient.ingredient_name, Ingredient.type,
+            DishIngredientLink.usage, Ingredient.create_time, Ingredient.modify_time
+        ).join(Ingredient, Ingredient.id == DishIngredientLink.ingredient_id).where(
+            DishIngredientLink.dish_id.in_(dish_ids)
+        ).order_by(DishIngredientLink.dish_id, Ingredient.type, Ingredient.id)
+        for row in db.execute(link_statement):
+            ingredients[row[0]].append({
+                "id": row[1],
+                "ingredient_name": row[2],
+                "type": row[3],
+                "usage": row[4],
+                "create_time": row[5],
+                "modify_time": row[6]
+            })
+
+        steps = {dish_id: [] for dish_id in dish_ids}
+        step_statement = select(
+            DishStep.id, DishStep.dish_id, DishStep.step_order, DishStep.step_text,
+            DishStep.create_time, DishStep.modify_time
+        ).where(DishStep.dish_id.in_(dish_ids)).order_by(DishStep.dish_id, DishStep.step_order)
+        for row in db.execute(step_statement):
+            steps[row[1]].append({
+                "id": row[0],
+                "dish_id": row[1],
+                "step_order": row[2],
+                "step_text": row[3],
+                "create_time": row[4],
+                "modify_time": row[5]
+            })
+
+        for dish in dishes:
+            yield {
+                "id": dish.id,
+                "dish_name": dish.dish_name,
+                "difficult": dish.difficult,
+                "ingredients": ingredients[dish.id],
+                "steps": steps[dish.id],
+                "create_time": dish.create_time,
+                "modify_time": dish.modify_time
+            }
 
 
 def add_dish_with_ingredients_and_steps(db: Session, dish_data: schemas.DishAddRequest):
@@ -170,74 +675,306 @@ def add_dish_with_ingredients_and_steps(db: Session, dish_data: schemas.DishAddR
     Add a new dish with its ingredients and steps.
     This function creates the dish, checks for existing ingredients, creates new ones if needed,
     establishes relationships between dish and ingredients with usage, and adds the cooking steps.
+    Ingredients resolve by normalized name with one IN query plus one INSERT ... ON CONFLICT,
+    so the number of round trips does not grow with the number of ingredients or steps.
     """
-    # First, create the dish
-    db_dish = Dish(dish_name=dish_data.dish_name, difficult=dish_data.difficult)
-    db.add(db_dish)
-    db.flush()  # This ensures the dish gets an ID without committing the transaction
-
-    # Process ingredients
-    for ingredient_data in dish_data.ingredients:
-        # Check if ingredient already exists using SQLModel select
-        statement = select(Ingredient).where(Ingredient.ingredient_name == ingredient_data.ingredient_name)
-        result = db.execute(statement)
-        existing_ingredient = result.scalar_one_or_none()
-
-        if existing_ingredient:
-            ingredient_id = existing_ingredient.id
-        else:
-            # Create new ingredient (without usage - usage is per dish)
-            new_ingredient = Ingredient(
-                ingredient_name=ingredient_data.ingredient_name,
-                type=ingredient_data.type
-            )
-            db.add(new_ingredient)
-            db.flush()  # Get the ID of the new ingredient
-            ingredient_id = new_ingredient.id
-
-        # Create the relationship between dish and ingredient with usage info
-        dish_ingredient_link = DishIngredientLink(
-            dish_id=db_dish.id,
-            ingredient_id=ingredient_id,
-            usage=ingredient_data.usage
-        )
-        db.add(dish_ingredient_link)
-
-    # Process steps
-    for step_data in dish_data.steps:
-        # Create dish step, using the dish_id we just created
-        step = DishStep(
-            dish_id=db_dish.id,
-            step_order=step_data.step_order,
-            step_text=step_data.step_text
-        )
-        db.add(step)
+    dish_id = _insert_dishes(db, [dish_data])[0]
 
     # Commit all changes
     db.commit()
+    _invalidate_dish()
 
-    # Refresh to get the latest data
-    db.refresh(db_dish)
+    return get_dish(db, dish_id)
 
-    return db_dish
+
+# Full-width ASCII variants (U+FF01-U+FF5E) and the ideographic space fold to ASCII
+_FULLWIDTH_FOLD = {code: code - 0xFEE0 for code in range(0xFF01, 0xFF5F)}
+_FULLWIDTH_FOLD[0x3000] = 0x20
+
+
+def normalize_ingredient_name(name: str):
+    """
+    Key under which ingredient names are unique: full-width characters folded to
+    ASCII and surrounding whitespace trimmed, so "鸡蛋 " and "鸡蛋" are one ingredient.
+    Migration 004 keeps a copy of it to key the existing rows.
+    """
+    return name.translate(_FULLWIDTH_FOLD).strip()
+
+
+def _resolve_ingredient_ids(db: Session, ingredient_types: dict):
+    """
+    Map ingredient names to ids with one IN query on the unique name_key, creating the
+    missing ones with a single INSERT ... ON CONFLICT DO NOTHING RETURNING.
+    ingredient_types maps name -> type used on creation. Names that a concurrent
+    transaction inserted first are picked up with one more lookup.
+    """
+    if not ingredient_types:
+        return {}
+    names_by_key = {}
+    for name, ingredient_type in ingredient_types.items():
+        names_by_key.setdefault(normalize_ingredient_name(name), (name.strip(), ingredient_type))
+
+    def lookup(keys):
+        statement = select(Ingredient.name_key, Ingredient.id).where(Ingredient.name_key.in_(keys))
+        return {name_key: ingredient_id for name_key, ingredient_id in db.execute(statement)}
+
+    ids_by_key = lookup(list(names_by_key))
+    missing = [key for key in names_by_key if key not in ids_by_key]
+    if missing:
+        table = Ingredient.__table__
+        statement = pg_insert(table).values([
+            {"ingredient_name": names_by_key[key][0], "type": names_by_key[key][1], "name_key": key}
+            for key in missing
+        ]).on_conflict_do_nothing(index_elements=[table.c.name_key]).returning(table.c.name_key, table.c.id)
+        ids_by_key.update({name_key: ingredient_id for name_key, ingredient_id in db.execute(statement)})
+        raced = [key for key in missing if key not in ids_by_key]
+        if raced:
+            ids_by_key.update(lookup(raced))
+
+    return {name: ids_by_key[normalize_ingredient_name(name)] for name in ingredient_types}
+
+
+def _insert_dishes(db: Session, dishes: List[schemas.DishAddRequest]):
+    """
+    Write dishes with their ingredient links and steps using set-based statements:
+    one ingredient lookup/insert, one id allocation and one executemany per table,
+    whatever the number of dishes. Returns the new dish ids in input order.
+    """
+    ingredient_types = {}
+    for dish_data in dishes:
+        for ingredient_data in dish_data.ingredients:
+            ingredient_types.setdefault(ingredient_data.ingredient_name, ingredient_data.type)
+    ingredient_ids = _resolve_ingredient_ids(db, ingredient_types)
+
+    # Allocate all dish ids up front so links and steps can reference them without
+    # relying on the row order of INSERT ... RETURNING
+    statement = text("SELECT nextval(pg_get_serial_sequence('dish', 'id')) FROM generate_series(1, :n)")
+    dish_ids = list(db.execute(statement, {"n": len(dishes)}).scalars())
+
+    dish_rows, link_rows, step_rows, index_links = [], [], [], []
+    for dish_id, dish_data in zip(dish_ids, dishes):
+        dish_rows.append({"id": dish_id, "dish_name": dish_data.dish_name, "difficult": dish_data.difficult})
+        linked = set()
+        for ingredient_data in dish_data.ingredients:
+            ingredient_id = ingredient_ids[ingredient_data.ingredient_name]
+            if ingredient_id in linked:
+                # (dish_id, ingredient_id) is the primary key; keep the first usage
+                continue
+            linked.add(ingredient_id)
+            link_rows.append({"dish_id": dish_id, "ingredient_id": ingredient_id, "usage": ingredient_data.usage})
+            # The type is only used for ingredients the index does not know yet, i.e. new ones
+            index_links.append((dish_id, ingredient_id, ingredient_types[ingredient_data.ingredient_name]))
+        for step_data in dish_data.steps:
+            step_rows.append({"dish_id": dish_id, "step_order": step_data.step_order,
+                              "step_text": step_data.step_text})
+
+    # A list of parameter sets runs as a batched multi-row insert (psycopg2 execute_values)
+    db.execute(insert(Dish.__table__), dish_rows)
+    if link_rows:
+        db.execute(insert(DishIngredientLink.__table__), link_rows)
+    if step_rows:
+        db.execute(insert(DishStep.__table__), step_rows)
+    refresh_dish_cards(db, dish_ids)
+    on_commit(db, ingredient_index.add_dishes, index_links)
+    on_commit(db, recommender.add_dishes, index_links, dish_ids)
+    _publish(db, "dish_created", dish_ids)
+    return dish_ids
+
+
+def _load_session():
+    """
+    Session for loading an in-memory structure: full-table reads on the primary, with
+    their own statement_timeout instead of the short one of the read-only routes.
+    """
+    return SessionLocal(info={"statement_timeout_ms": DB_STATEMENT_TIMEOUT_LOAD_MS})
+
+
+def ensure_ingredient_index():
+    """
+    Build ingredient_index on first use and rebuild it once it has expired. Blocks
+    while the first build runs: call it from a worker thread (crud_async does), never
+    from the event loop.
+    """
+    if not ingredient_index.stale():
+        return
+    # The first build blocks every caller; later rebuilds run in one request while
+    # the others keep answering from the previous contents
+    if not _ingredient_index_build_lock.acquire(blocking=not ingredient_index.built):
+        return
+    try:
+        if ingredient_index.stale():
+            statement = select(
+                DishIngredientLink.dish_id, DishIngredientLink.ingredient_id, Ingredient.type
+            ).join(Ingredient, Ingredient.id == DishIngredientLink.ingredient_id)
+            with _load_session() as db:
+                ingredient_index.rebuild(lambda: db.execute(statement).all())
+    finally:
+        _ingredient_index_build_lock.release()
+
+
+def match_dishes_by_ingredients(db: Session, match: schemas.DishMatchRequest):
+    """
+    Dishes that can be cooked from the given ingredients (ids and/or names), ranked by
+    type-weighted coverage, with the card fields of each dish. Names resolve by
+    normalized name; those without an ingredient are returned as unknown_ingredients.
+    Expects ensure_ingredient_index() to have run; only a first build is done here.
+    """
+    ingredient_ids = set(match.ingredient_ids)
+    unknown = []
+    if match.ingredient_names:
+        keys = {normalize_ingredient_name(name): name for name in match.ingredient_names}
+        statement = select(Ingredient.name_key, Ingredient.id).where(Ingredient.name_key.in_(list(keys)))
+        found = dict(db.execute(statement).all())
+        ingredient_ids.update(found.values())
+        unknown = [name for key, name in keys.items() if key not in found]
+
+    if not ingredient_index.built:
+        ensure_ingredient_index()
+    ranked = ingredient_index.match(ingredient_ids, limit=match.limit, max_missing_main=match.max_missing_main)
+
+    return {"items": _with_dish_cards(db, ranked), "unknown_ingredients": unknown}
+
+
+def _with_dish_cards(db: Session, ranked: List[dict]):
+    """
+    Card fields (as in /dish/select) merged into ranked {"dish_id": ..., ...} items,
+    with one query. Items whose dish no longer exists are dropped.
+    """
+    if not ranked:
+        return []
+    statement = select(DishCard.dish_id, DishCard.dish_name, DishCard.difficult, DishCard.main_ingredients).where(
+        DishCard.dish_id.in_([item["dish_id"] for item in ranked])
+    )
+    cards = {row[0]: row for row in db.execute(statement)}
+
+    items = []
+    for item in ranked:
+        card = cards.get(item["dish_id"])
+        if card is None:
+            # Deleted by another process since the in-memory structure was built
+            continue
+        items.append({
+            "id": card[0],
+            "dish_name": card[1],
+            "difficult": card[2],
+            "main_ingredients": (card[3] or [])[:3],
+            **{key: value for key, value in item.items() if key != "dish_id"}
+        })
+    return items
+
+
+def bulk_add_dishes(db: Session, records: List[Tuple[int, schemas.DishAddRequest]]):
+    """
+    Add a batch of dishes in one transaction. records are (record number, dish) pairs.
+    If the batch fails, it is retried dish by dish so one bad record does not reject
+    the others. Returns (number inserted, [(record number, error message), ...]).
+    """
+    if not records:
+        return 0, []
+    try:
+        _insert_dishes(db, [dish_data for _, dish_data in records])
+        db.commit()
+        _invalidate_dish()
+        return len(records), []
+    except SQLAlchemyError:
+        db.rollback()
+
+    inserted, errors = 0, []
+    for record_number, dish_data in records:
+        try:
+            _insert_dishes(db, [dish_data])
+            db.commit()
+            inserted += 1
+        except SQLAlchemyError as e:
+            db.rollback()
+            errors.append((record_number, str(getattr(e, "orig", None) or e)))
+    _invalidate_dish()
+    return inserted, errors
+
+
+# cooking_rating -> dish_stats histogram column
+RATING_COLUMNS = {1: "rating_1_count", 2: "rating_2_count", 3: "rating_3_count", 4: "rating_4_count"}
+
+
+def _record_cooking_stats(db: Session, dish_id: int, cooking_rating: int, cooking_time: datetime):
+    """Fold one history row into dish_stats with a single upsert (no commit)."""
+    stats = DishStats.__table__
+    values = {"dish_id": dish_id, "cook_count": 1, "rating_sum": cooking_rating, "last_cooked_time": cooking_time}
+    rating_column = RATING_COLUMNS.get(cooking_rating)
+    if rating_column:
+        values[rating_column] = 1
+    statement = pg_insert(stats).values(**values)
+    updates = {
+        "cook_count": stats.c.cook_count + 1,
+        "rating_sum": stats.c.rating_sum + cooking_rating,
+        "last_cooked_time": func.greatest(stats.c.last_cooked_time, statement.excluded.last_cooked_time),
+        "modify_time": func.current_timestamp(),
+    }
+    if rating_column:
+        updates[rating_column] = stats.c[rating_column] + 1
+    db.execute(statement.on_conflict_do_update(index_elements=[stats.c.dish_id], set_=updates))
 
 
 def create_dish_history(db: Session, dish_history: schemas.DishHistoryCreate):
-    from datetime import datetime
     db_dish_history = DishHistory(
         dish_id=dish_history.dish_id,
         cooking_time=datetime.now(),
         cooking_rating=dish_history.cooking_rating
     )
     db.add(db_dish_history)
+    db.flush()
+    # Same transaction as the history row, so the summary never drifts from it
+    _record_cooking_stats(db, db_dish_history.dish_id, db_dish_history.cooking_rating,
+                          db_dish_history.cooking_time)
+    on_commit(db, recommender.record_cooking, db_dish_history.id, db_dish_history.dish_id,
+              db_dish_history.cooking_rating, db_dish_history.cooking_time)
+    _publish(db, "dish_cooked", [db_dish_history.dish_id], history_id=db_dish_history.id,
+             rating=db_dish_history.cooking_rating, cooking_time=db_dish_history.cooking_time.isoformat())
     db.commit()
     db.refresh(db_dish_history)
     return db_dish_history
 
 
+def ensure_recommender():
+    """
+    Load recommender on first use and reload it once it has expired. Like
+    ensure_ingredient_index(), it blocks during the first load and belongs in a worker thread.
+    """
+    if not recommender.stale():
+        return
+    if not _recommender_build_lock.acquire(blocking=not recommender.built):
+        return
+    try:
+        if recommender.stale():
+            def load():
+                # max(dish_history.id) in the same statement, i.e. the same snapshot, as
+                # the stats it is compared with when replaying concurrent cookings
+                max_history_id = select(func.max(DishHistory.id)).scalar_subquery()
+                statement = select(
+                    Dish.id, func.coalesce(DishStats.cook_count, 0), func.coalesce(DishStats.rating_sum, 0),
+                    DishStats.last_cooked_time, max_history_id
+                ).outerjoin(DishStats, DishStats.dish_id == Dish.id)
+                with _load_session() as db:
+                    rows = db.execute(statement).all()
+                    links = db.execute(select(DishIngredientLink.dish_id, DishIngredientLink.ingredient_id)).all()
+                return [row[:4] for row in rows], links, rows[0][4] if rows else None
+            recommender.rebuild(load)
+    finally:
+        _recommender_build_lock.release()
+
+
+def recommend_dishes(db: Session, limit: int = 20):
+    """
+    Dishes ranked by the recommender (recency, frequency, rating and ingredient overlap
+    with well-rated dishes), with the card fields of each dish. Expects
+    ensure_recommender() to have run; only a first load is done here.
+    """
+    if not recommender.built:
+        ensure_recommender()
+    return _with_dish_cards(db, recommender.recommend(limit))
+
+
 def get_dish_history_by_dish_id(db: Session, dish_id: int):
-    from sqlalchemy.orm import selectinload
-    from sqlmodel import select
     statement = select(DishHistory).where(DishHistory.dish_id == dish_id).order_by(
         DishHistory.cooking_time.desc(),
         DishHistory.create_time.desc()
@@ -246,8 +983,115 @@ def get_dish_history_by_dish_id(db: Session, dish_id: int):
     return result.scalars().all()
 
 
+def get_dish_history_validator(db: Session, dish_id: int):
+    """(last_modified, version) of the cooking history list of a dish."""
+    statement = select(func.max(DishHistory.modify_time), func.count()).where(DishHistory.dish_id == dish_id)
+    last_modified, count = db.execute(statement).one()
+    return last_modified, (dish_id, last_modified, count)
+
+
 def get_cooking_count_by_dish_id(db: Session, dish_id: int):
-    from sqlmodel import select, func
-    statement = select(func.count(DishHistory.id)).where(DishHistory.dish_id == dish_id)
+    statement = select(DishStats.cook_count).where(DishStats.dish_id == dish_id)
     result = db.execute(statement)
-    return result.scalar_one()
+    return result.scalar_one_or_none() or 0
+
+
+def get_dish_stats(db: Session, dish_id: int):
+    """Cooking summary of a dish from dish_stats; a dish never cooked has all zeros."""
+    statement = select(DishStats).where(DishStats.dish_id == dish_id)
+    stats = db.execute(statement).scalar_one_or_none()
+    if stats is None:
+        stats = DishStats(dish_id=dish_id)
+    cook_count = stats.cook_count or 0
+    return {
+        "dish_id": dish_id,
+        "cook_count": cook_count,
+        "rating_histogram": {
+            str(rating): getattr(stats, column) or 0 for rating, column in RATING_COLUMNS.items()
+        },
+        "average_rating": round(stats.rating_sum / cook_count, 2) if cook_count else None,
+        "last_cooked_time": stats.last_cooked_time
+    }
+
+
+def get_history_analytics(db: Session, bucket: str = "day", dish_id: Optional[int] = None,
+                          start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """
+    Cooking counts and rating histograms of dish_history per time bucket (day, week
+    starting Monday, or month), for one dish or all dishes, in [start, end).
+    Aggregated in SQL, so only one row per non-empty bucket is transferred.
+    """
+    if bucket not in ("day", "week", "month"):
+        raise ValueError(f"Unknown bucket: {bucket}")
+    # Inlined rather than bound: the same expression has to appear in GROUP BY
+    bucket_start = func.date_trunc(literal_column(f"'{bucket}'"), DishHistory.cooking_time)
+    rating_counts = [func.count().filter(DishHistory.cooking_rating == rating) for rating in RATING_COLUMNS]
+    statement = select(bucket_start, func.count(), func.sum(DishHistory.cooking_rating), *rating_counts)
+    if dish_id is not None:
+        statement = statement.where(DishHistory.dish_id == dish_id)
+    if start is not None:
+        statement = statement.where(DishHistory.cooking_time >= start)
+    if end is not None:
+        statement = statement.where(DishHistory.cooking_time < end)
+    statement = statement.group_by(bucket_start).order_by(bucket_start)
+
+    buckets = []
+    for row in db.execute(statement):
+        bucket_time, cook_count, rating_sum = row[:3]
+        buckets.append({
+            "bucket": bucket_time,
+            "cook_count": cook_count,
+            "rating_histogram": {str(rating): count for rating, count in zip(RATING_COLUMNS, row[3:])},
+            "average_rating": round(rating_sum / cook_count, 2) if cook_count else None
+        })
+    cook_count = sum(item["cook_count"] for item in buckets)
+    return {
+        "bucket": bucket,
+        "dish_id": dish_id,
+        "cook_count": cook_count,
+        "rating_histogram": {
+            str(rating): sum(item["rating_histogram"][str(rating)] for item in buckets) for rating in RATING_COLUMNS
+        },
+        "buckets": buckets
+    }
+
+
+# Recomputes every dish_stats row from dish_history
+REBUILD_DISH_STATS_SQL = """
+    INSERT INTO dish_stats (dish_id, cook_count, rating_1_count, rating_2_count, rating_3_count,
+                            rating_4_count, rating_sum, last_cooked_time)
+    SELECT dish_id,
+           count(*),
+           count(*) FILTER (WHERE cooking_rating = 1),
+           count(*) FILTER (WHERE cooking_rating = 2),
+           count(*) FILTER (WHERE cooking_rating = 3),
+           count(*) FILTER (WHERE cooking_rating = 4),
+           coalesce(sum(cooking_rating), 0),
+           max(cooking_time)
+    FROM dish_history
+    GROUP BY dish_id
+    ON CONFLICT (dish_id) DO UPDATE SET
+        cook_count = EXCLUDED.cook_count,
+        rating_1_count = EXCLUDED.rating_1_count,
+        rating_2_count = EXCLUDED.rating_2_count,
+        rating_3_count = EXCLUDED.rating_3_count,
+        rating_4_count = EXCLUDED.rating_4_count,
+        rating_sum = EXCLUDED.rating_sum,
+        last_cooked_time = EXCLUDED.last_cooked_time,
+        modify_time = CURRENT_TIMESTAMP
+"""
+
+
+def rebuild_dish_stats(db: Session):
+    """
+    Backfill/repair dish_stats from the full history. dish_history is locked against
+    writes for the duration, so no cooking record is counted twice or missed.
+    Returns the number of dishes with statistics.
+    """
+    db.execute(text("LOCK TABLE dish_history IN SHARE MODE"))
+    db.execute(text(REBUILD_DISH_STATS_SQL))
+    db.execute(text("DELETE FROM dish_stats s WHERE NOT EXISTS "
+                    "(SELECT 1 FROM dish_history h WHERE h.dish_id = s.dish_id)"))
+    count = db.execute(select(func.count()).select_from(DishStats)).scalar_one()
+    db.commit()
+    return count
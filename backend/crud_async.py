@@ -0,0 +1,70 @@
+"""
+Async entry points for the CRUD layer used by the routes.
+
+Every function here mirrors the function of the same name in crud.py and takes the
+session yielded by database.read_session / database.write_session (or another
+session_with_timeout dependency):
+
+- AsyncSession (DB_ASYNC=1): the crud.py implementation runs through
+  AsyncSession.run_sync, so all database IO goes through asyncpg on the event loop
+  and no threadpool worker is held for the round trip.
+- Session (default): the crud.py implementation runs in the threadpool, which is
+  what FastAPI did for the previous sync `def` routes.
+
+Keeping a single implementation in crud.py means both modes always run the same SQL.
+"""
+from functools import wraps
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from backend import crud
+
+
+def _async(fn, prepare=None):
+    """prepare(), e.g. loading an in-memory structure, runs first in the threadpool."""
+    @wraps(fn)
+    async def wrapper(db, *args, **kwargs):
+        if prepare is not None:
+            # It may block on a lock or a long load: keep that off the event loop,
+            # where run_sync would run it
+            await run_in_threadpool(prepare)
+        if isinstance(db, AsyncSession):
+            return await db.run_sync(fn, *args, **kwargs)
+        return await run_in_threadpool(fn, db, *args, **kwargs)
+    return wrapper
+
+
+async def rollback(db):
+    if isinstance(db, AsyncSession):
+        await db.rollback()
+    else:
+        await run_in_threadpool(db.rollback)
+
+
+get_dish = _async(crud.get_dish)
+get_dishes = _async(crud.get_dishes)
+get_dish_count = _async(crud.get_dish_count)
+select_dish_cards = _async(crud.select_dish_cards)
+create_dish = _async(crud.create_dish)
+update_dish = _async(crud.update_dish)
+delete_dish = _async(crud.delete_dish)
+get_ingredient = _async(crud.get_ingredient)
+get_ingredients = _async(crud.get_ingredients)
+get_ingredients_validator = _async(crud.get_ingredients_validator)
+create_ingredient = _async(crud.create_ingredient)
+get_dish_step = _async(crud.get_dish_step)
+get_dish_steps = _async(crud.get_dish_steps)
+create_dish_step = _async(crud.create_dish_step)
+get_dish_with_details = _async(crud.get_dish_with_details)
+get_dish_detail_validator = _async(crud.get_dish_detail_validator)
+add_dish_with_ingredients_and_steps = _async(crud.add_dish_with_ingredients_and_steps)
+bulk_add_dishes = _async(crud.bulk_add_dishes)
+match_dishes_by_ingredients = _async(crud.match_dishes_by_ingredients, prepare=crud.ensure_ingredient_index)
+recommend_dishes = _async(crud.recommend_dishes, prepare=crud.ensure_recommender)
+create_dish_history = _async(crud.create_dish_history)
+get_dish_history_by_dish_id = _async(crud.get_dish_history_by_dish_id)
+get_dish_history_validator = _async(crud.get_dish_history_validator)
+get_cooking_count_by_dish_id = _async(crud.get_cooking_count_by_dish_id)
+get_dish_stats = _async(crud.get_dish_stats)
+get_history_analytics = _async(crud.get_history_analytics)
@@ -1,12 +1,18 @@
 from sqlmodel import create_engine, SQLModel
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import NullPool
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from fastapi import Request, Response
 from dotenv import load_dotenv
-import sys
+import math
 import os
-# Add the project root to the Python path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import threading
 
-from backend.models import Dish, Ingredient, DishIngredientLink, DishHistory
+from backend.pool_metrics import TimedQueuePool, TimedAsyncAdaptedQueuePool
+from backend.query_stats import instrument_engine
+from backend.replicas import ReplicaRouter, reads_own_writes, READ_PRIMARY_COOKIE, READ_PRIMARY_HEADER
 
 # Load environment variables from .env file in the backend directory
 env_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env')
@@ -15,11 +21,16 @@ load_dotenv(env_path)
 # Determine which environment to use, default to 'dev'
 ENV = os.getenv("ENV", "dev")
 
+
+def _env_flag(name, default="0"):
+    return os.getenv(name, default).lower() in ("1", "true", "yes", "on")
+
+
 # Base database connection parameters (same for all environments)
-DB_USER = "postgres"
-DB_PASSWORD = "299793"
-DB_HOST = "localhost"
-DB_PORT = "5432"
+DB_USER = os.getenv("DB_USER", "postgres")
+DB_PASSWORD = os.getenv("DB_PASSWORD", "")
+DB_HOST = os.getenv("DB_HOST", "localhost")
+DB_PORT = os.getenv("DB_PORT", "5432")
 
 # Select database name based on environment
 if ENV.lower() == "prod" or ENV.lower() == "production":
@@ -27,13 +38,241 @@ if ENV.lower() == "prod" or ENV.lower() == "production":
 else:  # default to dev environment
     DB_NAME = os.getenv("DEV_DATABASE_NAME", "go_cooking_3_dev")
 
-# Construct the database URL
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# Construct the database URL (DATABASE_URL in the environment overrides the parts above)
+DATABASE_URL = os.getenv("DATABASE_URL") or f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+ASYNC_DATABASE_URL = "postgresql+asyncpg://" + DATABASE_URL.split("://", 1)[1]
+
+# Serve routes through an asyncpg-backed AsyncSession instead of the psycopg2 Session
+DB_ASYNC = _env_flag("DB_ASYNC")
+
+# Connection pool settings
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds, -1 disables recycling
+DB_POOL_PRE_PING = _env_flag("DB_POOL_PRE_PING", "1")
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))  # seconds
+# PgBouncer transaction pooling: no server-side prepared statements, and optionally no
+# client-side pool at all (DB_POOL_DISABLED=1) when PgBouncer does the pooling
+DB_PGBOUNCER = _env_flag("DB_PGBOUNCER")
+DB_POOL_DISABLED = _env_flag("DB_POOL_DISABLED")
+
+# Statement timeouts in milliseconds, 0 means no limit. Applied with SET LOCAL at the
+# start of every transaction, which also works behind PgBouncer in transaction mode.
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+DB_STATEMENT_TIMEOUT_READ_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_READ_MS", "2000"))
+DB_STATEMENT_TIMEOUT_WRITE_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_WRITE_MS", "10000"))
+# Per statement (each cursor FETCH) of /dish/export and backend/export_dishes.py
+DB_STATEMENT_TIMEOUT_EXPORT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_EXPORT_MS", "60000"))
+# Per statement of the full-table loads of the in-memory ingredient index and recommender
+DB_STATEMENT_TIMEOUT_LOAD_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_LOAD_MS", "60000"))
+
+# Seconds a /dish/select total stays cached per filter (0 disables the cache)
+DISH_COUNT_CACHE_TTL = float(os.getenv("DISH_COUNT_CACHE_TTL", "60"))
+# /dish/detail/{id} cache: memory cap in bytes and seconds per entry (0 disables the cache)
+DISH_DETAIL_CACHE_MAX_BYTES = int(os.getenv("DISH_DETAIL_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+DISH_DETAIL_CACHE_TTL = float(os.getenv("DISH_DETAIL_CACHE_TTL", "300"))
+# Seconds before the in-memory ingredient index is rebuilt to pick up writes of other
+# processes (0 = never; this process's own writes are applied immediately)
+INGREDIENT_INDEX_TTL = float(os.getenv("INGREDIENT_INDEX_TTL", "600"))
+# Same for the /dish/recommend feature matrix
+RECOMMENDER_TTL = float(os.getenv("RECOMMENDER_TTL", "600"))
+
+# Serialize the hot read routes straight to JSON with orjson (see backend/responses.py)
+FAST_JSON = _env_flag("FAST_JSON")
+
+# Per-route request counters and latency histograms, exposed on GET /metrics
+REQUEST_METRICS = _env_flag("REQUEST_METRICS", "1")
+
+# SQL statement counts and time per request (see backend/query_stats.py)
+DB_QUERY_STATS = _env_flag("DB_QUERY_STATS", "1")
+# X-DB-Query-Count / X-DB-Time-Ms response headers; off by default in production
+DB_QUERY_STATS_HEADERS = _env_flag("DB_QUERY_STATS_HEADERS", "0" if ENV.lower() in ("prod", "production") else "1")
+# Log statements slower than this many milliseconds (0 disables the slow-query log)
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "200"))
+# Log a statement run this many times within one request as an N+1 candidate (0 disables)
+DB_N_PLUS_ONE_THRESHOLD = int(os.getenv("DB_N_PLUS_ONE_THRESHOLD", "5"))
+
+# Startup warmup (see backend/warmup.py): pool connections opened before the first
+# request (defaults to DB_POOL_SIZE) and whether the hot statements are pre-compiled
+DB_WARMUP_CONNECTIONS = int(os.getenv("DB_WARMUP_CONNECTIONS", str(DB_POOL_SIZE)))
+DB_WARMUP_STATEMENTS = _env_flag("DB_WARMUP_STATEMENTS", "1")
+
+# Read replicas serving the read-only routes, comma separated (see backend/replicas.py)
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# Replicas further behind than this many seconds are skipped; also how long a client
+# reads from the primary after a write
+DB_REPLICA_MAX_LAG_S = float(os.getenv("DB_REPLICA_MAX_LAG_S", "5"))
+DB_REPLICA_CHECK_INTERVAL_S = float(os.getenv("DB_REPLICA_CHECK_INTERVAL_S", "5"))
+
+# Cache invalidation events between API processes over LISTEN/NOTIFY (see backend/cache_events.py)
+DB_CACHE_EVENTS = _env_flag("DB_CACHE_EVENTS", "1")
+DB_CACHE_EVENTS_CHANNEL = os.getenv("DB_CACHE_EVENTS_CHANNEL", "go_cooking_cache")
+# Direct connection to the primary for the listener; needed when DATABASE_URL points at
+# PgBouncer in transaction mode (defaults to DATABASE_URL)
+DB_CACHE_EVENTS_URL = os.getenv("DB_CACHE_EVENTS_URL") or DATABASE_URL
+
+
+def _pool_options(poolclass):
+    if DB_POOL_DISABLED:
+        return {"poolclass": NullPool}
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def _async_connect_args():
+    connect_args = {"timeout": DB_CONNECT_TIMEOUT}
+    if DB_PGBOUNCER:
+        # asyncpg prepares every statement; PgBouncer cannot route those in transaction mode
+        connect_args.update({"statement_cache_size": 0, "prepared_statement_cache_size": 0})
+    return connect_args
+
+
+# Engines are created on first use rather than at import, so importing this module
+# (scripts, alembic, workers before a fork) opens no pool and reads no driver
+_engine = None
+_async_engine = None
+_engine_lock = threading.Lock()
+
+
+def _make_engines(url, async_url):
+    """(psycopg2 engine, asyncpg engine or None) of one server, with the pool settings above."""
+    engine = create_engine(
+        url,
+        connect_args={"connect_timeout": DB_CONNECT_TIMEOUT},
+        **_pool_options(TimedQueuePool)
+    )
+    async_engine = create_async_engine(
+        async_url,
+        connect_args=_async_connect_args(),
+        **_pool_options(TimedAsyncAdaptedQueuePool)
+    ) if DB_ASYNC else None
+
+    if DB_QUERY_STATS:
+        instrument_engine(engine, slow_query_ms=DB_SLOW_QUERY_MS)
+        if async_engine is not None:
+            instrument_engine(async_engine.sync_engine, slow_query_ms=DB_SLOW_QUERY_MS)
+    return engine, async_engine
+
+
+def _create_replica_engines(url):
+    engine, async_engine = _make_engines(url, url.set(drivername="postgresql+asyncpg"))
+    # Health checks use their own unpooled connections, so a full pool cannot delay them
+    check_engine = create_engine(url, poolclass=NullPool, connect_args={"connect_timeout": DB_CONNECT_TIMEOUT})
+    return engine, async_engine, check_engine
+
+
+replica_router = ReplicaRouter(
+    DATABASE_REPLICA_URLS, _create_replica_engines, max_lag_s=DB_REPLICA_MAX_LAG_S,
+    check_interval_s=DB_REPLICA_CHECK_INTERVAL_S
+) if DATABASE_REPLICA_URLS else None
+
+
+def _create_engines():
+    global _engine, _async_engine
+    engine, async_engine = _make_engines(DATABASE_URL, ASYNC_DATABASE_URL)
+
+    # render_as_string hides the password
+    print(f"Using environment: {ENV}, database: {engine.url.render_as_string(hide_password=True)}, "
+          f"driver mode: {'async (asyncpg)' if DB_ASYNC else 'sync (psycopg2)'}")
+    _async_engine = async_engine
+    _engine = engine
+
+
+def get_engine():
+    """The psycopg2 engine, created on the first call."""
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _create_engines()
+    return _engine
+
+
+def get_async_engine():
+    """The asyncpg engine, created on the first call; None unless DB_ASYNC is on."""
+    get_engine()
+    return _async_engine
+
+
+def _created_engines():
+    """(psycopg2 engines, asyncpg engines) created so far, primary and replicas."""
+    engines, async_engines = [], []
+    if _engine is not None:
+        engines.append(_engine)
+    if _async_engine is not None:
+        async_engines.append(_async_engine)
+    for replica in replica_router.replicas if replica_router is not None else ():
+        if replica.engine is not None:
+            engines.append(replica.engine)
+        if replica.async_engine is not None:
+            async_engines.append(replica.async_engine)
+    return engines, async_engines
 
-print(f"Using environment: {ENV}")
-print(f"Connecting to database: {DATABASE_URL}")
 
-engine = create_engine(DATABASE_URL)
+def dispose_engines(close=True):
+    """
+    Drop the pooled connections of the engines created so far. close=True closes them,
+    e.g. before forking; close=False, in a child right after a fork, only forgets the
+    connections inherited from the parent, which may still be using them. asyncpg
+    connections can only be closed from a coroutine (see close_engines) and are
+    always just forgotten here.
+    """
+    engines, async_engines = _created_engines()
+    for engine in engines:
+        engine.dispose(close=close)
+    for async_engine in async_engines:
+        async_engine.sync_engine.dispose(close=False)
+
+
+async def close_engines():
+    """Close every pooled connection of this process, e.g. when a worker shuts down."""
+    engines, async_engines = _created_engines()
+    for async_engine in async_engines:
+        await async_engine.dispose()
+    for engine in engines:
+        engine.dispose()
+
+
+def cache_event_connection():
+    """A new, unpooled psycopg2 connection for the cache event listener."""
+    dialect = get_engine().dialect
+    cargs, cparams = dialect.create_connect_args(make_url(DB_CACHE_EVENTS_URL))
+    cparams.setdefault("connect_timeout", DB_CONNECT_TIMEOUT)
+    return dialect.connect(*cargs, **cparams)
+
+
+def _replica_engines():
+    engines = {}
+    for replica in replica_router.replicas if replica_router is not None else ():
+        if replica.engine is not None:
+            engines[f"{replica.name}-sync"] = replica.engine
+        if replica.async_engine is not None:
+            engines[f"{replica.name}-async"] = replica.async_engine.sync_engine
+    return engines
+
+
+def after_replica_lag(fn, *args):
+    """
+    Run fn(*args) once more when every usable replica has caught up with a write just
+    committed, e.g. to drop cache entries a lagging replica may have refilled. Does
+    nothing without replicas.
+    """
+    if replica_router is not None:
+        replica_router.call_after_lag(fn, *args)
+
+
+@event.listens_for(Session, "after_begin")
+def _apply_statement_timeout(session, transaction, connection):
+    # Also fires for the sync Session wrapped by every AsyncSession
+    timeout_ms = session.info.get("statement_timeout_ms", DB_STATEMENT_TIMEOUT_MS)
+    if timeout_ms:
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
 
 
 def create_db_and_tables():
@@ -41,11 +280,37 @@ def create_db_and_tables():
     Automatically create all tables based on SQLModel entity relationships.
     This function will create tables for all SQLModel classes that have table=True.
     """
+    # Importing the models registers their tables on SQLModel.metadata
+    import backend.models  # noqa: F401
     print("Registered tables:", list(SQLModel.metadata.tables.keys()))
+    engine = get_engine()
+    with engine.begin() as connection:
+        # Required by the trigram index on dish.dish_name
+        connection.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
     SQLModel.metadata.create_all(engine)
 
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+class _LazySessionmaker(sessionmaker):
+    """sessionmaker bound to the engine returned by get_bind() when the first session is made."""
+
+    def __init__(self, get_bind, **kw):
+        super().__init__(**kw)
+        self._get_bind = get_bind
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=self._get_bind())
+        return super().__call__(**local_kw)
+
+
+SessionLocal = _LazySessionmaker(get_engine, autocommit=False, autoflush=False)
+
+
+# expire_on_commit=False: attributes of committed objects must stay readable after
+# the session's greenlet context is gone (e.g. while the response is serialized)
+AsyncSessionLocal = _LazySessionmaker(
+    get_async_engine, class_=AsyncSession, autocommit=False, autoflush=False, expire_on_commit=False
+)
 
 
 def get_db():
@@ -53,4 +318,73 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def _read_bind(request):
+    """Engine of a usable replica for a read-only request; None sends it to the primary."""
+    if replica_router is None:
+        return None
+    replica = replica_router.pick(primary=reads_own_writes(request))
+    if replica is None:
+        return None
+    return replica.async_engine if DB_ASYNC else replica.engine
+
+
+def _read_primary_after_write(response):
+    if replica_router is None:
+        return
+    until = f"{replica_router.read_primary_until():.3f}"
+    response.set_cookie(READ_PRIMARY_COOKIE, until, max_age=math.ceil(DB_REPLICA_MAX_LAG_S), httponly=True,
+                        samesite="lax")
+    response.headers[READ_PRIMARY_HEADER] = until
+
+
+def session_with_timeout(timeout_ms, role=None):
+    """
+    Route dependency yielding a session whose transactions run with the given
+    statement_timeout, e.g. `db=Depends(session_with_timeout(500))`.
+
+    role="read" lets a read replica serve the session, unless the client has written
+    within DB_REPLICA_MAX_LAG_S. role="write" marks the response so that the client
+    reads from the primary for that long.
+    """
+    def session_options(request, response):
+        options = {"info": {"statement_timeout_ms": timeout_ms}}
+        if role == "read":
+            bind = _read_bind(request)
+            if bind is not None:
+                options["bind"] = bind
+        elif role == "write":
+            _read_primary_after_write(response)
+        return options
+
+    if DB_ASYNC:
+        async def get_async_db_with_timeout(request: Request, response: Response):
+            async with AsyncSessionLocal(**session_options(request, response)) as db:
+                yield db
+        return get_async_db_with_timeout
+
+    def get_db_with_timeout(request: Request, response: Response):
+        db = SessionLocal(**session_options(request, response))
+        try:
+            yield db
+        finally:
+            db.close()
+    return get_db_with_timeout
+
+
+# Defaults for read-only and writing routes
+read_session = session_with_timeout(DB_STATEMENT_TIMEOUT_READ_MS, role="read")
+write_session = session_with_timeout(DB_STATEMENT_TIMEOUT_WRITE_MS, role="write")
+
+
+def get_pool_engines():
+    """Engines whose pools are reported on /metrics/pool, keyed by name (only those created so far)."""
+    engines = {}
+    if _engine is not None:
+        engines["sync"] = _engine
+    if _async_engine is not None:
+        engines["async"] = _async_engine.sync_engine
+    engines.update(_replica_engines())
+    return engines
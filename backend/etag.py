@@ -0,0 +1,70 @@
+"""
+HTTP validators (ETag / Last-Modified) and conditional request handling.
+
+Validators are derived from modify_time and row counts, which crud.py can read far
+more cheaply than the payload they describe. All ETags are weak: they identify the
+data behind a response, not its exact bytes.
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+import hashlib
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts):
+    """Weak ETag from the values that identify a version of a resource."""
+    digest = hashlib.blake2b("|".join(str(part) for part in parts).encode("utf-8"), digest_size=12)
+    return f'W/"{digest.hexdigest()}"'
+
+
+def http_date(value: datetime):
+    # modify_time columns are naive; they are compared only with dates we sent ourselves
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def _opaque_tag(tag: str):
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime = None):
+    """
+    True when the client's cached copy is current. If-None-Match (weak comparison)
+    takes precedence; If-Modified-Since is only honoured without it, as in RFC 7232.
+    Only GET and HEAD can be answered with 304; other methods ignore both headers.
+    """
+    if request.method not in ("GET", "HEAD"):
+        return False
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        return _opaque_tag(etag) in {_opaque_tag(tag) for tag in if_none_match.split(",")}
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+            # A "-0000" zone parses to a naive datetime; HTTP dates are always UTC
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+            # HTTP dates have whole-second precision
+            return parsedate_to_datetime(http_date(last_modified)) <= since
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def validator_headers(etag: str, last_modified: datetime = None):
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified_response(etag: str, last_modified: datetime = None):
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))
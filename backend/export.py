@@ -0,0 +1,59 @@
+"""
+Full-catalog dish export as NDJSON, one dish per line in the /dish/detail shape.
+
+Shared by the /dish/export route and backend/export_dishes.py. The export runs on
+its own sync session rather than the request session, so it can hold a server-side
+cursor for as long as the client keeps reading, in either DB_ASYNC mode.
+"""
+from datetime import datetime
+import json
+import zlib
+
+from backend import crud
+from backend.database import SessionLocal, DB_STATEMENT_TIMEOUT_EXPORT_MS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Dishes fetched from the cursor (and batch-loaded with links and steps) at a time
+EXPORT_CHUNK_SIZE = 500
+# Uncompressed bytes collected before a chunk is handed to the client or file
+EXPORT_FLUSH_BYTES = 256 * 1024
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _encode_line(record):
+    if orjson is not None:
+        return orjson.dumps(record) + b"\n"
+    return json.dumps(record, ensure_ascii=False, default=_json_default).encode("utf-8") + b"\n"
+
+
+def export_dishes(since: datetime = None, compress: bool = False, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """
+    Yield the export as byte chunks of NDJSON, gzip-compressed when compress is set.
+    The database session is opened on first iteration and closed when the generator
+    finishes or is closed (e.g. the client disconnected).
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None  # wbits=31: gzip container
+    db = SessionLocal(info={"statement_timeout_ms": DB_STATEMENT_TIMEOUT_EXPORT_MS})
+    try:
+        buffer = bytearray()
+        for record in crud.iter_dish_exports(db, since=since, chunk_size=chunk_size):
+            buffer += _encode_line(record)
+            if len(buffer) >= EXPORT_FLUSH_BYTES:
+                chunk = compressor.compress(bytes(buffer)) if compressor else bytes(buffer)
+                buffer.clear()
+                if chunk:
+                    yield chunk
+        tail = compressor.compress(bytes(buffer)) + compressor.flush() if compressor else bytes(buffer)
+        if tail:
+            yield tail
+    finally:
+        db.close()
@@ -0,0 +1,56 @@
+# Dish catalog export script
+# Writes every dish with its ingredients, usages and steps as NDJSON (one dish per
+# line, same shape as /dish/detail/{id}), optionally gzip-compressed
+
+import os
+import sys
+import argparse
+import contextlib
+from datetime import datetime
+
+# Add the project root to the Python path so imports work correctly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def export(output, env=None, since=None, compress=False):
+    """
+    Export the dish catalog
+    :param output: File path to write, or '-' for stdout
+    :param env: Environment to use ('dev', 'prod', etc.). If None, uses default or ENV variable
+    :param since: Only dishes changed at or after this datetime
+    :param compress: gzip the output
+    """
+    if env is not None:
+        os.environ['ENV'] = env
+    elif 'ENV' not in os.environ:
+        os.environ['ENV'] = 'dev'
+
+    # Import after ENV is set so the right database is selected; its startup messages
+    # go to stderr so they cannot end up in an export written to stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        from backend.export import export_dishes
+
+    written = 0
+    stream = sys.stdout.buffer if output == '-' else open(output, 'wb')
+    try:
+        for chunk in export_dishes(since=since, compress=compress):
+            stream.write(chunk)
+            written += len(chunk)
+    finally:
+        if stream is not sys.stdout.buffer:
+            stream.close()
+    print(f"Exported {written} bytes from {os.environ['ENV']} environment", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Export GoCooking 3 dishes as NDJSON')
+    parser.add_argument('--env', '-e', type=str, default='dev',
+                        choices=['dev', 'development', 'prod', 'production'],
+                        help='Environment to export from (default: dev)')
+    parser.add_argument('--output', '-o', type=str, default='-',
+                        help="Output file, '-' for stdout (default: -)")
+    parser.add_argument('--since', type=datetime.fromisoformat, default=None,
+                        help='Only dishes modified at or after this time, e.g. 2026-10-01T00:00:00')
+    parser.add_argument('--gzip', action='store_true', help='gzip-compress the output')
+    args = parser.parse_args()
+    export(args.output, args.env, args.since, args.gzip)
@@ -0,0 +1,248 @@
+"""
+In-memory inverted index from ingredient to dishes, for "what can I cook with what
+I have" queries.
+
+Each ingredient maps to a posting array of dish rows (a sparse bitset over the
+dishes); per-dish totals of main ingredients and type weights sit in parallel NumPy
+arrays. A query sums the weights of the matched postings with one np.bincount, so
+ranking 100k dishes takes milliseconds regardless of how many ingredients match.
+
+The index is built from dish_ingredients on first use and kept current by writes:
+crud applies the links of new dishes and removed dishes once their transaction
+commits (see session_hooks). Writes made by other processes arrive as cache events
+(see cache_events), or become visible when the index expires after
+INGREDIENT_INDEX_TTL seconds.
+"""
+from collections import defaultdict
+import threading
+import time
+
+import numpy as np
+
+# Weight of a matched or missing ingredient by type: 1主料 2辅料 3调料
+INGREDIENT_TYPE_WEIGHTS = {1: 1.0, 2: 0.5, 3: 0.1}
+MAIN_INGREDIENT_TYPE = 1
+
+
+class IngredientIndex:
+    def __init__(self, ttl_seconds=600.0):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.RLock()
+        self._built_at = None
+        self._expired = False
+        self._replay = None  # changes committed while a build is loading its rows
+        self._reset()
+
+    def _reset(self):
+        self._row_of_dish = {}
+        self._dish_ids = np.zeros(0, dtype=np.int64)
+        self._alive = np.zeros(0, dtype=bool)
+        self._main_total = np.zeros(0, dtype=np.int32)
+        self._link_total = np.zeros(0, dtype=np.int32)
+        self._weight_total = np.zeros(0, dtype=np.float64)
+        self._size = 0
+        self._ingredient_types = {}
+        self._postings = {}  # ingredient id -> np.ndarray of dish rows
+        self._pending_postings = defaultdict(list)  # rows added since the array was built
+
+    @property
+    def built(self):
+        return self._built_at is not None
+
+    def stale(self):
+        if self._built_at is None or self._expired:
+            return True
+        return self.ttl_seconds > 0 and time.monotonic() - self._built_at > self.ttl_seconds
+
+    def rebuild(self, load_links):
+        """
+        build() from the rows returned by load_links(). Changes committed while the rows
+        are being read are replayed on top of them, as the read may or may not have
+        seen them; queries keep using the current contents until the swap.
+        """
+        with self._lock:
+            self._replay = []
+        try:
+            links = load_links()
+        except Exception:
+            with self._lock:
+                self._replay = None
+            raise
+        self.build(links)
+
+    def build(self, links):
+        """
+        Replace the index contents. links are (dish_id, ingredient_id, type) rows, i.e.
+        dish_ingredients joined with ingredient.type.
+        """
+        links = np.asarray(list(links), dtype=np.int64).reshape(-1, 3)
+        dish_column, ingredient_column, type_column = links[:, 0], links[:, 1], links[:, 2]
+        dish_ids, rows = np.unique(dish_column, return_inverse=True)
+        rows = rows.astype(np.int32)
+        weights = np.zeros(max(INGREDIENT_TYPE_WEIGHTS) + 1)
+        for ingredient_type, weight in INGREDIENT_TYPE_WEIGHTS.items():
+            weights[ingredient_type] = weight
+        link_weights = weights[np.clip(type_column, 0, len(weights) - 1)]
+
+        with self._lock:
+            self._reset()
+            size = len(dish_ids)
+            self._grow(size)
+            self._size = size
+            self._dish_ids[:size] = dish_ids
+            self._alive[:size] = True
+            self._row_of_dish = dict(zip(dish_ids.tolist(), range(size)))
+            self._link_total[:size] = np.bincount(rows, minlength=size)
+            self._main_total[:size] = np.bincount(rows[type_column == MAIN_INGREDIENT_TYPE], minlength=size)
+            self._weight_total[:size] = np.bincount(rows, weights=link_weights, minlength=size)
+
+            # One posting array per ingredient from a single sort by ingredient id
+            order = np.argsort(ingredient_column, kind="stable")
+            ingredient_ids, starts = np.unique(ingredient_column[order], return_index=True)
+            for ingredient_id, posting, ingredient_type in zip(
+                    ingredient_ids.tolist(), np.split(rows[order], starts[1:]), type_column[order][starts].tolist()):
+                self._postings[ingredient_id] = posting
+                self._ingredient_types[ingredient_id] = ingredient_type
+            self._built_at = time.monotonic()
+            self._expired = False
+
+            replay, self._replay = self._replay or [], None
+            for action, payload in replay:
+                if action == "add":
+                    self.add_dishes(payload)
+                elif action == "expire":
+                    self.expire()
+                else:
+                    self.remove_dish(payload)
+
+    def add_dishes(self, links):
+        """Add new dishes from their (dish_id, ingredient_id, type) links; known dishes are skipped."""
+        with self._lock:
+            if self._replay is not None:
+                self._replay.append(("add", links))
+            if self.built:
+                self._add_links([link for link in links if link[0] not in self._row_of_dish])
+
+    def expire(self):
+        """Rebuild on next use, e.g. after changes whose links are not known here."""
+        with self._lock:
+            if self._replay is not None:
+                # The rows being loaded may predate the change
+                self._replay.append(("expire", None))
+            self._expired = True
+
+    def remove_dish(self, dish_id):
+        with self._lock:
+            if self._replay is not None:
+                self._replay.append(("remove", dish_id))
+            row = self._row_of_dish.pop(dish_id, None)
+            if row is not None:
+                # Postings keep the row; queries filter it out through _alive
+                self._alive[row] = False
+
+    def _add_links(self, links):
+        new_dishes = []
+        for dish_id, _, _ in links:
+            if dish_id not in self._row_of_dish:
+                self._row_of_dish[dish_id] = self._size + len(new_dishes)
+                new_dishes.append(dish_id)
+        self._grow(len(new_dishes))
+        self._dish_ids[self._size:self._size + len(new_dishes)] = new_dishes
+        self._alive[self._size:self._size + len(new_dishes)] = True
+        self._size += len(new_dishes)
+
+        for dish_id, ingredient_id, ingredient_type in links:
+            ingredient_type = self._ingredient_types.setdefault(ingredient_id, ingredient_type)
+            row = self._row_of_dish[dish_id]
+            self._pending_postings[ingredient_id].append(row)
+            self._weight_total[row] += INGREDIENT_TYPE_WEIGHTS.get(ingredient_type, 0.0)
+            self._link_total[row] += 1
+            if ingredient_type == MAIN_INGREDIENT_TYPE:
+                self._main_total[row] += 1
+
+    def _grow(self, extra):
+        needed = self._size + extra
+        capacity = len(self._dish_ids)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 1024)
+        for name in ("_dish_ids", "_alive", "_main_total", "_link_total", "_weight_total"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def _posting(self, ingredient_id):
+        pending = self._pending_postings.pop(ingredient_id, None)
+        posting = self._postings.get(ingredient_id)
+        if pending:
+            pending = np.asarray(pending, dtype=np.int32)
+            posting = pending if posting is None else np.concatenate([posting, pending])
+            self._postings[ingredient_id] = posting
+        return posting
+
+    def match(self, ingredient_ids, limit=20, max_missing_main=None):
+        """
+        Dishes using any of the given ingredients, best coverage first. Coverage is the
+        type-weighted share of a dish's ingredients that are in the given set; ties go
+        to fewer missing main ingredients, then to the lower dish id.
+        Returns dicts with dish_id, coverage and matched/missing counts.
+        """
+        with self._lock:
+            n = self._size
+            weighted_rows, weights, main_rows = [], [], []
+            for ingredient_id in set(ingredient_ids):
+                posting = self._posting(ingredient_id)
+                if posting is None:
+                    continue
+                ingredient_type = self._ingredient_types[ingredient_id]
+                weighted_rows.append(posting)
+                weights.append(np.full(len(posting), INGREDIENT_TYPE_WEIGHTS.get(ingredient_type, 0.0)))
+                if ingredient_type == MAIN_INGREDIENT_TYPE:
+                    main_rows.append(posting)
+            if not weighted_rows:
+                return []
+
+            matched_count = np.bincount(np.concatenate(weighted_rows), minlength=n)
+            matched_weight = np.bincount(np.concatenate(weighted_rows), weights=np.concatenate(weights), minlength=n)
+            matched_main = (np.bincount(np.concatenate(main_rows), minlength=n) if main_rows
+                            else np.zeros(n, dtype=np.int64))
+
+            alive = self._alive[:n]
+            candidates = np.flatnonzero((matched_count > 0) & alive)
+            main_total = self._main_total[candidates]
+            missing_main = main_total - matched_main[candidates]
+            if max_missing_main is not None:
+                keep = missing_main <= max_missing_main
+                candidates, main_total, missing_main = candidates[keep], main_total[keep], missing_main[keep]
+            if not len(candidates):
+                return []
+
+            weight_total = self._weight_total[candidates]
+            coverage = np.divide(matched_weight[candidates], weight_total,
+                                 out=np.ones(len(candidates)), where=weight_total > 0)
+            dish_ids = self._dish_ids[candidates]
+            # np.lexsort sorts by the last key first
+            order = np.lexsort((dish_ids, missing_main, -coverage))[:limit]
+
+            link_total = self._link_total[candidates]
+            return [
+                {
+                    "dish_id": int(dish_ids[i]),
+                    "coverage": round(float(coverage[i]), 4),
+                    "matched": int(matched_count[candidates[i]]),
+                    "missing": int(link_total[i] - matched_count[candidates[i]]),
+                    "matched_main": int(main_total[i] - missing_main[i]),
+                    "missing_main": int(missing_main[i]),
+                }
+                for i in order
+            ]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "built": self.built,
+                "dishes": len(self._row_of_dish),
+                "ingredients": len(self._ingredient_types),
+                "age_s": round(time.monotonic() - self._built_at, 1) if self._built_at else None,
+            }
@@ -1,54 +1,142 @@
-import os
+"""
+GoCooking 3 API entry point.
+
+create_app() builds the application. Importing this module does not: `app` is created
+on first access, so both `uvicorn backend.main:app` and
+`uvicorn backend.main:create_app --factory` work, and `python -m backend.main --env prod`
+selects the environment before backend.database reads its settings. The database is
+first touched by the startup warmup (backend/warmup.py), not at import.
+
+`python -m backend.main --workers 4 --preload --max-requests 10000` serves with
+several processes: gunicorn with uvicorn workers when gunicorn is installed (see
+serve_workers), otherwise uvicorn's own process manager.
+"""
 import argparse
+import os
+import time
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from backend.routes.dish_routes import router as dish_router
-from backend.routes.ingredient_routes import router as ingredient_router
 
-def set_environment():
-    """Set the environment before importing database to ensure proper configuration"""
-    # Only parse arguments if running as main script
-    if __name__ == "__main__":
-        parser = argparse.ArgumentParser(description='Start GoCooking 3 API')
-        parser.add_argument('--env', '-e', type=str, default='dev',
-                            choices=['dev', 'development', 'prod', 'production'],
-                            help='Environment to run the application (default: dev)')
+def create_app():
+    started = time.perf_counter()
+    # Imported here so that ENV can still be chosen after this module is imported
+    from backend.routes.dish_routes import router as dish_router
+    from backend.routes.ingredient_routes import router as ingredient_router
+    from backend.routes.metrics_routes import router as metrics_router
+    from backend.database import (
+        REQUEST_METRICS, DB_QUERY_STATS, DB_QUERY_STATS_HEADERS, DB_N_PLUS_ONE_THRESHOLD, close_engines
+    )
+    from backend.request_metrics import RequestMetricsMiddleware
+    from backend.query_stats import QueryStatsMiddleware
+    from backend.warmup import warmup
+    from backend.crud import cache_event_bus
 
-        # Parse only known args to avoid conflicts with uvicorn
-        args, _ = parser.parse_known_args()
+    app = FastAPI(title="GoCooking 3 API", version="1.0.0")
 
-        # Set environment variable for database connection
-        os.environ['ENV'] = args.env
-        print(f"Selected environment: {args.env}")
-    else:
-        # For imports, use the existing environment or default to dev
-        if 'ENV' not in os.environ:
-            os.environ['ENV'] = 'dev'
+    # Add CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # In production, replace with specific origins
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    if DB_QUERY_STATS:
+        app.add_middleware(QueryStatsMiddleware, headers=DB_QUERY_STATS_HEADERS,
+                           n_plus_one_threshold=DB_N_PLUS_ONE_THRESHOLD)
+    if REQUEST_METRICS:
+        # Added last, so it wraps CORS and also times preflight requests
+        app.add_middleware(RequestMetricsMiddleware)
 
-set_environment()
+    # Include routes
+    app.include_router(dish_router)
+    app.include_router(ingredient_router)
+    app.include_router(metrics_router)
 
-app = FastAPI(title="GoCooking 3 API", version="1.0.0")
+    @app.get("/")
+    def read_root():
+        env = os.getenv('ENV', 'dev')
+        return {"message": f"Welcome to GoCooking 3 API", "environment": env}
 
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, replace with specific origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+    # Milliseconds per startup phase, reported on /metrics
+    app.state.startup_ms = {"create_app": round((time.perf_counter() - started) * 1000, 1)}
 
-# Include routes
-app.include_router(dish_router)
-app.include_router(ingredient_router)
+    @app.on_event("startup")
+    async def run_warmup():
+        warmup_started = time.perf_counter()
+        app.state.startup_ms.update(await warmup())
+        app.state.startup_ms["warmup"] = round((time.perf_counter() - warmup_started) * 1000, 1)
+        print("Startup: " + ", ".join(f"{name} {ms} ms" for name, ms in app.state.startup_ms.items()))
 
-@app.get("/")
-def read_root():
-    env = os.getenv('ENV', 'dev')
-    return {"message": f"Welcome to GoCooking 3 API", "environment": env}
+    @app.on_event("shutdown")
+    async def close_connections():
+        # Runs once in-flight requests are done: close this worker's pooled connections
+        # instead of leaving them to be dropped with the process
+        if cache_event_bus is not None:
+            cache_event_bus.stop()
+        await close_engines()
 
-if __name__ == "__main__":
+    return app
+
+
+def __getattr__(name):
+    # `uvicorn backend.main:app`: build the application on first access
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _post_fork(server, worker):
+    # gunicorn hook: with --preload, anything the master opened before forking must
+    # not be shared with the worker; the worker opens its own connections
+    from backend.database import dispose_engines
+    dispose_engines(close=False)
+
+
+def serve_workers(args):
+    """Serve with args.workers processes; see main() for the options."""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        # No gunicorn (e.g. on Windows): uvicorn's process manager neither preloads
+        # nor replaces workers, so --preload and --max-requests are not available
+        import uvicorn
+        if args.preload or args.max_requests:
+            print("gunicorn is not installed; ignoring --preload and --max-requests")
+        uvicorn.run("backend.main:create_app", factory=True, host=args.host, port=args.port, workers=args.workers,
+                    timeout_graceful_shutdown=args.graceful_timeout)
+        return
+
+    options = {
+        "bind": f"{args.host}:{args.port}",
+        "workers": args.workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": args.preload,
+        "max_requests": args.max_requests,
+        # Spread the restarts so the workers are not recycled all at once
+        "max_requests_jitter": args.max_requests_jitter if args.max_requests_jitter is not None
+        else args.max_requests // 10,
+        "graceful_timeout": args.graceful_timeout,
+        "post_fork": _post_fork,
+    }
+
+    class Application(BaseApplication):
+        def load_config(self):
+            for name, value in options.items():
+                self.cfg.set(name, value)
+
+        def load(self):
+            # In the master with --preload, otherwise in every worker after the fork
+            return create_app()
+
+    Application().run()
+
+
+def main():
     import uvicorn
     parser = argparse.ArgumentParser(description='Start GoCooking 3 API')
     parser.add_argument('--env', '-e', type=str, default='dev',
@@ -58,11 +146,33 @@ if __name__ == "__main__":
                         help='Host to run the application (default: 0.0.0.0)')
     parser.add_argument('--port', type=int, default=8000,
                         help='Port to run the application (default: 8000)')
+    parser.add_argument('--workers', '-w', type=int, default=1,
+                        help='Worker processes, 0 = one per CPU core (default: 1)')
+    parser.add_argument('--preload', action='store_true',
+                        help='Import and build the app once before forking the workers (gunicorn only)')
+    parser.add_argument('--max-requests', type=int, default=0,
+                        help='Restart a worker after this many requests to cap memory growth, 0 = never '
+                             '(gunicorn only, default: 0)')
+    parser.add_argument('--max-requests-jitter', type=int, default=None,
+                        help='Random extra requests per worker before its restart (default: --max-requests / 10)')
+    parser.add_argument('--graceful-timeout', type=int, default=30,
+                        help='Seconds in-flight requests get to finish on shutdown or restart (default: 30)')
 
     args = parser.parse_args()
+    if args.workers == 0:
+        args.workers = os.cpu_count() or 1
 
-    # Update environment if needed
+    # Set before create_app() imports backend.database
     os.environ['ENV'] = args.env
     print(f"Starting server in {args.env} environment")
 
-    uvicorn.run(app, host=args.host, port=args.port)
\ No newline at end of file
+    # --preload and --max-requests only exist in the worker mode, so they select it even with one worker
+    if args.workers > 1 or args.max_requests or args.preload:
+        print(f"Serving with {args.workers} worker processes")
+        serve_workers(args)
+    else:
+        uvicorn.run(create_app(), host=args.host, port=args.port, timeout_graceful_shutdown=args.graceful_timeout)
+
+
+if __name__ == "__main__":
+    main()
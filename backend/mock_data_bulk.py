@@ -0,0 +1,274 @@
+# Bulk mock data loader
+# Fills a database with millions of synthetic dishes for load tests and query plan
+# checks. Rows are generated from a seed and the reserved dish ids (the same
+# arguments on a database in the same state give the same rows, with timestamps
+# relative to the load time), written with COPY by several worker processes in
+# parallel, and the derived tables (dish_card, dish_stats) are refreshed at the end.
+#
+# A contiguous range of dish ids is reserved up front with setval, so every worker
+# writes its own id range and links, steps and history can reference the ids
+# without a round trip.
+# Use mock_data_generator.py instead to create a few dishes through the crud path.
+
+import os
+import sys
+import io
+import time
+import random
+import argparse
+import multiprocessing
+from itertools import accumulate
+
+# Add the project root to the Python path so imports work correctly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Name parts; a dish id maps to one combination, so generated dish names are unique
+STYLES = ["家常", "川味", "粤式", "秘制", "经典", "湘味", "东北", "江南", "农家", "老北京"]
+METHODS = ["红烧", "清蒸", "爆炒", "干煸", "酱爆", "油焖", "凉拌", "糖醋", "香煎", "水煮", "蒜蓉", "椒盐"]
+QUALIFIERS = ["", "散养", "有机", "进口", "本地", "精选", "冷冻", "野生", "特级", "农家"]
+USAGES = ["适量", "少许", "一大勺", "一小勺", "按口味添加", "200克", "300克", "1根", "2个", "半斤"]
+# Share of ingredients per type (1主料 2辅料 3调料), out of 20
+TYPE_SHARES = [(1, 8), (2, 7), (3, 5)]
+# Rating distribution of the cooking history (1很棒 .. 4拉胯)
+RATINGS = [1, 1, 2, 2, 2, 3, 4]
+# Popularity skew of ingredients (Zipf exponent) and of dishes (Pareto shape)
+INGREDIENT_SKEW = 0.9
+DISH_POPULARITY_SHAPE = 1.16
+CREATE_TIME_SPAN_S = 2 * 365 * 86400
+HISTORY_TIME_SPAN_S = 365 * 86400
+
+COPY_DISH = "COPY dish (id, dish_name, difficult, create_time, modify_time) FROM STDIN"
+COPY_LINKS = "COPY dish_ingredients (dish_id, ingredient_id, usage) FROM STDIN"
+COPY_STEPS = "COPY dish_step (dish_id, step_order, step_text) FROM STDIN"
+COPY_HISTORY = "COPY dish_history (dish_id, cooking_time, cooking_rating) FROM STDIN"
+
+# Set in every worker by _init_worker
+_worker = {}
+
+
+def _copy_text(value):
+    """Escape a value for COPY's text format."""
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _timestamp(epoch_seconds):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(epoch_seconds))
+
+
+def ingredient_names(count, bases):
+    """
+    count unique (name, type) pairs: TYPE_SHARES of each type, each name a base name of
+    that type with a qualifier, numbered once the combinations run out.
+    """
+    per_type = {ingredient_type: 0 for ingredient_type, _ in TYPE_SHARES}
+    slots = [ingredient_type for ingredient_type, share in TYPE_SHARES for _ in range(share)]
+    names = []
+    for i in range(count):
+        ingredient_type = slots[i % len(slots)]
+        base = bases[ingredient_type]
+        index = per_type[ingredient_type]
+        per_type[ingredient_type] += 1
+        round_number, position = divmod(index, len(base))
+        qualifier = QUALIFIERS[round_number % len(QUALIFIERS)]
+        number = round_number // len(QUALIFIERS)
+        names.append((f"{qualifier}{base[position]}{number + 1 if number else ''}", ingredient_type))
+    return names
+
+
+def dish_name(dish_id, main_names):
+    round_number, index = divmod(dish_id, len(STYLES) * len(METHODS) * len(main_names))
+    index, style = divmod(index, len(STYLES))
+    main, method = divmod(index, len(METHODS))
+    name = f"{STYLES[style]}{METHODS[method]}{main_names[main]}"
+    return f"{name}（{round_number}）" if round_number else name
+
+
+def _init_worker(connect_args, settings):
+    import psycopg2
+
+    _worker["connection"] = psycopg2.connect(**connect_args)
+    _worker.update(settings)
+
+
+def _load_chunk(task):
+    """Generate and COPY one id range; returns the row counts written per table."""
+    first_id, count, history_count = task
+    settings = _worker
+    rng = random.Random(f"{settings['seed']}:{first_id}")
+    ingredient_ids, cum_weights = settings["ingredient_ids"], settings["ingredient_cum_weights"]
+    links_per_dish, now = settings["links_per_dish"], settings["now"]
+    population = range(len(ingredient_ids))
+
+    dishes, links, steps, history = [], [], [], []
+    dish_ids = range(first_id, first_id + count)
+    for dish_id in dish_ids:
+        created = _timestamp(now - rng.randrange(CREATE_TIME_SPAN_S))
+        name = _copy_text(dish_name(dish_id, settings["main_names"]))
+        dishes.append(f"{dish_id}\t{name}\t{rng.randint(1, 3)}\t{created}\t{created}\n")
+
+        link_count = rng.randint(max(1, links_per_dish // 2), links_per_dish + links_per_dish // 2)
+        picked = dict.fromkeys(rng.choices(population, cum_weights=cum_weights, k=link_count))
+        for position in picked:
+            links.append(f"{dish_id}\t{ingredient_ids[position]}\t{rng.choice(USAGES)}\n")
+
+        for step_order in range(1, rng.randint(4, 10) + 1):
+            steps.append(f"{dish_id}\t{step_order}\t{rng.choice(settings['step_texts'])}\n")
+
+    if history_count:
+        # A few dishes collect most of the cooking records
+        popularity = [rng.paretovariate(DISH_POPULARITY_SHAPE) for _ in dish_ids]
+        for dish_id in rng.choices(dish_ids, weights=popularity, k=history_count):
+            cooked = _timestamp(now - rng.randrange(HISTORY_TIME_SPAN_S))
+            history.append(f"{dish_id}\t{cooked}\t{rng.choice(RATINGS)}\n")
+
+    connection = _worker["connection"]
+    with connection.cursor() as cursor:
+        for statement, rows in ((COPY_DISH, dishes), (COPY_LINKS, links), (COPY_STEPS, steps),
+                                (COPY_HISTORY, history)):
+            if rows:
+                cursor.copy_expert(statement, io.StringIO("".join(rows)))
+        cursor.execute(settings["refresh_cards_sql"], {"first": first_id, "last": first_id + count - 1})
+    connection.commit()
+    return len(dishes), len(links), len(steps), len(history)
+
+
+def _load_ingredients(connection, names, normalize):
+    """Insert the ingredients that do not exist yet; returns the ids in the order of names."""
+    buffer = io.StringIO("".join(
+        f"{position}\t{_copy_text(name)}\t{ingredient_type}\t{_copy_text(normalize(name))}\n"
+        for position, (name, ingredient_type) in enumerate(names)
+    ))
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE TEMP TABLE mock_ingredient (position int, ingredient_name text, type smallint, "
+                       "name_key text) ON COMMIT DROP")
+        cursor.copy_expert("COPY mock_ingredient FROM STDIN", buffer)
+        cursor.execute("INSERT INTO ingredient (ingredient_name, type, name_key) "
+                       "SELECT ingredient_name, type, name_key FROM mock_ingredient ORDER BY position "
+                       "ON CONFLICT (name_key) DO NOTHING")
+        cursor.execute("SELECT i.id FROM mock_ingredient m JOIN ingredient i ON i.name_key = m.name_key "
+                       "ORDER BY m.position")
+        ids = [row[0] for row in cursor.fetchall()]
+    connection.commit()
+    return ids
+
+
+def _reserve_dish_ids(connection, count):
+    """Advance the dish id sequence by count; returns the first reserved id."""
+    with connection.cursor() as cursor:
+        # nextval and setval are two steps: without the lock an INSERT INTO dish (or
+        # another loader) could take an id inside the range in between. The lock
+        # conflicts with the ROW EXCLUSIVE lock of every INSERT and with itself, and
+        # is held until the commit below. nextval() FROM generate_series would be
+        # atomic too, but its ids are not contiguous when other sessions insert.
+        cursor.execute("LOCK TABLE dish IN SHARE ROW EXCLUSIVE MODE")
+        cursor.execute("SELECT setval(pg_get_serial_sequence('dish', 'id'), "
+                       "nextval(pg_get_serial_sequence('dish', 'id')) + %s - 1)", (count,))
+        last_id = cursor.fetchone()[0]
+    connection.commit()
+    return last_id - count + 1
+
+
+def generate(env=None, dishes=100000, ingredients=5000, links_per_dish=10, history=300000, workers=None,
+             seed=0, chunk_size=20000):
+    """
+    Bulk-load mock data
+    :param env: Environment to use ('dev', 'prod', etc.). If None, uses default or ENV variable
+    :param dishes: Number of dishes to add
+    :param ingredients: Size of the ingredient vocabulary (existing names are reused)
+    :param links_per_dish: Average number of ingredients per dish
+    :param history: Number of cooking records to add
+    :param workers: Worker processes (default: CPU count)
+    :param seed: Random seed; with the same arguments and the same first reserved dish
+                 id (e.g. on an empty database) the rows are the same, apart from
+                 timestamps, which are relative to the load time
+    :param chunk_size: Dishes per COPY transaction
+    """
+    if env is not None:
+        os.environ['ENV'] = env
+    elif 'ENV' not in os.environ:
+        os.environ['ENV'] = 'dev'
+
+    # Import after ENV is set so the right database is selected
+    import psycopg2
+    from sqlalchemy import text
+    from sqlalchemy.engine import make_url
+    from backend.database import DATABASE_URL, SessionLocal, dispose_engines
+    from backend import crud
+    from backend.mock_data_generator import main_ingredients, secondary_ingredients, seasonings, \
+        step_descriptions
+
+    url = make_url(DATABASE_URL)
+    connect_args = {**url.translate_connect_args(username="user", database="dbname"), **url.query}
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+
+    bases = {1: list(dict.fromkeys(main_ingredients)), 2: list(dict.fromkeys(secondary_ingredients)),
+             3: list(dict.fromkeys(seasonings))}
+    names = ingredient_names(ingredients, bases)
+    connection = psycopg2.connect(**connect_args)
+    try:
+        ingredient_ids = _load_ingredients(connection, names, crud.normalize_ingredient_name)
+        first_id = _reserve_dish_ids(connection, dishes)
+    finally:
+        connection.close()
+    print(f"{len(ingredient_ids)} ingredients ready, dish ids {first_id}..{first_id + dishes - 1} reserved")
+
+    settings = {
+        "seed": seed,
+        "now": int(time.time()),
+        "links_per_dish": links_per_dish,
+        "ingredient_ids": ingredient_ids,
+        # Zipf: a few seasonings and staples appear in most dishes
+        "ingredient_cum_weights": list(accumulate(1.0 / (rank + 1) ** INGREDIENT_SKEW
+                                                  for rank in range(len(ingredient_ids)))),
+        "main_names": bases[1],
+        "step_texts": [_copy_text(text) for text in step_descriptions],
+        "refresh_cards_sql": crud.REFRESH_DISH_CARDS_SQL.format(where="d.id BETWEEN %(first)s AND %(last)s"),
+    }
+    tasks = []
+    for offset in range(0, dishes, chunk_size):
+        count = min(chunk_size, dishes - offset)
+        # Spread the history over the chunks in proportion to their dishes
+        history_count = history * (offset + count) // dishes - history * offset // dishes
+        tasks.append((first_id + offset, count, history_count))
+
+    # Connections must not cross a fork; the workers open their own
+    dispose_engines()
+    totals = [0, 0, 0, 0]
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(connect_args, settings)) as pool:
+        for counts in pool.imap_unordered(_load_chunk, tasks):
+            totals = [total + count for total, count in zip(totals, counts)]
+            elapsed = time.perf_counter() - started
+            print(f"  {totals[0]}/{dishes} dishes, {totals[1]} links ({totals[0] / elapsed:.0f} dishes/s)")
+
+    db = SessionLocal()
+    try:
+        crud.rebuild_dish_stats(db)
+        db.execute(text("ANALYZE dish, dish_ingredients, dish_step, dish_history, dish_card, dish_stats, "
+                             "ingredient"))
+        db.commit()
+    finally:
+        db.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"Added {totals[0]} dishes, {totals[1]} ingredient links, {totals[2]} steps and {totals[3]} cooking "
+          f"records in {elapsed:.1f}s to {os.environ['ENV']} environment")
+    return totals
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Bulk-load GoCooking 3 mock data with COPY')
+    parser.add_argument('--env', '-e', type=str, default='dev',
+                        choices=['dev', 'development', 'prod', 'production'],
+                        help='Environment to load into (default: dev)')
+    parser.add_argument('--dishes', type=int, default=100000, help='Dishes to add (default: 100000)')
+    parser.add_argument('--ingredients', type=int, default=5000, help='Ingredient vocabulary size (default: 5000)')
+    parser.add_argument('--links-per-dish', type=int, default=10,
+                        help='Average ingredients per dish (default: 10)')
+    parser.add_argument('--history', type=int, default=300000, help='Cooking records to add (default: 300000)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('--chunk-size', type=int, default=20000, help='Dishes per COPY transaction (default: 20000)')
+    args = parser.parse_args()
+    generate(args.env, args.dishes, args.ingredients, args.links_per_dish, args.history, args.workers,
+             args.seed, args.chunk_size)
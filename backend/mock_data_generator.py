@@ -1,11 +1,11 @@
 """
 Mock data generator for GoCooking 3
 This module provides utilities to generate mock data for testing purposes
+Creates dishes one at a time through crud; use mock_data_bulk.py to load large datasets
 """
 import random
 import sys
 import os
-from datetime import datetime
 
 # Add the project root to the Python path so imports work correctly
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -98,17 +98,19 @@ def generate_mock_dish():
         "steps": steps
     }
 
-def generate_and_insert_mock_dish():
+def generate_and_insert_mock_dish(create_tables=True):
     """
     Generate a mock dish with ingredients and steps, then insert into the database
     This function handles the database operations internally using the proper add function
+    :param create_tables: Create missing tables first (only needed once per run)
     """
     # Create database tables first (in case this is the first run)
-    try:
-        create_db_and_tables()
-    except Exception:
-        # If database connection fails, that's OK for this test - we just want to show the mechanism
-        pass
+    if create_tables:
+        try:
+            create_db_and_tables()
+        except Exception:
+            # If database connection fails, that's OK for this test - we just want to show the mechanism
+            pass
 
     # Generate mock data
     mock_data = generate_mock_dish()
@@ -199,7 +201,7 @@ def generate_multiple_mock_dishes(count=5):
 
     for i in range(count):
         print(f"\n--- Creating dish {i+1}/{count} ---")
-        result = generate_and_insert_mock_dish()
+        result = generate_and_insert_mock_dish(create_tables=i == 0)
         if result:
             created_dishes.append(result)
         else:
@@ -1,12 +1,18 @@
 from sqlmodel import SQLModel, Field, Relationship
 from typing import Optional, List
 from datetime import datetime, date
-from sqlalchemy import Column, DateTime, String, Text, SmallInteger, text
+from sqlalchemy import Column, DateTime, String, Text, SmallInteger, Integer, ForeignKey, Index, text
+from sqlalchemy.dialects.postgresql import ARRAY
 
 
 # Association table for many-to-many relationship between dishes and ingredients
 class DishIngredientLink(SQLModel, table=True):
     __tablename__ = "dish_ingredients"
+    __table_args__ = (
+        # Dishes using an ingredient; the primary key only covers lookups by dish_id
+        Index("ix_dish_ingredients_ingredient_id", "ingredient_id"),
+    )
+
     dish_id: int = Field(foreign_key="dish.id", primary_key=True)
     ingredient_id: int = Field(foreign_key="ingredient.id", primary_key=True)
     usage: str = Field(default="", sa_column=Column("usage", Text, server_default=""))  # 用量
@@ -24,6 +30,11 @@ class DishIngredientLink(SQLModel, table=True):
 
 class Dish(SQLModel, table=True):
     __tablename__ = "dish"
+    __table_args__ = (
+        # pg_trgm index for substring / fuzzy name search (see crud.dish_name_filter)
+        Index("ix_dish_dish_name_trgm", "dish_name", postgresql_using="gin",
+              postgresql_ops={"dish_name": "gin_trgm_ops"}),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True, index=True)
     dish_name: str = Field(default="", max_length=255, sa_column=Column("dish_name", String, server_default=""))
@@ -48,10 +59,15 @@ class Dish(SQLModel, table=True):
 
 class Ingredient(SQLModel, table=True):
     __tablename__ = "ingredient"
+    __table_args__ = (
+        # One ingredient per normalized name (see crud.normalize_ingredient_name)
+        Index("ux_ingredient_name_key", "name_key", unique=True),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True, index=True)
     ingredient_name: str = Field(default="", max_length=255, sa_column=Column("ingredient_name", String, server_default=""))
     type: int = Field(default=1, sa_column=Column("type", SmallInteger, server_default="1"))  # 1主料 2辅料 3调料
+    name_key: str = Field(default="", sa_column=Column("name_key", String, server_default=""))  # 归一化名称
     create_time: Optional[datetime] = Field(
         sa_column=Column(DateTime, server_default=text("CURRENT_TIMESTAMP"))
     )
@@ -69,6 +85,10 @@ class Ingredient(SQLModel, table=True):
 
 class DishStep(SQLModel, table=True):
     __tablename__ = "dish_step"
+    __table_args__ = (
+        # Steps of a dish in order (detail, export)
+        Index("ix_dish_step_dish_id_step_order", "dish_id", "step_order"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True, index=True)
     dish_id: int = Field(foreign_key="dish.id")
@@ -87,6 +107,12 @@ class DishStep(SQLModel, table=True):
 
 class DishHistory(SQLModel, table=True):
     __tablename__ = "dish_history"
+    __table_args__ = (
+        # Time ranges per dish and across dishes for history and analytics (crud.get_history_analytics)
+        Index("ix_dish_history_dish_id_cooking_time", "dish_id", "cooking_time",
+              postgresql_include=["cooking_rating"]),
+        Index("ix_dish_history_cooking_time", "cooking_time", postgresql_include=["cooking_rating"]),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True, index=True)
     dish_id: int = Field(foreign_key="dish.id")
@@ -102,3 +128,62 @@ class DishHistory(SQLModel, table=True):
     # Relationship
     dish: Optional[Dish] = Relationship(back_populates="histories")
 
+
+class DishStats(SQLModel, table=True):
+    """
+    Cooking summary per dish, maintained by crud.create_dish_history in the same
+    transaction as the history row (rebuild with backend/rebuild_dish_stats.py).
+    """
+    __tablename__ = "dish_stats"
+
+    dish_id: int = Field(
+        sa_column=Column("dish_id", Integer, ForeignKey("dish.id", ondelete="CASCADE"), primary_key=True)
+    )
+    cook_count: int = Field(default=0, sa_column=Column("cook_count", Integer, server_default="0"))
+    # Rating histogram: 1很棒 2还行 3一般 4拉胯
+    rating_1_count: int = Field(default=0, sa_column=Column("rating_1_count", Integer, server_default="0"))
+    rating_2_count: int = Field(default=0, sa_column=Column("rating_2_count", Integer, server_default="0"))
+    rating_3_count: int = Field(default=0, sa_column=Column("rating_3_count", Integer, server_default="0"))
+    rating_4_count: int = Field(default=0, sa_column=Column("rating_4_count", Integer, server_default="0"))
+    rating_sum: int = Field(default=0, sa_column=Column("rating_sum", Integer, server_default="0"))
+    last_cooked_time: Optional[datetime] = Field(sa_column=Column("last_cooked_time", DateTime))
+    create_time: Optional[datetime] = Field(
+        sa_column=Column(DateTime, server_default=text("CURRENT_TIMESTAMP"))
+    )
+    modify_time: Optional[datetime] = Field(
+        sa_column=Column(DateTime, server_default=text("CURRENT_TIMESTAMP"), onupdate=text("CURRENT_TIMESTAMP"))
+    )
+
+
+class DishCard(SQLModel, table=True):
+    """
+    Denormalized home page card per dish, rewritten by crud.refresh_dish_cards in the
+    same transaction as every dish / ingredient link write. /dish/select reads only
+    this table.
+    """
+    __tablename__ = "dish_card"
+    __table_args__ = (
+        Index("ix_dish_card_dish_name_trgm", "dish_name", postgresql_using="gin",
+              postgresql_ops={"dish_name": "gin_trgm_ops"}),
+        # (sort key, id) indexes for keyset pagination of the dish list (see crud.DISH_SORTS)
+        Index("ix_dish_card_dish_name_id", "dish_name", "dish_id"),
+        Index("ix_dish_card_create_time_id", "create_time", "dish_id"),
+        Index("ix_dish_card_difficult_id", "difficult", "dish_id"),
+    )
+
+    dish_id: int = Field(
+        sa_column=Column("dish_id", Integer, ForeignKey("dish.id", ondelete="CASCADE"), primary_key=True)
+    )
+    dish_name: str = Field(default="", sa_column=Column("dish_name", String, server_default=""))
+    difficult: int = Field(default=1, sa_column=Column("difficult", SmallInteger, server_default="1"))
+    # Names of the main ingredients (type == 1)
+    main_ingredients: List[str] = Field(
+        default=[], sa_column=Column("main_ingredients", ARRAY(Text), server_default="{}")
+    )
+    # create_time of the dish, for the "newest" sort
+    create_time: Optional[datetime] = Field(
+        sa_column=Column(DateTime, server_default=text("CURRENT_TIMESTAMP"))
+    )
+    modify_time: Optional[datetime] = Field(
+        sa_column=Column(DateTime, server_default=text("CURRENT_TIMESTAMP"), onupdate=text("CURRENT_TIMESTAMP"))
+    )
@@ -0,0 +1,119 @@
+"""
+Connection pool instrumentation.
+
+The pool classes below behave exactly like SQLAlchemy's QueuePool / AsyncAdaptedQueuePool
+but time every checkout, so the time requests spend waiting for a free connection
+can be read from /metrics/pool instead of being inferred from request latency.
+Opening a new connection during a checkout is reported separately as connect time.
+"""
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+
+class PoolWaitStats:
+    """Checkout counters for one pool. Updated from many threads, hence the lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.connects = 0
+        self.connect_seconds_total = 0.0
+        self.connect_seconds_max = 0.0
+
+    def record(self, waited, timed_out=False, connect_seconds=None):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += waited
+            if waited > self.wait_seconds_max:
+                self.wait_seconds_max = waited
+            if connect_seconds is not None:
+                self.connects += 1
+                self.connect_seconds_total += connect_seconds
+                if connect_seconds > self.connect_seconds_max:
+                    self.connect_seconds_max = connect_seconds
+
+    def snapshot(self):
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "checkout_timeouts": self.timeouts,
+                "wait_ms_total": round(self.wait_seconds_total * 1000, 3),
+                "wait_ms_avg": round(self.wait_seconds_total * 1000 / attempts, 3) if attempts else 0.0,
+                "wait_ms_max": round(self.wait_seconds_max * 1000, 3),
+                "connects": self.connects,
+                "connect_ms_total": round(self.connect_seconds_total * 1000, 3),
+                "connect_ms_avg": round(self.connect_seconds_total * 1000 / self.connects, 3)
+                if self.connects else 0.0,
+                "connect_ms_max": round(self.connect_seconds_max * 1000, 3),
+            }
+
+
+class _TimedCheckoutMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def recreate(self):
+        # Keep counters across dispose()/recreate() so the metrics stay monotonic
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+    def _create_connection(self):
+        # Called from _do_get when no pooled connection is free but the pool may grow:
+        # connecting is not waiting for a free connection, so it is timed on its own
+        started = time.perf_counter()
+        record = super()._create_connection()
+        record.connect_seconds = time.perf_counter() - started
+        return record
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            self.wait_stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        elapsed = time.perf_counter() - started
+        # Only a record created by this checkout carries connect_seconds
+        connect_seconds = vars(record).pop("connect_seconds", None)
+        self.wait_stats.record(elapsed - (connect_seconds or 0.0), connect_seconds=connect_seconds)
+        return record
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_status(engine):
+    """Current occupancy and checkout wait statistics of an engine's pool."""
+    pool = engine.pool
+    status = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            # QueuePool.overflow() starts at -size; only connections beyond size count
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout_s": pool.timeout(),
+        })
+    wait_stats = getattr(pool, "wait_stats", None)
+    if wait_stats is not None:
+        status.update(wait_stats.snapshot())
+    return status
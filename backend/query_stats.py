@@ -0,0 +1,159 @@
+"""
+Per-request SQL statistics: statement count, database time, N+1 candidates and a
+slow-query log.
+
+instrument_engine() hooks before/after_cursor_execute of an engine. Each statement
+is timed and added to the QueryStats of the current request, found through a
+context variable set by QueryStatsMiddleware. The variable reaches the threadpool
+(run_in_threadpool copies the context) and the greenlet of an AsyncSession, so
+both DB_ASYNC modes are covered.
+
+At the end of a request the same statement text seen n_plus_one_threshold times or
+more is logged as an N+1 candidate (one query per row of an earlier result, e.g. a
+lazy-loaded relationship in a loop). Statements slower than slow_query_ms are
+logged as they finish, as one JSON object per line on the "backend.sql" logger.
+"""
+from contextvars import ContextVar
+import json
+import logging
+import time
+
+from sqlalchemy import event
+
+from backend.request_metrics import route_template
+
+logger = logging.getLogger("backend.sql")
+
+# Characters of a statement kept in log records
+STATEMENT_LOG_CHARS = 1000
+
+_current = ContextVar("query_stats", default=None)
+
+
+class QueryStats:
+    __slots__ = ("route", "count", "seconds", "statements")
+
+    def __init__(self, route=None):
+        self.route = route
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = {}  # statement text -> executions
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+
+    def repeated(self, threshold):
+        """(statement, executions) of statements run at least threshold times."""
+        return [(statement, count) for statement, count in self.statements.items() if count >= threshold]
+
+
+class RouteQueryTotals:
+    __slots__ = ("requests", "queries", "seconds", "n_plus_one")
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.seconds = 0.0
+        self.n_plus_one = 0
+
+
+# route template -> RouteQueryTotals, for /metrics; updated from the event loop thread
+route_totals = {}
+
+
+def current_stats():
+    """QueryStats of the request being handled, or None outside a request."""
+    return _current.get()
+
+
+def _log(record):
+    logger.warning(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def _compact(statement):
+    return " ".join(statement.split())[:STATEMENT_LOG_CHARS]
+
+
+def instrument_engine(engine, slow_query_ms=0.0):
+    """Time every statement of engine (a sync Engine, e.g. async_engine.sync_engine)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        seconds = time.perf_counter() - started
+        stats = _current.get()
+        if stats is not None:
+            stats.record(statement, seconds)
+        if slow_query_ms and seconds * 1000 >= slow_query_ms:
+            _log({
+                "event": "slow_query",
+                "route": stats.route if stats is not None else None,
+                "duration_ms": round(seconds * 1000, 2),
+                "rows": cursor.rowcount,
+                "executemany": executemany,
+                "statement": _compact(statement),
+            })
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(context):
+        # after_cursor_execute does not run for failed statements
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+class QueryStatsMiddleware:
+    """
+    Collects QueryStats for every HTTP request. With headers=True the response carries
+    X-DB-Query-Count and X-DB-Time-Ms (statements run before the response started).
+    """
+
+    def __init__(self, app, headers=False, n_plus_one_threshold=5):
+        self.app = app
+        self.headers = headers
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current.set(stats)
+
+        async def send_with_stats(message):
+            if message["type"] == "http.response.start":
+                # The router has matched by now
+                stats.route = route_template(scope)
+                if self.headers:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-db-query-count", str(stats.count).encode()),
+                        (b"x-db-time-ms", f"{stats.seconds * 1000:.2f}".encode()),
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            _current.reset(token)
+            self._finish(stats, route_template(scope))
+
+    def _finish(self, stats, route):
+        stats.route = route
+        repeated = stats.repeated(self.n_plus_one_threshold) if self.n_plus_one_threshold else []
+        for statement, count in repeated:
+            _log({"event": "n_plus_one", "route": route, "executions": count, "statement": _compact(statement)})
+
+        totals = route_totals.get(route)
+        if totals is None:
+            totals = route_totals[route] = RouteQueryTotals()
+        totals.requests += 1
+        totals.queries += stats.count
+        totals.seconds += stats.seconds
+        totals.n_plus_one += len(repeated)
@@ -0,0 +1,41 @@
+# Dish statistics rebuild script
+# Recomputes the dish_stats summary table from dish_history (backfill after the
+# migration, or repair after history was edited by hand)
+
+import os
+import sys
+import argparse
+
+# Add the project root to the Python path so imports work correctly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def rebuild(env=None):
+    """
+    Rebuild dish_stats
+    :param env: Environment to use ('dev', 'prod', etc.). If None, uses default or ENV variable
+    """
+    if env is not None:
+        os.environ['ENV'] = env
+    elif 'ENV' not in os.environ:
+        os.environ['ENV'] = 'dev'
+
+    # Import after ENV is set so the right database is selected
+    from backend.database import SessionLocal
+    from backend.crud import rebuild_dish_stats
+
+    db = SessionLocal()
+    try:
+        count = rebuild_dish_stats(db)
+    finally:
+        db.close()
+    print(f"Rebuilt statistics for {count} dishes in {os.environ['ENV']} environment")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Rebuild GoCooking 3 dish statistics')
+    parser.add_argument('--env', '-e', type=str, default='dev',
+                        choices=['dev', 'development', 'prod', 'production'],
+                        help='Environment to run the rebuild (default: dev)')
+    args = parser.parse_args()
+    rebuild(args.env)
@@ -0,0 +1,305 @@
+"""
+History-driven dish recommendations.
+
+Every dish is a row of a dishes x features matrix scored with one matrix-vector
+product:
+
+- recency: 0 right after the dish was cooked, approaching 1 as the last cooking
+  recedes (time constant RECENCY_DAYS); 1 for dishes never cooked
+- frequency: log-scaled cook count relative to the most cooked dish
+- rating: mean rating (1很棒 .. 4拉胯) mapped to 1 .. 0, shrunk towards the middle
+  for dishes cooked only a few times
+- overlap: share of the dish's ingredients that appear in well-rated dishes,
+  weighted by how well and how often those were rated
+
+The arrays are loaded from dish_stats and dish_ingredients on first use. Cooking
+records, new dishes and deletions of this process are applied after commit (see
+session_hooks) by updating only the rows they affect: a new rating changes the
+ingredient profile on that dish's ingredients, and the overlap sums of the dishes
+sharing them. Writes of other processes arrive as cache events (see cache_events),
+or show up at the next rebuild, after RECOMMENDER_TTL seconds.
+"""
+from collections import defaultdict
+from datetime import datetime
+import threading
+import time
+
+import numpy as np
+
+FEATURES = ("recency", "frequency", "rating", "overlap")
+FEATURE_WEIGHTS = np.array([0.25, 0.15, 0.35, 0.25])
+RECENCY_DAYS = 14.0
+# Ratings are shrunk towards PRIOR_RATING as if PRIOR_COOKS extra cookings had it
+PRIOR_RATING = 2.5
+PRIOR_COOKS = 2.0
+# Dishes with a mean rating at or better than this shape the ingredient profile
+LIKED_RATING = 2.0
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _seconds(value: datetime):
+    # cooking_time is naive local time, like datetime.now() used for "now"
+    return (value - _EPOCH).total_seconds()
+
+
+class Recommender:
+    def __init__(self, ttl_seconds=600.0):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.RLock()
+        self._built_at = None
+        self._expired = False
+        self._max_history_id = 0
+        self._replay = None
+        self._reset()
+
+    # Per-dish arrays, grown by doubling; fill value of unused slots
+    _ROW_ARRAYS = (
+        ("_dish_ids", np.int64, 0), ("_alive", bool, False), ("_cook_count", np.float64, 0.0),
+        ("_rating_sum", np.float64, 0.0), ("_last_cooked", np.float64, np.nan),  # epoch s, NaN: never
+        ("_liked", np.float64, 0.0),  # weight of the dish in the ingredient profile
+        ("_link_count", np.float64, 0.0), ("_overlap_sum", np.float64, 0.0),  # sum of profile over its ingredients
+    )
+
+    def _reset(self):
+        for name, dtype, _ in self._ROW_ARRAYS:
+            setattr(self, name, np.zeros(0, dtype=dtype))
+        self._size = 0
+        self._row_of_dish = {}
+        self._column_of_ingredient = {}
+        self._profile = np.zeros(0)  # per ingredient column: sum of liked weights of dishes using it
+        self._dish_columns = {}  # row -> ingredient columns
+        self._postings = {}  # ingredient column -> dish rows
+        self._pending_postings = defaultdict(list)
+
+    @property
+    def built(self):
+        return self._built_at is not None
+
+    def stale(self):
+        if self._built_at is None or self._expired:
+            return True
+        return self.ttl_seconds > 0 and time.monotonic() - self._built_at > self.ttl_seconds
+
+    def rebuild(self, load):
+        """
+        Replace the contents with load() -> (dishes, links, max_history_id): dishes are
+        (dish_id, cook_count, rating_sum, last_cooked_time) rows, links are
+        (dish_id, ingredient_id) rows, max_history_id the newest dish_history id the
+        read saw. Changes committed while loading are replayed unless the read
+        already included them.
+        """
+        with self._lock:
+            self._replay = []
+        try:
+            dishes, links, max_history_id = load()
+        except Exception:
+            with self._lock:
+                self._replay = None
+            raise
+
+        with self._lock:
+            self._reset()
+            self._grow(len(dishes))
+            n = self._size = len(dishes)
+            for row, (dish_id, cook_count, rating_sum, last_cooked_time) in enumerate(dishes):
+                self._row_of_dish[dish_id] = row
+                self._dish_ids[row] = dish_id
+                self._cook_count[row] = cook_count
+                self._rating_sum[row] = rating_sum
+                if last_cooked_time is not None:
+                    self._last_cooked[row] = _seconds(last_cooked_time)
+            self._alive[:n] = True
+            self._liked[:n] = _liked_weight(self._cook_count[:n], self._rating_sum[:n])
+
+            links = [(self._row_of_dish[dish_id], ingredient_id) for dish_id, ingredient_id in links
+                     if dish_id in self._row_of_dish]
+            rows = np.fromiter((row for row, _ in links), dtype=np.int32, count=len(links))
+            columns = np.fromiter(
+                (self._column_of_ingredient.setdefault(ingredient_id, len(self._column_of_ingredient))
+                 for _, ingredient_id in links), dtype=np.int32, count=len(links))
+            self._profile = np.bincount(columns, weights=self._liked[rows], minlength=len(self._column_of_ingredient))
+            self._link_count[:n] = np.bincount(rows, minlength=n)
+            self._overlap_sum[:n] = np.bincount(rows, weights=self._profile[columns], minlength=n)
+            self._dish_columns = _group(rows, columns)
+            self._postings = _group(columns, rows)
+
+            self._max_history_id = max_history_id or 0
+            self._built_at = time.monotonic()
+            self._expired = False
+
+            replay, self._replay = self._replay, None
+            for method, args in replay:
+                method(*args)
+
+    def add_dishes(self, links, dish_ids=()):
+        """New dishes from their (dish_id, ingredient_id, ...) links; dishes without links via dish_ids."""
+        with self._lock:
+            if self._replay is not None:
+                self._replay.append((self.add_dishes, (links, dish_ids)))
+            if not self.built:
+                return
+            columns_of_dish = defaultdict(list)
+            for link in links:
+                columns_of_dish[link[0]].append(
+                    self._column_of_ingredient.setdefault(link[1], len(self._column_of_ingredient)))
+            if len(self._profile) < len(self._column_of_ingredient):
+                self._profile = np.concatenate(
+                    [self._profile, np.zeros(len(self._column_of_ingredient) - len(self._profile))])
+            for dish_id in set(columns_of_dish).union(dish_ids):
+                if dish_id in self._row_of_dish:
+                    continue
+                row = self._add_row(dish_id)
+                columns = np.asarray(columns_of_dish.get(dish_id, []), dtype=np.int32)
+                self._dish_columns[row] = columns
+                self._link_count[row] = len(columns)
+                self._overlap_sum[row] = self._profile[columns].sum()
+                for column in columns.tolist():
+                    self._pending_postings[column].append(row)
+
+    def expire(self):
+        """Reload on next use, e.g. after changes whose details are not known here."""
+        with self._lock:
+            if self._replay is not None:
+                # The rows being loaded may predate the change
+                self._replay.append((self.expire, ()))
+            self._expired = True
+
+    def remove_dish(self, dish_id):
+        with self._lock:
+            if self._replay is not None:
+                self._replay.append((self.remove_dish, (dish_id,)))
+            row = self._row_of_dish.pop(dish_id, None)
+            if row is not None:
+                self._alive[row] = False
+                self._set_liked(row, 0.0)
+
+    def record_cooking(self, history_id, dish_id, rating, cooking_time):
+        with self._lock:
+            if self._replay is not None:
+                self._replay.append((self.record_cooking, (history_id, dish_id, rating, cooking_time)))
+            if not self.built or history_id <= self._max_history_id:
+                return
+            row = self._row_of_dish.get(dish_id)
+            if row is None:
+                row = self._add_row(dish_id)
+                self._dish_columns[row] = np.zeros(0, dtype=np.int32)
+            self._cook_count[row] += 1
+            self._rating_sum[row] += rating
+            cooked = _seconds(cooking_time)
+            if not cooked <= self._last_cooked[row]:  # also true for NaN
+                self._last_cooked[row] = cooked
+            self._set_liked(row, float(_liked_weight(self._cook_count[row], self._rating_sum[row])))
+
+    def _set_liked(self, row, weight):
+        delta = weight - self._liked[row]
+        if delta == 0:
+            return
+        self._liked[row] = weight
+        columns = self._dish_columns.get(row)
+        if columns is None or not len(columns):
+            return
+        self._profile[columns] += delta
+        # Every dish sharing one of these ingredients gains delta per shared ingredient
+        for column in columns.tolist():
+            self._overlap_sum[self._posting(column)] += delta
+
+    def _posting(self, column):
+        pending = self._pending_postings.pop(column, None)
+        posting = self._postings.get(column, np.zeros(0, dtype=np.int32))
+        if pending:
+            posting = np.concatenate([posting, np.asarray(pending, dtype=np.int32)])
+            self._postings[column] = posting
+        return posting
+
+    def _grow(self, extra):
+        needed = self._size + extra
+        capacity = len(self._dish_ids)
+        if needed <= capacity:
+            return
+        capacity = max(needed, capacity * 2, 1024)
+        for name, dtype, fill in self._ROW_ARRAYS:
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype=dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def _add_row(self, dish_id):
+        self._grow(1)
+        row = self._size
+        self._size += 1
+        self._row_of_dish[dish_id] = row
+        self._dish_ids[row] = dish_id
+        self._alive[row] = True
+        return row
+
+    def _features(self, now):
+        n = self._size
+        cook_count = self._cook_count[:n]
+        features = np.empty((n, len(FEATURES)))
+
+        days = (now - self._last_cooked[:n]) / 86400.0
+        features[:, 0] = np.where(np.isnan(days), 1.0, 1.0 - np.exp(-np.clip(days, 0, None) / RECENCY_DAYS))
+
+        max_count = cook_count.max(initial=0.0)
+        features[:, 1] = np.log1p(cook_count) / np.log1p(max_count) if max_count > 0 else 0.0
+
+        features[:, 2] = _quality(cook_count, self._rating_sum[:n])
+
+        # Mean profile value over the dish's ingredients, relative to the top ingredient
+        top = self._profile.max(initial=0.0)
+        link_count = self._link_count[:n]
+        np.divide(self._overlap_sum[:n], link_count * top, out=features[:, 3], where=(link_count > 0) & (top > 0))
+        features[(link_count == 0) | (top <= 0), 3] = 0.0
+        return features
+
+    def recommend(self, limit=20, now: datetime = None):
+        """Best scoring dishes first, as dicts with dish_id, score and the feature values."""
+        now = _seconds(now or datetime.now())
+        with self._lock:
+            n = self._size
+            limit = min(limit, len(self._row_of_dish))
+            if limit <= 0:
+                return []
+            features = self._features(now)
+            scores = features @ FEATURE_WEIGHTS
+            scores[~self._alive[:n]] = -np.inf
+
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            top = top[np.lexsort((self._dish_ids[top], -scores[top]))]
+            return [
+                {
+                    "dish_id": int(self._dish_ids[row]),
+                    "score": round(float(scores[row]), 4),
+                    **{name: round(float(features[row, k]), 4) for k, name in enumerate(FEATURES)}
+                }
+                for row in top
+            ]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "built": self.built,
+                "dishes": len(self._row_of_dish),
+                "age_s": round(time.monotonic() - self._built_at, 1) if self._built_at else None,
+            }
+
+
+def _quality(cook_count, rating_sum):
+    """Mean rating shrunk towards PRIOR_RATING, mapped from 1很棒..4拉胯 to 1..0."""
+    mean_rating = (rating_sum + PRIOR_RATING * PRIOR_COOKS) / (cook_count + PRIOR_COOKS)
+    return (4.0 - mean_rating) / 3.0
+
+
+def _liked_weight(cook_count, rating_sum):
+    """Weight of a dish in the ingredient profile: well rated and often cooked dishes count most."""
+    mean_rating = (rating_sum + PRIOR_RATING * PRIOR_COOKS) / (cook_count + PRIOR_COOKS)
+    liked = (cook_count > 0) & (mean_rating <= LIKED_RATING)
+    return np.where(liked, _quality(cook_count, rating_sum) * np.log1p(cook_count), 0.0)
+
+
+def _group(keys, values):
+    """{key: array of values} from two parallel arrays, with one sort."""
+    order = np.argsort(keys, kind="stable")
+    unique_keys, starts = np.unique(keys[order], return_index=True)
+    return dict(zip(unique_keys.tolist(), np.split(values[order], starts[1:])))
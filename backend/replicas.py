@@ -0,0 +1,198 @@
+"""
+Read replica routing.
+
+ReplicaRouter hands out the replicas in round-robin order to the read-only routes
+(database.read_session). A background thread checks every replica every
+check_interval seconds:
+- it must answer;
+- its replay lag must be at most max_lag seconds.
+
+A replica that fails the check is skipped until a later check passes. A connection
+error seen by a request also takes it out at once. When no replica is usable,
+reads go to the primary.
+
+Lag is measured on the replica as the age of the last replayed transaction. It
+counts as 0 when everything received has been replayed, so an idle primary does not
+make its replicas look stale. A server that is not in recovery reports no lag. This
+is the case for a second independent instance used to test the routing.
+
+Read-your-writes: every write response carries the time until which that client
+should read from the primary, in a cookie and a header (READ_PRIMARY_COOKIE,
+READ_PRIMARY_HEADER). The window is max_lag seconds. Any replica that is still used
+has caught up with the write by then.
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+
+READ_PRIMARY_COOKIE = "db_read_primary_until"
+READ_PRIMARY_HEADER = "x-read-primary-until"
+
+REPLICA_STATUS_SQL = text("""
+    SELECT pg_is_in_recovery(),
+           CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END
+""")
+
+
+class Replica:
+    __slots__ = ("name", "url", "engine", "async_engine", "check_engine", "healthy", "in_recovery",
+                 "lag_seconds", "checked_at", "error", "reads")
+
+    def __init__(self, name, url):
+        self.name = name
+        self.url = make_url(url)
+        self.engine = None
+        self.async_engine = None
+        self.check_engine = None
+        self.healthy = False  # unknown until the first check
+        self.in_recovery = None
+        self.lag_seconds = None
+        self.checked_at = None
+        self.error = None
+        self.reads = 0
+
+
+class ReplicaRouter:
+    """
+    Round-robin over the usable replicas of urls.
+
+    create_engines(url) returns (engine, async_engine or None, check_engine) for the
+    URL of one replica. It is called when the replicas are first needed, not at
+    construction.
+    """
+
+    def __init__(self, urls, create_engines, max_lag_s=5.0, check_interval_s=5.0):
+        self.replicas = [Replica(f"replica{i}", url) for i, url in enumerate(urls)]
+        self.max_lag_s = max_lag_s
+        self.check_interval_s = check_interval_s
+        self.primary_reads = 0
+        self._create_engines = create_engines
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._started_pid = None
+        self._delayed = []  # heap of (due, sequence, fn, args)
+        self._delayed_cond = threading.Condition()
+        self._delayed_pid = None
+
+    def start(self):
+        """Create the replica engines and start the health checks, once per process."""
+        # Threads do not survive a fork: start them again in every worker
+        with self._lock:
+            if self._started_pid == os.getpid():
+                return
+            for replica in self.replicas:
+                if replica.engine is None:
+                    replica.engine, replica.async_engine, replica.check_engine = self._create_engines(replica.url)
+                    self._watch_disconnects(replica)
+            self._started_pid = os.getpid()
+        # Reads go to the primary until the first check has passed
+        threading.Thread(target=self._check_loop, name="replica-health", daemon=True).start()
+
+    def _watch_disconnects(self, replica):
+        engines = [replica.engine] + ([replica.async_engine.sync_engine] if replica.async_engine is not None else [])
+        for engine in engines:
+            @event.listens_for(engine, "handle_error")
+            def _on_error(context, replica=replica):
+                if context.is_disconnect:
+                    self.mark_down(replica, context.original_exception)
+
+    def _check_loop(self):
+        pid = os.getpid()
+        while self._started_pid == pid:
+            self.check_all()
+            time.sleep(self.check_interval_s)
+
+    def check(self, replica):
+        """Refresh the health and lag of one replica."""
+        try:
+            with replica.check_engine.connect() as connection:
+                in_recovery, lag = connection.execute(REPLICA_STATUS_SQL).one()
+        except Exception as e:
+            self.mark_down(replica, e)
+            return
+        replica.in_recovery = in_recovery
+        replica.lag_seconds = float(lag or 0)
+        replica.error = None if replica.lag_seconds <= self.max_lag_s else f"lag {replica.lag_seconds:.1f}s"
+        replica.healthy = replica.error is None
+        replica.checked_at = time.time()
+
+    def check_all(self):
+        for replica in self.replicas:
+            self.check(replica)
+
+    def mark_down(self, replica, error):
+        replica.healthy = False
+        replica.error = repr(error)
+        replica.checked_at = time.time()
+
+    def pick(self, primary=False):
+        """
+        The next usable replica, or None when the primary must serve the read.
+        primary=True (the client reads its own writes) only counts the read.
+        """
+        if self._started_pid != os.getpid():
+            self.start()
+        usable = [] if primary else [replica for replica in self.replicas if replica.healthy]
+        if not usable:
+            self.primary_reads += 1
+            return None
+        replica = usable[next(self._counter) % len(usable)]
+        replica.reads += 1
+        return replica
+
+    def read_primary_until(self):
+        """Unix time until which a client that has just written must read from the primary."""
+        return time.time() + self.max_lag_s
+
+    def call_after_lag(self, fn, *args):
+        """Run fn(*args) once max_lag seconds have passed, on a background thread."""
+        with self._delayed_cond:
+            if self._delayed_pid != os.getpid():
+                self._delayed.clear()
+                self._delayed_pid = os.getpid()
+                threading.Thread(target=self._run_delayed, name="replica-lag-callbacks", daemon=True).start()
+            heapq.heappush(self._delayed, (time.monotonic() + self.max_lag_s, next(self._counter), fn, args))
+            self._delayed_cond.notify()
+
+    def _run_delayed(self):
+        while True:
+            with self._delayed_cond:
+                while not self._delayed or self._delayed[0][0] > time.monotonic():
+                    self._delayed_cond.wait(self._delayed[0][0] - time.monotonic() if self._delayed else None)
+                _, _, fn, args = heapq.heappop(self._delayed)
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"Replica lag callback {fn.__name__} failed: {e!r}")
+
+    def status(self):
+        """Health, lag and routed reads of every replica, for /metrics."""
+        return {
+            replica.name: {
+                "url": replica.url.render_as_string(hide_password=True),
+                "healthy": replica.healthy,
+                "in_recovery": replica.in_recovery,
+                "lag_seconds": replica.lag_seconds,
+                "checked_at": replica.checked_at,
+                "error": replica.error,
+                "reads": replica.reads,
+            }
+            for replica in self.replicas
+        }
+
+
+def reads_own_writes(request):
+    """True while the client's last write may not have reached the replicas yet."""
+    value = request.headers.get(READ_PRIMARY_HEADER) or request.cookies.get(READ_PRIMARY_COOKIE)
+    if not value:
+        return False
+    try:
+        return float(value) > time.time()
+    except ValueError:
+        return False
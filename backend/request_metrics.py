@@ -0,0 +1,176 @@
+"""
+Per-route request metrics in the Prometheus text format.
+
+RequestMetricsMiddleware is a plain ASGI middleware (no BaseHTTPMiddleware task or
+body buffering): it wraps send() to pick up the status code and count the body
+bytes, and records once the response is finished. Requests are labeled with the
+route template (/cooking/ver3/dish/detail/{id}) rather than the raw path, so the
+number of series stays bounded; unmatched paths share one label.
+
+Everything is updated from the event loop thread only, so the hot path takes no
+lock. /metrics renders from the same thread (it is an async route). Each process
+keeps its own counters; with several workers, scrape each one or aggregate.
+"""
+from bisect import bisect_left
+import time
+
+# Seconds; the default Prometheus client buckets
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+# Response body bytes
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+UNMATCHED_ROUTE = "<unmatched>"
+# PlainTextResponse appends the charset
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+# endpoint function -> route template, filled on first use
+_route_templates = {}
+
+
+def route_template(scope):
+    """Template of the route that handled the request, from the endpoint the router set."""
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return UNMATCHED_ROUTE
+    template = _route_templates.get(endpoint)
+    if template is None:
+        # First request of this endpoint: index the application's routes once
+        for route in getattr(scope.get("app"), "routes", ()):
+            path = getattr(route, "path_format", None) or getattr(route, "path", None)
+            if path is not None and hasattr(route, "endpoint"):
+                _route_templates.setdefault(route.endpoint, path)
+        template = _route_templates.setdefault(endpoint, UNMATCHED_ROUTE)
+    return template
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot: above the largest bound
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RouteStats:
+    __slots__ = ("statuses", "duration", "size")
+
+    def __init__(self):
+        self.statuses = {}  # status code -> requests
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.routes = {}  # (method, route template) -> RouteStats
+        self.in_flight = 0
+
+    def observe(self, method, route, status, seconds, size):
+        key = (method, route)
+        stats = self.routes.get(key)
+        if stats is None:
+            stats = self.routes[key] = RouteStats()
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+        stats.duration.observe(seconds)
+        stats.size.observe(size)
+
+    def render(self):
+        """The request metrics as Prometheus exposition text."""
+        routes = sorted(self.routes.items())
+        lines = [
+            "# HELP http_requests_total Requests by method, route template and status code.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route), stats in routes:
+            for status, count in sorted(stats.statuses.items()):
+                lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+        lines += _histogram_lines("http_request_duration_seconds",
+                                  "Time from receiving the request to the end of the response body.",
+                                  [(method, route, stats.duration) for (method, route), stats in routes])
+        lines += _histogram_lines("http_response_size_bytes", "Response body size.",
+                                  [(method, route, stats.size) for (method, route), stats in routes])
+        lines += gauge_lines("http_requests_in_flight", "Requests currently being handled.", [({}, self.in_flight)])
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(**labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _histogram_lines(name, help_text, series):
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for method, route, histogram in series:
+        cumulative = 0
+        for bound, count in zip(histogram.bounds + (float("inf"),), histogram.counts):
+            cumulative += count
+            labels = _labels(method=method, route=route, le=_number(bound))
+            lines.append(f"{name}_bucket{labels} {cumulative}")
+        labels = _labels(method=method, route=route)
+        lines.append(f"{name}_sum{labels} {_number(histogram.sum)}")
+        lines.append(f"{name}_count{labels} {histogram.count}")
+    return lines
+
+
+def gauge_lines(name, help_text, samples, metric_type="gauge"):
+    """Exposition lines of one metric from (labels dict, value) samples; None values are skipped."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    for labels, value in samples:
+        if value is not None:
+            lines.append(f"{name}{_labels(**labels)} {_number(value)}")
+    return lines
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app, metrics=None):
+        self.app = app
+        self.metrics = metrics if metrics is not None else request_metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        status = 500  # if the app fails before starting a response
+        size = 0
+
+        async def send_with_metrics(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        metrics.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            metrics.in_flight -= 1
+            # The router stores the matched endpoint in the shared scope dict
+            metrics.observe(scope["method"], route_template(scope), status,
+                            time.perf_counter() - started, size)
+
+
+# Registry of this process, shared by the middleware and the /metrics route
+request_metrics = RequestMetrics()
@@ -0,0 +1,83 @@
+"""
+Response construction for the hot read routes.
+
+By default routes return schemas.APIResponse, which FastAPI validates against the
+response_model and walks with jsonable_encoder. With FAST_JSON=1 (and orjson
+installed) api_response() skips both: the payload is converted by a prebuilt
+serializer and rendered by orjson. The {code, data, message} envelope and the
+field names and date formats are identical on both paths.
+
+Dish cards and dish detail payloads are already built as plain dicts by crud.py
+(the cache stores the detail dict itself), so they need no serializer; orjson
+encodes their datetimes natively. ORM rows go through a row serializer on both paths.
+"""
+from operator import attrgetter
+
+from fastapi.responses import ORJSONResponse
+
+from backend import schemas
+from backend.database import FAST_JSON
+
+try:
+    import orjson
+except ImportError:  # optional dependency; the default path does not need it
+    orjson = None
+
+if FAST_JSON and orjson is None:
+    print("FAST_JSON=1 but orjson is not installed; using the default response path")
+
+FAST_JSON_ENABLED = FAST_JSON and orjson is not None
+
+
+def row_serializer(*fields):
+    """Serializer of an ORM row into a dict of the given columns, in that order."""
+    getter = attrgetter(*fields)
+
+    def serialize(row):
+        return dict(zip(fields, getter(row)))
+
+    return serialize
+
+
+# Same keys, in the same order, as the SQLModel .dict() of the rows
+serialize_dish_history = row_serializer(
+    "id", "dish_id", "cooking_time", "cooking_rating", "create_time", "modify_time"
+)
+# name_key is internal (the uniqueness key) and stays out of the payload
+serialize_ingredient = row_serializer(
+    "id", "ingredient_name", "type", "create_time", "modify_time"
+)
+
+
+def serialize_rows(serialize):
+    """Serializer of a list of rows from a serializer of one row."""
+    def serialize_list(rows):
+        return [serialize(row) for row in rows]
+    return serialize_list
+
+
+serialize_dish_histories = serialize_rows(serialize_dish_history)
+serialize_ingredients = serialize_rows(serialize_ingredient)
+
+
+def fast_api_response(data=None, code=0, message=None, serializer=None, headers=None):
+    """The APIResponse envelope rendered directly by orjson."""
+    if serializer is not None and data is not None:
+        data = serializer(data)
+    return ORJSONResponse({"code": code, "data": data, "message": message}, headers=headers)
+
+
+def api_response(data=None, code=0, message=None, serializer=None, headers=None, response=None):
+    """
+    APIResponse for a route, on the fast path when FAST_JSON is enabled. `headers` are
+    set on the returned response, or on the route's injected `response` on the
+    default path, where FastAPI builds the final response itself.
+    """
+    if FAST_JSON_ENABLED:
+        return fast_api_response(data, code, message, serializer, headers)
+    if headers and response is not None:
+        response.headers.update(headers)
+    if serializer is not None and data is not None:
+        # The serializer also picks the public columns, so both paths return the same fields
+        data = serializer(data)
+    return schemas.APIResponse(code=code, data=data, message=message)
@@ -1,88 +1,118 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-import os
-import sys
-
-# Add the project root to the Python path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from typing import Literal, Optional
+from datetime import datetime
 
 # Import using absolute paths
-from backend import crud, schemas
-from backend.models import Dish
-from backend.database import get_db
+from backend import crud_async, schemas
+from backend.database import read_session, write_session
+from backend.etag import make_etag, is_not_modified, not_modified_response, validator_headers
+from backend.responses import api_response, serialize_dish_histories
+from backend.export import export_dishes
 
 router = APIRouter(prefix="/cooking/ver3/dish", tags=["dish"])
 
+# Dishes written per transaction by /add/bulk
+BULK_BATCH_SIZE = 1000
+# Per-record errors returned by /add/bulk; further failures are only counted
+BULK_MAX_REPORTED_ERRORS = 1000
+
 
 @router.post("/select", response_model=schemas.APIResponse)
-def select_dishes(query: schemas.DishQuery, db: Session = Depends(get_db)):
-    from sqlalchemy.orm import selectinload
-    from sqlmodel import select
-    from backend.models import DishIngredientLink
-
-    skip = query.page * query.size
-    # Query dishes with ingredients using relationships
-    statement = select(Dish).options(
-        selectinload(Dish.dish_ingredients).selectinload(DishIngredientLink.ingredient)
-    )
-    if query.dish_name:
-        statement = statement.where(Dish.dish_name.contains(query.dish_name))
-    if query.difficult is not None:
-        statement = statement.where(Dish.difficult == query.difficult)
-    statement = statement.offset(skip).limit(query.size)
-    result = db.execute(statement)
-    dishes = result.scalars().all()
-
-    total = crud.get_dish_count(db, dish_name=query.dish_name, difficult=query.difficult)
-
-    # Create response data with basic dish info and main ingredients
-    dish_cards = []
-    for dish in dishes:
-        # Extract main ingredients (type == 1)
-        main_ingredients = []
-        for dish_ing in dish.dish_ingredients:
-            if dish_ing.ingredient.type == 1:  # 主料
-                main_ingredients.append(dish_ing.ingredient.ingredient_name)
-
-        # Limit to first 3 main ingredients for display
-        main_ingredients_display = main_ingredients[:3]
-
-        dish_cards.append({
-            "id": dish.id,
-            "dish_name": dish.dish_name,
-            "difficult": dish.difficult,
-            "main_ingredients": main_ingredients_display
-        })
+async def select_dishes(query: schemas.DishQuery, request: Request, response: Response, db=Depends(read_session)):
+    try:
+        dish_cards, total, next_after, estimated, (last_modified, version) = \
+            await crud_async.select_dish_cards(db, query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    # Return paginated result with total count
-    return schemas.APIResponse(code=0, data={
+    etag = make_etag("select", query.json(), *version)
+    # A POST never gets a 304 (is_not_modified ignores its conditional headers); the
+    # validators are still sent so the client can tell whether the list changed
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
+    # Return paginated result with total count and the cursor of the next page
+    return api_response(data={
         "items": dish_cards,
         "total": total,
+        "total_estimated": estimated,
         "page": query.page,
-        "size": query.size
-    })
+        "size": query.size,
+        "next_after": next_after
+    }, headers=validator_headers(etag, last_modified), response=response)
 
 
 @router.get("/detail/{id}", response_model=schemas.APIResponse)
-def get_dish_detail(id: int, db: Session = Depends(get_db)):
-    dish_detail = crud.get_dish_with_details(db, id)
+async def get_dish_detail(id: int, request: Request, response: Response, db=Depends(read_session)):
+    validator = await crud_async.get_dish_detail_validator(db, id)
+    if validator is None:
+        raise HTTPException(status_code=404, detail="Dish not found")
+
+    last_modified, version, dish_detail = validator
+    etag = make_etag("detail", *version)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+
+    if dish_detail is None:
+        dish_detail = await crud_async.get_dish_with_details(db, id, lookup=False)
     if not dish_detail:
         raise HTTPException(status_code=404, detail="Dish not found")
-    
-    return schemas.APIResponse(code=0, data=dish_detail)
+
+    return api_response(data=dish_detail, headers=validator_headers(etag, last_modified), response=response)
+
+
+@router.post("/match", response_model=schemas.APIResponse)
+async def match_dishes(match: schemas.DishMatchRequest, db=Depends(read_session)):
+    """
+    按现有食材查找菜品
+    Ranks dishes by how well the given ingredients cover them, weighted by ingredient
+    type (main > auxiliary > seasoning), with matched and missing counts per dish.
+    """
+    result = await crud_async.match_dishes_by_ingredients(db, match)
+    return schemas.APIResponse(code=0, data=result)
+
+
+@router.get("/recommend", response_model=schemas.APIResponse)
+async def recommend_dishes(limit: int = Query(default=20, ge=1, le=200), db=Depends(read_session)):
+    """
+    菜品推荐接口
+    Scores every dish from recency, frequency and rating of its cooking history and
+    ingredient overlap with well-rated dishes; returns the best ones with their
+    feature values.
+    """
+    items = await crud_async.recommend_dishes(db, limit)
+    return schemas.APIResponse(code=0, data=items)
+
+
+@router.get("/export")
+async def export_all_dishes(since: Optional[datetime] = None, gzip: bool = False):
+    """
+    菜品全量导出接口
+    Streams every dish with its ingredients, usages and steps as NDJSON, one dish per
+    line in the /detail/{id} shape, read through a server-side cursor. since limits
+    the export to dishes changed at or after that modify_time; gzip=true compresses
+    the stream. Holds one database connection until the stream ends.
+    """
+    filename = "dishes.ndjson.gz" if gzip else "dishes.ndjson"
+    return StreamingResponse(
+        export_dishes(since=since, compress=gzip),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
 
 
 # Additional routes for CRUD operations
 @router.post("/", response_model=schemas.APIResponse)
-def create_dish(dish: schemas.DishCreate, db: Session = Depends(get_db)):
-    db_dish = crud.create_dish(db, dish)
+async def create_dish(dish: schemas.DishCreate, db=Depends(write_session)):
+    db_dish = await crud_async.create_dish(db, dish)
     return schemas.APIResponse(code=0, data=db_dish)
 
 
 @router.get("/{id}", response_model=schemas.APIResponse)
-def get_dish(id: int, db: Session = Depends(get_db)):
-    db_dish = crud.get_dish(db, id)
+async def get_dish(id: int, db=Depends(read_session)):
+    db_dish = await crud_async.get_dish(db, id)
     if not db_dish:
         raise HTTPException(status_code=404, detail="Dish not found")
     
@@ -90,8 +120,8 @@ def get_dish(id: int, db: Session = Depends(get_db)):
 
 
 @router.put("/{id}", response_model=schemas.APIResponse)
-def update_dish(id: int, dish: schemas.DishUpdate, db: Session = Depends(get_db)):
-    db_dish = crud.update_dish(db, id, dish)
+async def update_dish(id: int, dish: schemas.DishUpdate, db=Depends(write_session)):
+    db_dish = await crud_async.update_dish(db, id, dish)
     if not db_dish:
         raise HTTPException(status_code=404, detail="Dish not found")
     
@@ -99,8 +129,8 @@ def update_dish(id: int, dish: schemas.DishUpdate, db: Session = Depends(get_db)
 
 
 @router.delete("/{id}", response_model=schemas.APIResponse)
-def delete_dish(id: int, db: Session = Depends(get_db)):
-    success = crud.delete_dish(db, id)
+async def delete_dish(id: int, db=Depends(write_session)):
+    success = await crud_async.delete_dish(db, id)
     if not success:
         raise HTTPException(status_code=404, detail="Dish not found")
 
@@ -108,7 +138,7 @@ def delete_dish(id: int, db: Session = Depends(get_db)):
 
 
 @router.post("/add/raw", response_model=schemas.APIResponse)
-def add_dish_with_ingredients_and_steps(request: schemas.DishAddRequest, db: Session = Depends(get_db)):
+async def add_dish_with_ingredients_and_steps(request: schemas.DishAddRequest, db=Depends(write_session)):
     """
     菜品新增接口
     This endpoint receives a new dish with its main ingredients, auxiliary ingredients, and seasonings,
@@ -118,7 +148,7 @@ def add_dish_with_ingredients_and_steps(request: schemas.DishAddRequest, db: Ses
     """
     try:
         # Call the CRUD function to add the dish with ingredients and steps
-        db_dish = crud.add_dish_with_ingredients_and_steps(db, request)
+        db_dish = await crud_async.add_dish_with_ingredients_and_steps(db, request)
 
         return schemas.APIResponse(code=0, data={
             "id": db_dish.id,
@@ -127,42 +157,140 @@ def add_dish_with_ingredients_and_steps(request: schemas.DishAddRequest, db: Ses
             "message": "Dish added successfully"
         })
     except Exception as e:
-        db.rollback()
+        await crud_async.rollback(db)
         raise HTTPException(status_code=500, detail=f"Error adding dish: {str(e)}")
 
 
+@router.post("/add/bulk", response_model=schemas.APIResponse)
+async def add_dishes_bulk(request: Request, db=Depends(write_session)):
+    """
+    菜品批量导入接口
+    Accepts an NDJSON body, one DishAddRequest object per line. The body is parsed as
+    it streams in and written in batches of BULK_BATCH_SIZE dishes, so memory use does
+    not depend on the payload size. Records that fail validation or insertion are
+    reported by line number; all other records are imported.
+    """
+    received = inserted = failed = 0
+    errors = []
+    batch = []
+
+    def report(line_number, message):
+        nonlocal failed
+        failed += 1
+        if len(errors) < BULK_MAX_REPORTED_ERRORS:
+            errors.append({"line": line_number, "error": message})
+
+    async def flush():
+        nonlocal inserted
+        batch_inserted, batch_errors = await crud_async.bulk_add_dishes(db, batch)
+        inserted += batch_inserted
+        for line_number, message in batch_errors:
+            report(line_number, message)
+        batch.clear()
+
+    async def handle(line_number, line):
+        nonlocal received
+        if not line.strip():
+            return
+        received += 1
+        try:
+            batch.append((line_number, schemas.DishAddRequest.parse_raw(line)))
+        except ValidationError as e:
+            report(line_number, str(e))
+            return
+        if len(batch) >= BULK_BATCH_SIZE:
+            await flush()
+
+    try:
+        line_number = 0
+        pending = b""
+        async for chunk in request.stream():
+            pending += chunk
+            *lines, pending = pending.split(b"\n")
+            for line in lines:
+                line_number += 1
+                await handle(line_number, line)
+        await handle(line_number + 1, pending)
+        await flush()
+    except Exception as e:
+        await crud_async.rollback(db)
+        raise HTTPException(status_code=500, detail=f"Error importing dishes: {str(e)}")
+
+    return schemas.APIResponse(code=0, data={
+        "received": received,
+        "inserted": inserted,
+        "failed": failed,
+        "errors": errors
+    })
+
+
 @router.post("/history/create", response_model=schemas.APIResponse)
-def create_dish_history(history: schemas.DishHistoryCreate, db: Session = Depends(get_db)):
+async def create_dish_history(history: schemas.DishHistoryCreate, db=Depends(write_session)):
     """
     Create a new dish history record
     """
     try:
-        db_history = crud.create_dish_history(db, history)
+        db_history = await crud_async.create_dish_history(db, history)
         return schemas.APIResponse(code=0, data=db_history)
     except Exception as e:
-        db.rollback()
+        await crud_async.rollback(db)
         raise HTTPException(status_code=500, detail=f"Error creating dish history: {str(e)}")
 
 
+@router.get("/history/analytics", response_model=schemas.APIResponse)
+async def get_history_analytics(bucket: Literal["day", "week", "month"] = "day", dish_id: Optional[int] = None,
+                                start: Optional[datetime] = None, end: Optional[datetime] = None,
+                                db=Depends(read_session)):
+    """
+    烹饪历史统计接口
+    Cooking counts and rating histograms per day, week or month, for one dish
+    (dish_id) or all dishes, optionally limited to [start, end)
+    """
+    try:
+        analytics = await crud_async.get_history_analytics(db, bucket, dish_id, start, end)
+        return schemas.APIResponse(code=0, data=analytics)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting history analytics: {str(e)}")
+
+
 @router.get("/{id}/history", response_model=schemas.APIResponse)
-def get_dish_history(id: int, db: Session = Depends(get_db)):
+async def get_dish_history(id: int, request: Request, response: Response, db=Depends(read_session)):
     """
     Get dish cooking history by dish ID
     """
     try:
-        history_list = crud.get_dish_history_by_dish_id(db, id)
-        return schemas.APIResponse(code=0, data=history_list)
+        last_modified, version = await crud_async.get_dish_history_validator(db, id)
+        etag = make_etag("history", *version)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified)
+
+        history_list = await crud_async.get_dish_history_by_dish_id(db, id)
+        return api_response(data=history_list, serializer=serialize_dish_histories,
+                            headers=validator_headers(etag, last_modified), response=response)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting dish history: {str(e)}")
 
 
 @router.get("/{id}/cooking-count", response_model=schemas.APIResponse)
-def get_cooking_count(id: int, db: Session = Depends(get_db)):
+async def get_cooking_count(id: int, db=Depends(read_session)):
     """
     Get cooking count by dish ID
     """
     try:
-        count = crud.get_cooking_count_by_dish_id(db, id)
+        count = await crud_async.get_cooking_count_by_dish_id(db, id)
         return schemas.APIResponse(code=0, data=count)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error getting cooking count: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error getting cooking count: {str(e)}")
+
+
+@router.get("/{id}/stats", response_model=schemas.APIResponse)
+async def get_dish_stats(id: int, db=Depends(read_session)):
+    """
+    Get cooking statistics by dish ID: cook count, rating histogram, average rating
+    and last cooked time
+    """
+    try:
+        stats = await crud_async.get_dish_stats(db, id)
+        return schemas.APIResponse(code=0, data=stats)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error getting dish stats: {str(e)}")
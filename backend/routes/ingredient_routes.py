@@ -1,52 +1,53 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-import os
-import sys
-
-# Add the project root to the Python path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 
 # Import using absolute paths
-from backend import crud, schemas
-from backend.models import Ingredient
-from backend.database import get_db
+from backend import crud_async, schemas
+from backend.database import read_session, write_session
+from backend.etag import make_etag, is_not_modified, not_modified_response, validator_headers
+from backend.responses import api_response, serialize_ingredient, serialize_ingredients
 
 router = APIRouter(prefix="/cooking/ver3/ingredient", tags=["ingredient"])
 
 
 @router.get("/list", response_model=schemas.APIResponse)
-def get_all_ingredients(db: Session = Depends(get_db)):
+async def get_all_ingredients(request: Request, response: Response, db=Depends(read_session)):
     """
     获取所有配料列表
     """
     try:
-        ingredients = crud.get_ingredients(db, skip=0, limit=1000)  # 获取所有配料
-        return schemas.APIResponse(code=0, data=ingredients)
+        last_modified, version = await crud_async.get_ingredients_validator(db)
+        etag = make_etag("ingredients", *version)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified_response(etag, last_modified)
+
+        ingredients = await crud_async.get_ingredients(db, skip=0, limit=1000)  # 获取所有配料
+        return api_response(data=ingredients, serializer=serialize_ingredients,
+                            headers=validator_headers(etag, last_modified), response=response)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting ingredients: {str(e)}")
 
 
 @router.post("/", response_model=schemas.APIResponse)
-def create_ingredient(ingredient: schemas.IngredientCreate, db: Session = Depends(get_db)):
+async def create_ingredient(ingredient: schemas.IngredientCreate, db=Depends(write_session)):
     """
     创建新配料
     """
     try:
-        db_ingredient = crud.create_ingredient(db, ingredient)
-        return schemas.APIResponse(code=0, data=db_ingredient)
+        db_ingredient = await crud_async.create_ingredient(db, ingredient)
+        return schemas.APIResponse(code=0, data=serialize_ingredient(db_ingredient))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating ingredient: {str(e)}")
 
 
 @router.get("/{id}", response_model=schemas.APIResponse)
-def get_ingredient(id: int, db: Session = Depends(get_db)):
+async def get_ingredient(id: int, db=Depends(read_session)):
     """
     根据ID获取配料详情
     """
     try:
-        db_ingredient = crud.get_ingredient(db, id)
+        db_ingredient = await crud_async.get_ingredient(db, id)
         if not db_ingredient:
             raise HTTPException(status_code=404, detail="Ingredient not found")
-        return schemas.APIResponse(code=0, data=db_ingredient)
+        return schemas.APIResponse(code=0, data=serialize_ingredient(db_ingredient))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting ingredient: {str(e)}")
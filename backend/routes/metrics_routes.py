@@ -0,0 +1,114 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+
+# Import using absolute paths
+from backend import crud, schemas
+from backend.database import get_pool_engines, replica_router
+from backend.pool_metrics import pool_status
+from backend.request_metrics import request_metrics, gauge_lines, CONTENT_TYPE
+from backend.query_stats import route_totals
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("", response_class=PlainTextResponse)
+async def get_prometheus_metrics(request: Request):
+    """
+    Prometheus 文本格式：按路由模板统计的请求数、延迟与响应大小分布、处理中请求数、
+    SQL 语句数与耗时、各启动阶段耗时、缓存失效事件，以及连接池、缓存和内存索引的当前状态
+    """
+    pools = {name: pool_status(engine) for name, engine in get_pool_engines().items()}
+    cache = crud.dish_detail_cache.stats()
+    index = crud.ingredient_index.stats()
+    recommender = crud.recommender.stats()
+    lines = [request_metrics.render().rstrip("\n")]
+    queries = sorted(route_totals.items())
+    lines += gauge_lines("db_queries_total", "SQL statements run by requests, by route template.",
+                         [({"route": route}, totals.queries) for route, totals in queries], metric_type="counter")
+    lines += gauge_lines("db_query_seconds_total", "Time spent in SQL statements, by route template.",
+                         [({"route": route}, totals.seconds) for route, totals in queries], metric_type="counter")
+    lines += gauge_lines("db_n_plus_one_total", "Statements repeated within one request (N+1 candidates).",
+                         [({"route": route}, totals.n_plus_one) for route, totals in queries], metric_type="counter")
+    startup_ms = getattr(request.app.state, "startup_ms", {})
+    lines += gauge_lines("app_startup_seconds", "Time spent in each startup phase of this process.",
+                         [({"phase": phase}, round(ms / 1000, 4)) for phase, ms in startup_ms.items()])
+    lines += gauge_lines("db_pool_checked_out", "Connections currently checked out.",
+                         [({"engine": name}, status.get("checked_out")) for name, status in pools.items()])
+    lines += gauge_lines("db_pool_overflow", "Connections open beyond the pool size.",
+                         [({"engine": name}, status.get("overflow")) for name, status in pools.items()])
+    lines += gauge_lines("db_pool_checkout_timeouts_total", "Checkouts that timed out waiting for a connection.",
+                         [({"engine": name}, status.get("checkout_timeouts")) for name, status in pools.items()],
+                         metric_type="counter")
+    if replica_router is not None:
+        replicas = replica_router.status()
+        lines += gauge_lines("db_replica_healthy", "1 while the replica passes the health and lag checks.",
+                             [({"replica": name}, int(status["healthy"])) for name, status in replicas.items()])
+        lines += gauge_lines("db_replica_lag_seconds", "Replay lag of the replica at the last check.",
+                             [({"replica": name}, status["lag_seconds"]) for name, status in replicas.items()])
+        lines += gauge_lines("db_reads_total", "Read-only sessions by the server that served them.",
+                             [({"target": "primary"}, replica_router.primary_reads)]
+                             + [({"target": name}, status["reads"]) for name, status in replicas.items()],
+                             metric_type="counter")
+    if crud.cache_event_bus is not None:
+        events = crud.cache_event_bus.status()
+        lines += gauge_lines("cache_events_listener_connected", "1 while the cache event listener is connected.",
+                             [({}, int(events["connected"]))])
+        lines += gauge_lines("cache_events_published_total", "Cache events committed by this process, by kind.",
+                             [({"kind": kind}, count) for kind, count in sorted(events["published"].items())],
+                             metric_type="counter")
+        lines += gauge_lines("cache_events_received_total", "Cache events of other processes applied, by kind.",
+                             [({"kind": kind}, count) for kind, count in sorted(events["received"].items())],
+                             metric_type="counter")
+        lines += gauge_lines("cache_events_delay_seconds_total",
+                             "Time from sending to applying the received cache events.",
+                             [({}, events["delay_seconds_total"])], metric_type="counter")
+        lines += gauge_lines("cache_events_resyncs_total", "Caches dropped after the listener reconnected.",
+                             [({}, events["resyncs"])], metric_type="counter")
+    lines += gauge_lines("dish_detail_cache_entries", "Entries in the dish detail cache.",
+                         [({}, cache.get("entries"))])
+    lines += gauge_lines("dish_detail_cache_bytes", "Estimated memory of the dish detail cache.",
+                         [({}, cache.get("bytes"))])
+    for outcome in ("hits", "misses", "evictions"):
+        lines += gauge_lines(f"dish_detail_cache_{outcome}_total", f"Dish detail cache {outcome}.",
+                             [({}, cache.get(outcome))], metric_type="counter")
+    lines += gauge_lines("ingredient_index_dishes", "Dishes in the in-memory ingredient index.",
+                         [({}, index["dishes"])])
+    lines += gauge_lines("recommender_dishes", "Dishes in the recommender feature matrix.",
+                         [({}, recommender["dishes"])])
+    return PlainTextResponse("\n".join(lines) + "\n", media_type=CONTENT_TYPE)
+
+
+@router.get("/pool", response_model=schemas.APIResponse)
+def get_pool_metrics():
+    """
+    连接池状态：已借出连接数、溢出连接数、等待时间
+    """
+    return schemas.APIResponse(code=0, data={
+        name: pool_status(engine) for name, engine in get_pool_engines().items()
+    })
+
+
+@router.get("/cache", response_model=schemas.APIResponse)
+def get_cache_metrics():
+    """
+    缓存状态：命中/未命中/淘汰次数与内存占用，以及跨进程缓存失效事件的收发情况
+    """
+    return schemas.APIResponse(code=0, data={
+        "dish_detail": crud.dish_detail_cache.stats(),
+        "ingredient_index": crud.ingredient_index.stats(),
+        "recommender": crud.recommender.stats(),
+        "events": crud.cache_event_bus.status() if crud.cache_event_bus is not None else None
+    })
+
+
+@router.get("/replicas", response_model=schemas.APIResponse)
+def get_replica_metrics():
+    """
+    只读副本状态：健康检查结果、复制延迟与各副本分到的读请求数（未配置副本时为空）
+    """
+    if replica_router is None:
+        return schemas.APIResponse(code=0, data={"primary_reads": None, "replicas": {}})
+    return schemas.APIResponse(code=0, data={
+        "primary_reads": replica_router.primary_reads,
+        "replicas": replica_router.status()
+    })
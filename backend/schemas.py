@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Literal
 from datetime import datetime
 from sqlmodel import SQLModel
 
@@ -96,12 +96,24 @@ class DishQuery(BaseModel):
     size: int = 10
     dish_name: Optional[str] = Field(default="", alias="dishName")  # alias for frontend "dishName"
     difficult: Optional[int] = None  # 1简单 2中等 3复杂, None means no filter
+    fuzzy: bool = False  # also match names with typos (trigram similarity)
+    # None: by id; name; newest: latest created first; difficult; relevance: closest names to dishName first
+    sort: Optional[Literal["name", "newest", "difficult", "relevance"]] = None
+    after: Optional[str] = None  # keyset cursor (next_after of the previous page); page is ignored when set
+    estimate_total: bool = False  # unfiltered listing: use the planner's row estimate as total
 
     class Config:
         # Allow both snake_case and camelCase field names
         allow_population_by_field_name = True
 
 
+class DishMatchRequest(BaseModel):
+    ingredient_ids: List[int] = []
+    ingredient_names: List[str] = []  # matched by normalized name
+    limit: int = Field(default=20, ge=1, le=200)
+    max_missing_main: Optional[int] = None  # only dishes missing at most this many main ingredients
+
+
 class DishIngredientCreate(SQLModel):
     ingredient_name: str
     type: int  # 1主料 2辅料 3调料
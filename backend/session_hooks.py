@@ -0,0 +1,29 @@
+"""
+Callbacks that run after a session's transaction commits.
+
+In-memory structures derived from the database (ingredient index, recommender) must
+only see a write once it is committed. Write paths stage the update with
+on_commit(session, fn, ...) inside the transaction; it runs right after a
+successful commit and is dropped if the transaction rolls back.
+"""
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_PENDING_KEY = "after_commit_callbacks"
+
+
+def on_commit(session, fn, *args):
+    """Run fn(*args) after the current transaction of session commits."""
+    session.info.setdefault(_PENDING_KEY, []).append((fn, args))
+
+
+# Registered on Session, so they also fire for the sync session of every AsyncSession
+@event.listens_for(Session, "after_commit")
+def _run_callbacks(session):
+    for fn, args in session.info.pop(_PENDING_KEY, []):
+        fn(*args)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_callbacks(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,52 @@
+"""
+Shared stand-ins for a database session, so crud functions run without Postgres.
+Test modules subclass FakeSession and answer each statement in respond().
+"""
+
+
+class Result:
+    """The parts of a SQLAlchemy Result the crud functions read."""
+
+    def __init__(self, rows=(), scalar=None):
+        self._rows = list(rows)
+        self._scalar = scalar
+
+    def all(self):
+        return self._rows
+
+    def first(self):
+        return self._rows[0] if self._rows else None
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def scalar(self):
+        return self._scalar
+
+    def scalar_one(self):
+        return self._scalar
+
+    def scalar_one_or_none(self):
+        return self._scalar
+
+
+class FakeSession:
+    """Records the SQL of every statement and answers it with respond(sql)."""
+
+    # Compile statements for this dialect with literal binds, e.g. postgresql.dialect(),
+    # when a test needs to see the values or Postgres-only constructs
+    dialect = None
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement, *args):
+        if self.dialect is None:
+            sql = str(statement)
+        else:
+            sql = str(statement.compile(dialect=self.dialect, compile_kwargs={"literal_binds": True}))
+        self.statements.append(sql)
+        return self.respond(sql)
+
+    def respond(self, sql):
+        return Result()
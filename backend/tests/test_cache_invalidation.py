@@ -0,0 +1,196 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from backend import crud, schemas
+from backend.cache import CountCache, LRUTTLCache
+from backend.cache_events import CacheEventBus, MAX_EVENT_IDS
+from backend.ingredient_index import IngredientIndex
+from backend.recommender import Recommender
+from backend.session_hooks import on_commit
+
+
+def test_count_cache_drops_counts_read_before_a_clear():
+    cache = CountCache(ttl_seconds=60)
+    generation = cache.generation
+    cache.clear()  # a write commits while the count is being computed
+    cache.set("all", 10, generation)
+    assert cache.get("all") is None
+    cache.set("all", 11, cache.generation)
+    assert cache.get("all") == 11
+
+
+def test_detail_cache_delete_blocks_stale_set():
+    cache = LRUTTLCache(max_bytes=1 << 20, ttl_seconds=60)
+    generation = cache.generation
+    cache.delete(1)
+    cache.set(1, {"dish_name": "old"}, generation)
+    assert cache.get(1) is None
+
+
+def test_detail_cache_evicts_least_recently_used_by_size():
+    cache = LRUTTLCache(max_bytes=250, ttl_seconds=60, sizeof=lambda value: 100)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    cache.get(1)
+    cache.set(3, "c")
+    assert (cache.get(1), cache.get(2), cache.get(3)) == ("a", None, "c")
+    assert cache.stats()["evictions"] == 1
+
+
+class CommitSession:
+    """Session stand-in: collects pg_notify payloads and runs on_commit callbacks on commit()."""
+
+    def __init__(self):
+        self.info = {}
+        self.payloads = []
+
+    def execute(self, statement, params):
+        self.payloads.append(json.loads(params["payload"]))
+
+    def commit(self):
+        for fn, args in self.info.pop("after_commit_callbacks", []):
+            fn(*args)
+
+
+@pytest.fixture
+def caches(monkeypatch):
+    """Fresh, built caches of one process, with dishes 1 and 2."""
+    monkeypatch.setattr(crud, "dish_count_cache", CountCache(ttl_seconds=60))
+    monkeypatch.setattr(crud, "dish_detail_cache", LRUTTLCache(ttl_seconds=60))
+    index = IngredientIndex(ttl_seconds=0)
+    index.build([(1, 10, 1), (2, 10, 1), (2, 11, 2)])
+    monkeypatch.setattr(crud, "ingredient_index", index)
+    recommender = Recommender(ttl_seconds=0)
+    recommender.rebuild(lambda: ([(1, 0, 0, None), (2, 2, 4, None)], [(1, 10), (2, 10), (2, 11)], 5))
+    monkeypatch.setattr(crud, "recommender", recommender)
+    for dish_id in (1, 2):
+        crud.dish_detail_cache.set(dish_id, {"id": dish_id})
+    crud.dish_count_cache.set("all", 2)
+    return crud
+
+
+def test_invalidate_dish_drops_its_detail_and_every_count(caches):
+    caches._invalidate_dish(1)
+    assert caches.dish_detail_cache.get(1) is None
+    assert caches.dish_detail_cache.get(2) == {"id": 2}
+    assert caches.dish_count_cache.get("all") is None
+
+
+def test_invalidate_new_dish_keeps_details(caches):
+    caches._invalidate_dish()
+    assert caches.dish_detail_cache.get(1) == {"id": 1}
+    assert caches.dish_count_cache.get("all") is None
+
+
+def test_new_step_drops_its_dish_again_after_replica_lag(caches, monkeypatch):
+    delayed = []
+    monkeypatch.setattr(crud, "after_replica_lag", lambda fn, *args: delayed.append((fn, args)))
+
+    class StepSession(CommitSession):
+        def add(self, row): pass
+        def refresh(self, row): pass
+
+    caches.create_dish_step(StepSession(), schemas.DishStepCreate(dish_id=1, step_order=1, step_text="stir"))
+    assert caches.dish_detail_cache.get(1) is None
+    # A replica read in the meantime puts the old detail back; the delayed drop removes it
+    caches.dish_detail_cache.set(1, {"id": 1})
+    for fn, args in delayed:
+        fn(*args)
+    assert caches.dish_detail_cache.get(1) is None
+    assert caches.dish_detail_cache.get(2) == {"id": 2}
+
+
+def event(kind, ids, **fields):
+    return {"o": "other", "k": kind, "ids": ids, "t": 0, **fields}
+
+
+def test_update_event_evicts_only_that_dish(caches):
+    caches._apply_cache_event(event("dish_updated", [1]))
+    assert caches.dish_detail_cache.get(1) is None
+    assert caches.dish_detail_cache.get(2) == {"id": 2}
+    assert caches.dish_count_cache.get("all") is None
+
+
+def test_delete_event_removes_dish_from_index_and_recommender(caches):
+    caches._apply_cache_event(event("dish_deleted", [2]))
+    assert caches.dish_detail_cache.get(2) is None
+    assert [item["dish_id"] for item in caches.ingredient_index.match({10, 11})] == [1]
+    assert caches.recommender.stats()["dishes"] == 1
+
+
+def test_cooked_event_updates_recommender(caches):
+    caches._apply_cache_event(event("dish_cooked", [1], history_id=6, rating=1,
+                                    cooking_time=datetime(2024, 1, 1).isoformat()))
+    row = caches.recommender._row_of_dish[1]
+    assert caches.recommender._cook_count[row] == 1
+    # Already part of the loaded stats: not counted twice
+    caches._apply_cache_event(event("dish_cooked", [1], history_id=5, rating=1,
+                                    cooking_time=datetime(2024, 1, 1).isoformat()))
+    assert caches.recommender._cook_count[row] == 1
+
+
+@pytest.mark.parametrize("received", [event("dish_created", None), event("unknown_kind", [1])])
+def test_unspecific_events_drop_everything(caches, received):
+    caches._apply_cache_event(received)
+    assert caches.dish_detail_cache.get(1) is None and caches.dish_detail_cache.get(2) is None
+    assert caches.ingredient_index.stale() and caches.recommender.stale()
+    # Queries keep using the previous contents until the rebuild
+    assert caches.ingredient_index.built
+
+
+def test_expire_during_a_load_survives_the_load():
+    index = IngredientIndex(ttl_seconds=0)
+
+    def load():
+        index.expire()  # event received while the rows are being read
+        return [(1, 10, 1)]
+
+    index.rebuild(load)
+    assert index.stale()
+    index.rebuild(lambda: [(1, 10, 1)])
+    assert not index.stale()
+
+
+def test_bus_publishes_on_commit_and_ignores_its_own_events():
+    handled = []
+    bus = CacheEventBus("test", connect=None, handle=handled.append, resync=None)
+    db = CommitSession()
+    bus.publish(db, "dish_updated", [7])
+    assert bus.published == {}
+    db.commit()
+    assert bus.published == {"dish_updated": 1}
+
+    payload = db.payloads[0]
+    assert (payload["k"], payload["ids"]) == ("dish_updated", [7])
+    bus._dispatch(json.dumps(payload))
+    assert handled == []
+    bus._dispatch(json.dumps({**payload, "o": "another process"}))
+    assert [received["ids"] for received in handled] == [[7]]
+    assert bus.received == {"dish_updated": 1}
+
+
+def test_bus_sends_no_ids_beyond_the_payload_limit():
+    bus = CacheEventBus("test", connect=None, handle=None, resync=None)
+    db = CommitSession()
+    bus.publish(db, "dish_created", range(MAX_EVENT_IDS + 1))
+    assert db.payloads[0]["ids"] is None
+
+
+def test_rolled_back_write_is_not_counted():
+    bus = CacheEventBus("test", connect=None, handle=None, resync=None)
+    db = CommitSession()
+    bus.publish(db, "dish_deleted", [1])
+    db.info.clear()  # what session_hooks does on rollback
+    db.commit()
+    assert bus.published == {}
+
+
+def test_on_commit_callbacks_are_kept_per_session():
+    db = CommitSession()
+    calls = []
+    on_commit(db, calls.append, 1)
+    db.commit()
+    db.commit()
+    assert calls == [1]
@@ -0,0 +1,49 @@
+from datetime import datetime
+
+from backend import crud, schemas
+from backend.tests.conftest import FakeSession, Result
+
+
+class EstimateSession(FakeSession):
+    """Answers the pg_class estimate and the page query."""
+
+    def __init__(self, reltuples, rows=()):
+        super().__init__()
+        self.reltuples = reltuples
+        self.rows = rows
+
+    def respond(self, sql):
+        if "pg_class" in sql:
+            return Result(scalar=self.reltuples)
+        if "count(" in sql.lower() and "over" not in sql.lower():
+            return Result(scalar=len(self.rows))
+        return Result(rows=self.rows)
+
+
+def test_estimated_dish_count_uses_reltuples():
+    assert crud.get_estimated_dish_count(EstimateSession(12345)) == 12345
+
+
+def test_estimated_dish_count_is_none_before_analyze():
+    assert crud.get_estimated_dish_count(EstimateSession(-1)) is None
+    assert crud.get_estimated_dish_count(EstimateSession(None)) is None
+
+
+def test_select_dish_cards_reports_estimated_total():
+    crud.dish_count_cache.clear()
+    rows = [(1, "番茄炒蛋", 1, ["番茄", "鸡蛋"], datetime(2024, 1, 1))]
+    db = EstimateSession(50000, rows)
+    cards, total, next_after, estimated, _ = crud.select_dish_cards(db, schemas.DishQuery(estimate_total=True))
+    assert (total, estimated, next_after) == (50000, True, None)
+    assert cards[0]["dish_name"] == "番茄炒蛋"
+    # The estimate replaces both the window count and the separate COUNT
+    assert not any("over" in sql.lower() for sql in db.statements)
+    assert len(db.statements) == 2
+
+
+def test_select_dish_cards_falls_back_when_never_analyzed():
+    crud.dish_count_cache.clear()
+    rows = [(1, "番茄炒蛋", 1, [], datetime(2024, 1, 1), 1)]
+    db = EstimateSession(-1, rows)
+    _, total, _, estimated, _ = crud.select_dish_cards(db, schemas.DishQuery(estimate_total=True))
+    assert (total, estimated) == (1, False)
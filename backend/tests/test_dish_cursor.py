@@ -0,0 +1,104 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from backend import crud, schemas
+from backend.tests.conftest import FakeSession, Result
+
+
+class PageSession(FakeSession):
+    """Returns `rows` for the page statement and `total` for a COUNT."""
+
+    dialect = postgresql.dialect()
+
+    def __init__(self, rows, total):
+        super().__init__()
+        self.rows = rows
+        self.total = total
+
+    def respond(self, sql):
+        if sql.lstrip().lower().startswith("select count"):
+            return Result(scalar=self.total)
+        return Result(rows=self.rows)
+
+
+# similarity() of a 3-trigram match out of 9, as float4 widened to float8
+SCORE = 0.3333333432674408
+
+
+@pytest.mark.parametrize("sort, key, search", [
+    (None, None, None),
+    ("name", "番茄炒蛋", None),
+    ("difficult", 2, None),
+    ("newest", datetime(2024, 5, 1, 12, 30, 15, 123456), None),
+    ("relevance", SCORE, "番茄"),
+])
+def test_cursor_round_trip(sort, key, search):
+    token = crud.encode_dish_cursor(sort, key, 42, search)
+    assert "=" not in token
+    assert crud.decode_dish_cursor(token, sort, search) == (key, 42)
+
+
+def test_cursor_of_another_sort_is_rejected():
+    token = crud.encode_dish_cursor("name", "番茄炒蛋", 42)
+    with pytest.raises(ValueError):
+        crud.decode_dish_cursor(token, "newest")
+
+
+def test_relevance_cursor_of_another_search_is_rejected():
+    token = crud.encode_dish_cursor("relevance", SCORE, 42, "番茄")
+    with pytest.raises(ValueError):
+        crud.decode_dish_cursor(token, "relevance", "鸡蛋")
+    with pytest.raises(ValueError):
+        crud.decode_dish_cursor(token, "relevance")
+
+
+@pytest.mark.parametrize("token", ["not a cursor", "e30", "鸡蛋", crud.encode_dish_cursor(None, None, "42")])
+def test_malformed_cursor_is_rejected(token):
+    with pytest.raises(ValueError):
+        crud.decode_dish_cursor(token, None)
+
+
+def test_full_page_returns_cursor_of_its_last_row():
+    crud.dish_count_cache.clear()
+    when = datetime(2024, 1, 1)
+    # size + 1 rows: the extra row only tells that another page exists
+    rows = [(dish_id, f"dish {dish_id}", 1, [], when, name, 10) for dish_id, name in ((3, "a"), (1, "b"), (2, "c"))]
+    cards, total, next_after, _, _ = crud.select_dish_cards(PageSession(rows, 10), schemas.DishQuery(size=2, sort="name"))
+    assert [card["id"] for card in cards] == [3, 1]
+    assert total == 10
+    assert crud.decode_dish_cursor(next_after, "name") == ("b", 1)
+
+
+def test_cursor_page_starts_after_the_cursor_row():
+    crud.dish_count_cache.clear()
+    after = crud.encode_dish_cursor("name", "b", 1)
+    db = PageSession([(2, "dish 2", 1, [], datetime(2024, 1, 1), "c")], 10)
+    cards, total, next_after, _, _ = crud.select_dish_cards(db, schemas.DishQuery(size=2, sort="name", after=after))
+    page_sql = db.statements[0]
+    assert "(dish_card.dish_name, dish_card.dish_id) > ('b', 1)" in page_sql
+    assert "OFFSET" not in page_sql
+    # No window count in cursor mode: the total comes from a separate COUNT
+    assert "over" not in page_sql.lower()
+    assert (len(cards), total, next_after) == (1, 10, None)
+
+
+def test_relevance_pages_continue_after_rows_tied_on_the_score():
+    crud.dish_count_cache.clear()
+    when = datetime(2024, 1, 1)
+    rows = [(dish_id, "番茄蛋", 1, [], when, SCORE, 10) for dish_id in (9, 7, 5)]
+    query = schemas.DishQuery(size=2, sort="relevance", dish_name="番茄")
+    db = PageSession(rows, 10)
+    _, _, next_after, _, _ = crud.select_dish_cards(db, query)
+    # The score is selected as float8, so the cursor holds exactly the row's value
+    assert "CAST(similarity(dish_card.dish_name, '番茄') AS FLOAT(53))" in db.statements[0]
+    assert crud.decode_dish_cursor(next_after, "relevance", "番茄") == (SCORE, 7)
+
+    db = PageSession([(5, "番茄蛋", 1, [], when, SCORE)], 10)
+    cards, _, next_after, _, _ = crud.select_dish_cards(db, query.copy(update={"after": next_after}))
+    page_sql = db.statements[0]
+    assert (f"(CAST(similarity(dish_card.dish_name, '番茄') AS FLOAT(53)), dish_card.dish_id) < ({SCORE}, 7)"
+            in page_sql)
+    assert "ORDER BY CAST(similarity(dish_card.dish_name, '番茄') AS FLOAT(53)) DESC, dish_card.dish_id DESC" in page_sql
+    assert ([card["id"] for card in cards], next_after) == ([5], None)
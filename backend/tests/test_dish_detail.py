@@ -0,0 +1,81 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from backend import crud
+from backend.cache import LRUTTLCache
+from backend.tests.conftest import FakeSession, Result
+
+DISH_TIME = datetime(2024, 5, 1, 8)
+INGREDIENT_TIME = datetime(2024, 5, 1, 9)
+LINK_TIME = datetime(2024, 5, 1, 10)
+STEP_TIME = datetime(2024, 5, 1, 7)
+
+
+class DetailSession(FakeSession):
+    """Answers the detail load with one dish and the version query with its aggregates."""
+
+    def __init__(self, dish):
+        super().__init__()
+        self.dish = dish
+
+    def respond(self, sql):
+        if "greatest(" in sql:
+            links = self.dish.dish_ingredients
+            return Result(rows=[(
+                self.dish.modify_time,
+                max(max(link.modify_time, link.ingredient.modify_time) for link in links),
+                len(links),
+                max(step.modify_time for step in self.dish.steps),
+                len(self.dish.steps)
+            )])
+        return Result(scalar=self.dish)
+
+
+def make_dish(link_time=LINK_TIME):
+    ingredient = SimpleNamespace(id=3, ingredient_name="egg", type="main",
+                                 create_time=INGREDIENT_TIME, modify_time=INGREDIENT_TIME)
+    link = SimpleNamespace(usage="2", modify_time=link_time, ingredient=ingredient)
+    step = SimpleNamespace(id=5, dish_id=1, step_order=1, step_text="beat",
+                           create_time=STEP_TIME, modify_time=STEP_TIME)
+    return SimpleNamespace(id=1, dish_name="omelette", difficult=1, create_time=DISH_TIME,
+                           modify_time=DISH_TIME, dish_ingredients=[link], steps=[step])
+
+
+@pytest.fixture(autouse=True)
+def detail_cache(monkeypatch):
+    monkeypatch.setattr(crud, "dish_detail_cache", LRUTTLCache(ttl_seconds=60))
+
+
+def test_validator_covers_ingredient_link_modify_time():
+    db = DetailSession(make_dish())
+    last_modified, version, detail = crud.get_dish_detail_validator(db, 1)
+    assert last_modified == LINK_TIME
+    assert version == (1, LINK_TIME, 1, 1)
+    assert detail is None
+
+
+def test_cached_validator_matches_the_query():
+    db = DetailSession(make_dish())
+    uncached = crud.get_dish_detail_validator(db, 1)
+    detail = crud.get_dish_with_details(db, 1)
+    statements = len(db.statements)
+    assert crud.get_dish_detail_validator(db, 1) == (*uncached[:2], detail)
+    assert len(db.statements) == statements
+
+
+def test_detail_request_reads_the_cache_once():
+    db = DetailSession(make_dish())
+    for _ in range(2):
+        *_, detail = crud.get_dish_detail_validator(db, 1)
+        if detail is None:
+            crud.get_dish_with_details(db, 1, lookup=False)
+    stats = crud.dish_detail_cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_usage_change_changes_the_version():
+    before = crud.get_dish_detail_validator(DetailSession(make_dish()), 1)
+    after = crud.get_dish_detail_validator(DetailSession(make_dish(datetime(2024, 5, 2))), 1)
+    assert before[1] != after[1]
@@ -0,0 +1,57 @@
+from datetime import datetime, timezone
+
+from starlette.requests import Request
+
+from backend.etag import http_date, is_not_modified, make_etag
+
+LAST_MODIFIED = datetime(2024, 5, 1, 12, 30, 15, 250000)
+ETAG = make_etag("detail", 1, LAST_MODIFIED)
+
+
+def request(method="GET", **headers):
+    return Request({"type": "http", "method": method,
+                    "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]})
+
+
+def test_make_etag_is_weak_and_stable():
+    assert ETAG.startswith('W/"')
+    assert make_etag("detail", 1, LAST_MODIFIED) == ETAG
+    assert make_etag("detail", 2, LAST_MODIFIED) != ETAG
+
+
+def test_if_none_match_uses_weak_comparison():
+    strong = ETAG[2:]
+    assert is_not_modified(request(if_none_match=f'"other", {strong}'), ETAG)
+    assert is_not_modified(request(if_none_match="*"), ETAG)
+    assert not is_not_modified(request(if_none_match='W/"other"'), ETAG)
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since():
+    assert not is_not_modified(request(if_none_match='W/"other"', if_modified_since=http_date(LAST_MODIFIED)),
+                               ETAG, LAST_MODIFIED)
+
+
+def test_if_modified_since_at_second_precision():
+    assert is_not_modified(request(if_modified_since=http_date(LAST_MODIFIED)), ETAG, LAST_MODIFIED)
+    assert not is_not_modified(request(if_modified_since="Wed, 01 May 2024 12:30:14 GMT"), ETAG, LAST_MODIFIED)
+
+
+def test_if_modified_since_with_minus_zero_zone_is_utc():
+    # parsedate_to_datetime returns a naive datetime for "-0000"
+    assert is_not_modified(request(if_modified_since="Wed, 01 May 2024 12:30:15 -0000"), ETAG, LAST_MODIFIED)
+    assert not is_not_modified(request(if_modified_since="Wed, 01 May 2024 12:30:14 -0000"), ETAG, LAST_MODIFIED)
+
+
+def test_if_modified_since_garbage_is_ignored():
+    assert not is_not_modified(request(if_modified_since="yesterday"), ETAG, LAST_MODIFIED)
+
+
+def test_aware_last_modified():
+    aware = LAST_MODIFIED.replace(tzinfo=timezone.utc)
+    assert is_not_modified(request(if_modified_since=http_date(aware)), ETAG, aware)
+
+
+def test_conditional_headers_ignored_for_post():
+    assert not is_not_modified(request("POST", if_none_match=ETAG), ETAG)
+    assert not is_not_modified(request("POST", if_modified_since=http_date(LAST_MODIFIED)), ETAG, LAST_MODIFIED)
+    assert is_not_modified(request("HEAD", if_none_match=ETAG), ETAG)
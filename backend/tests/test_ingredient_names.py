@@ -0,0 +1,39 @@
+import importlib.util
+import os
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from backend import crud
+from backend.responses import serialize_ingredient
+
+MIGRATION = os.path.join(os.path.dirname(os.path.dirname(__file__)), "alembic", "versions",
+                         "004_ingredient_name_key.py")
+
+
+def load_migration():
+    spec = importlib.util.spec_from_file_location("migration_004", MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.parametrize("name", [
+    "鸡蛋", " 鸡蛋 ", "　鸡蛋　", " 鸡蛋 ", " 番茄 ", "\t葱\n",
+    "ＡＢＣ　酱", "Ｓａｌｔ！", "", "　 ",
+])
+def test_migration_backfill_matches_normalize_ingredient_name(name):
+    assert load_migration().normalize_ingredient_name(name) == crud.normalize_ingredient_name(name)
+
+
+def test_normalize_folds_full_width_and_trims_unicode_whitespace():
+    assert crud.normalize_ingredient_name(" ＡＢＣ　") == "ABC"
+
+
+def test_serialized_ingredient_has_no_name_key():
+    now = datetime(2024, 1, 1)
+    row = SimpleNamespace(id=1, ingredient_name="鸡蛋", type=1, name_key="鸡蛋", create_time=now, modify_time=now)
+    assert serialize_ingredient(row) == {
+        "id": 1, "ingredient_name": "鸡蛋", "type": 1, "create_time": now, "modify_time": now
+    }
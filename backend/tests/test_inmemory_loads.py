@@ -0,0 +1,117 @@
+"""
+The in-memory structures behind /dish/match and /dish/recommend load in the
+threadpool on a session of their own, never on the event loop through run_sync.
+"""
+import asyncio
+from datetime import datetime
+import threading
+import time
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend import crud, crud_async, schemas
+from backend.database import DB_STATEMENT_TIMEOUT_LOAD_MS
+from backend.ingredient_index import IngredientIndex
+from backend.recommender import Recommender
+from backend.tests.conftest import FakeSession, Result
+
+LINKS = [(1, 10, 1), (1, 11, 3), (2, 10, 1)]
+# (dish_id, cook_count, rating_sum, last_cooked_time, max(dish_history.id))
+DISH_STATS = [(1, 3, 3, datetime(2024, 1, 1), 7), (2, 0, 0, None, 7)]
+
+
+class LoadSession(FakeSession):
+    """Stands in for crud._load_session(): a slow full-table read, recorded per thread."""
+
+    def __init__(self, loads, results, delay=0.2):
+        super().__init__()
+        self.loads = loads
+        self.results = results  # rows of each statement, in order
+        self.delay = delay
+        self.info = {"statement_timeout_ms": DB_STATEMENT_TIMEOUT_LOAD_MS}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def respond(self, sql):
+        rows = self.results[len(self.loads) % len(self.results)]
+        self.loads.append(threading.get_ident())
+        time.sleep(self.delay)
+        return Result(rows)
+
+
+class RequestSession(FakeSession):
+    """The request's session: answers the card query of the ranked dishes."""
+
+    def respond(self, sql):
+        return Result([(dish_id, f"dish {dish_id}", 1, []) for dish_id in (1, 2)])
+
+
+class LoopAsyncSession(AsyncSession):
+    """AsyncSession whose run_sync runs on the event loop thread, as the real one does."""
+
+    def __init__(self, loop_threads):
+        self.loop_threads = loop_threads
+
+    async def run_sync(self, fn, *args, **kwargs):
+        self.loop_threads.append(threading.get_ident())
+        return fn(RequestSession(), *args, **kwargs)
+
+
+@pytest.fixture
+def cold_index(monkeypatch):
+    monkeypatch.setattr(crud, "ingredient_index", IngredientIndex(ttl_seconds=0))
+    loads = []
+    monkeypatch.setattr(crud, "_load_session", lambda: LoadSession(loads, [LINKS]))
+    return loads
+
+
+@pytest.fixture
+def cold_recommender(monkeypatch):
+    monkeypatch.setattr(crud, "recommender", Recommender(ttl_seconds=0))
+    loads = []
+    monkeypatch.setattr(crud, "_load_session",
+                        lambda: LoadSession(loads, [DISH_STATS, [link[:2] for link in LINKS]]))
+    return loads
+
+
+def test_load_session_uses_load_timeout():
+    assert crud._load_session().info["statement_timeout_ms"] == DB_STATEMENT_TIMEOUT_LOAD_MS
+
+
+def test_concurrent_cold_matches_load_once_off_the_event_loop(cold_index):
+    loop_threads = []
+    match = schemas.DishMatchRequest(ingredient_ids=[10])
+
+    async def two_requests():
+        return await asyncio.wait_for(asyncio.gather(
+            crud_async.match_dishes_by_ingredients(LoopAsyncSession(loop_threads), match),
+            crud_async.match_dishes_by_ingredients(LoopAsyncSession(loop_threads), match),
+        ), timeout=5)
+
+    results = asyncio.run(two_requests())
+    assert len(cold_index) == 1
+    assert cold_index[0] not in loop_threads
+    for result in results:
+        assert {item["id"] for item in result["items"]} == {1, 2}
+
+
+def test_concurrent_cold_recommends_load_once_off_the_event_loop(cold_recommender):
+    loop_threads = []
+
+    async def two_requests():
+        return await asyncio.wait_for(asyncio.gather(
+            crud_async.recommend_dishes(LoopAsyncSession(loop_threads), 10),
+            crud_async.recommend_dishes(LoopAsyncSession(loop_threads), 10),
+        ), timeout=5)
+
+    results = asyncio.run(two_requests())
+    # One load: the stats statement and the links statement
+    assert len(cold_recommender) == 2
+    assert not set(cold_recommender) & set(loop_threads)
+    for result in results:
+        assert {item["id"] for item in result} == {1, 2}
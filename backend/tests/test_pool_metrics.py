@@ -0,0 +1,28 @@
+import time
+
+from backend.pool_metrics import TimedQueuePool
+
+CONNECT_S = 0.05
+
+
+class SlowConnection:
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def slow_connect():
+    time.sleep(CONNECT_S)
+    return SlowConnection()
+
+
+def test_new_connections_count_as_connect_time_not_wait():
+    pool = TimedQueuePool(slow_connect, pool_size=1, max_overflow=0)
+    pool.connect().close()  # opens the connection
+    pool.connect().close()  # reuses it
+    stats = pool.wait_stats.snapshot()
+    assert (stats["checkouts"], stats["connects"]) == (2, 1)
+    assert stats["connect_ms_total"] >= CONNECT_S * 1000
+    assert stats["wait_ms_max"] < CONNECT_S * 1000
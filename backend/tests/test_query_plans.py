@@ -0,0 +1,16 @@
+"""
+check_query_plans.py as a test. It needs a database seeded with mock data, so it
+only runs with CHECK_QUERY_PLANS=1; ENV / DATABASE_URL select the database as for
+the app.
+"""
+import os
+
+import pytest
+
+from backend import check_query_plans
+
+
+@pytest.mark.skipif(os.getenv("CHECK_QUERY_PLANS") != "1",
+                    reason="needs a seeded database; set CHECK_QUERY_PLANS=1 to run")
+def test_hot_path_query_plans():
+    assert check_query_plans.check(env=os.getenv("ENV"))
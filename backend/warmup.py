@@ -0,0 +1,121 @@
+"""
+Startup warmup: work that would otherwise land on the first requests of a new worker.
+
+- ORM mappers are configured (relationships are resolved on first use otherwise).
+- DB_WARMUP_CONNECTIONS pool connections are opened concurrently and checked back
+  in, so the first requests do not wait for TCP, authentication and a new backend.
+- The read replica health checks start, so replicas can take reads from the first
+  request on (reads go to the primary until a replica has passed a check).
+- The cache event listener starts, so writes of other processes evict this
+  process's cached entries (see backend/cache_events.py).
+- With DB_WARMUP_STATEMENTS, the crud functions of the hot read routes run once in a
+  transaction that is rolled back. SQLAlchemy compiles each statement shape once per
+  engine and keeps the SQL in the engine's compiled cache; running them here moves
+  that compilation (and the first relationship loader setup) out of the requests.
+
+A failing phase is reported and skipped: the worker still starts, and pool_pre_ping
+reconnects once the database is reachable.
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.orm import configure_mappers
+from sqlmodel import select
+from starlette.concurrency import run_in_threadpool
+
+from backend import crud, schemas
+from backend.database import (
+    AsyncSessionLocal, DB_ASYNC, DB_POOL_DISABLED, DB_POOL_SIZE, DB_STATEMENT_TIMEOUT_READ_MS,
+    DB_WARMUP_CONNECTIONS, DB_WARMUP_STATEMENTS, SessionLocal, get_async_engine, get_engine, replica_router
+)
+from backend.models import Dish
+
+
+def run_hot_statements(db):
+    """Run the statements of /dish/select, /dish/detail, /ingredient/list and the history routes once."""
+    # A real dish, so the selectin loaders of the detail query run too
+    dish_id = db.execute(select(Dish.id).limit(1)).scalar()
+    if dish_id is None:
+        dish_id = -1
+    crud.select_dish_cards(db, schemas.DishQuery())
+    crud.get_dish_detail_validator(db, dish_id)
+    crud.get_dish_with_details(db, dish_id, lookup=False)
+    crud.get_ingredients(db, 0, 20)
+    crud.get_ingredients_validator(db)
+    crud.get_dish_history_validator(db, dish_id)
+    crud.get_dish_history_by_dish_id(db, dish_id)
+    crud.get_dish_stats(db, dish_id)
+    db.rollback()
+
+
+def open_connections(engine, count):
+    """Open count connections of engine at once and return them to its pool."""
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        futures = [executor.submit(engine.connect) for _ in range(count)]
+    for future in futures:
+        if future.exception() is None:
+            future.result().close()
+    for future in futures:
+        if future.exception() is not None:
+            raise future.exception()
+    return count
+
+
+async def open_async_connections(engine, count):
+    connections = [engine.connect() for _ in range(count)]
+    results = await asyncio.gather(*(connection.start() for connection in connections), return_exceptions=True)
+    for connection, result in zip(connections, results):
+        if not isinstance(result, BaseException):
+            await connection.close()
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return count
+
+
+def _statements_sync():
+    db = SessionLocal(info={"statement_timeout_ms": DB_STATEMENT_TIMEOUT_READ_MS})
+    try:
+        run_hot_statements(db)
+    finally:
+        db.close()
+
+
+async def _statements_async():
+    async with AsyncSessionLocal(info={"statement_timeout_ms": DB_STATEMENT_TIMEOUT_READ_MS}) as db:
+        await db.run_sync(run_hot_statements)
+
+
+async def warmup():
+    """Run the warmup phases; returns the milliseconds spent in each one."""
+    # Connections beyond the pool size would be closed again on check-in
+    connections = 0 if DB_POOL_DISABLED else min(DB_WARMUP_CONNECTIONS, DB_POOL_SIZE)
+    phases = [("mappers", configure_mappers)]
+    if replica_router is not None:
+        phases.append(("replicas", replica_router.start))
+    if crud.cache_event_bus is not None:
+        phases.append(("cache_events", crud.cache_event_bus.start))
+    if DB_ASYNC:
+        if connections:
+            phases.append(("connections", lambda: open_async_connections(get_async_engine(), connections)))
+        if DB_WARMUP_STATEMENTS:
+            phases.append(("statements", _statements_async))
+    else:
+        if connections:
+            phases.append(("connections", lambda: run_in_threadpool(open_connections, get_engine(), connections)))
+        if DB_WARMUP_STATEMENTS:
+            phases.append(("statements", lambda: run_in_threadpool(_statements_sync)))
+
+    timings = {}
+    for name, phase in phases:
+        started = time.perf_counter()
+        try:
+            result = phase()
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception as e:
+            print(f"Warmup: {name} failed: {e!r}")
+            continue
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+    return timings